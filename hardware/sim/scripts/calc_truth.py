@@ -7,8 +7,14 @@
  @FilePath: /cnn/hardware/rtl/init_files/calc_truth.py
 '''
 import numpy as np
+import os
 import sys
 
+# Shared $readmemh codec + memmap bundle (verif/scripts/init_bundle.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+from hex_codec import parse_hex
+from init_bundle import load_init
+
 # ================= 配置 =================
 WEIGHTS_FILE = "conv1_weights.hex"
 BIAS_FILE    = "conv1_bias.hex"
@@ -16,21 +22,12 @@ IMAGE_FILE   = "input_image.hex"
 GOLDEN_FILE  = "conv1_golden_out.hex" # 你的Golden文件路径
 # =======================================
 
-def hex2int(s, bits=32):
-    val = int(s, 16)
-    if val & (1 << (bits-1)):
-        val -= (1 << bits)
-    return val
-
 def main():
     print("--- Starting Manual Calculation ---")
 
     # 1. 读取 Bias (6 lines)
     # Line 0 = Ch0 ?, Line 5 = Ch5 ?
-    bias = []
-    with open(BIAS_FILE) as f:
-        for line in f:
-            bias.append(hex2int(line.strip(), 32))
+    bias = load_init(BIAS_FILE, 32).astype(np.int64)
     print(f"Bias Loaded: {len(bias)} channels")
     print(f"  Bias[0] (Line 0): {bias[0]}")
     print(f"  Bias[5] (Line 5): {bias[5]}")
@@ -38,21 +35,10 @@ def main():
     # 2. 读取 Weights (25 lines, 48 bits each)
     # File Format assumption: MSB..LSB = Ch5..Ch0
     # Each line corresponds to a spatial kernel position (0..24)
-    w_ch0 = []
-    w_ch5 = []
-
-    with open(WEIGHTS_FILE) as f:
-        for line in f:
-            val = int(line.strip(), 16)
-            # Extract Ch0 (LSB, bits 7:0)
-            ch0_byte = val & 0xFF
-            if ch0_byte & 0x80: ch0_byte -= 0x100
-            w_ch0.append(ch0_byte)
-
-            # Extract Ch5 (MSB, bits 47:40)
-            ch5_byte = (val >> 40) & 0xFF
-            if ch5_byte & 0x80: ch5_byte -= 0x100
-            w_ch5.append(ch5_byte)
+    w_lanes = load_init(WEIGHTS_FILE, 8, 6).astype(np.int64)
+    # Ch0 (LSB, bits 7:0), Ch5 (MSB, bits 47:40)
+    w_ch0 = w_lanes[:, 0]
+    w_ch5 = w_lanes[:, 5]
 
     # Reshape to 5x5
     w0 = np.array(w_ch0).reshape(5, 5)
@@ -63,12 +49,7 @@ def main():
 
     # 3. 读取 Image (28*28 lines)
     # Line 0 = (0,0), Line 1 = (0,1)...
-    img_data = []
-    with open(IMAGE_FILE) as f:
-        for line in f:
-            img_data.append(hex2int(line.strip(), 8))
-
-    img = np.array(img_data).reshape(28, 28)
+    img = load_init(IMAGE_FILE, 8).astype(np.int64).reshape(28, 28)
     print("Image Loaded.")
     print(f"  Img Top-Left 5x5:\n{img[0:5, 0:5]}")
 
@@ -92,7 +73,7 @@ def main():
     try:
         with open(GOLDEN_FILE) as f:
             first_line = f.readline().strip()
-            golden_val = hex2int(first_line, 32)
+            golden_val = parse_hex(first_line, 32)[0]
 
         print("\n=== GOLDEN FILE CHECK ===")
         print(f"Golden File Line 0 Value: {golden_val}")
@@ -1,7 +1,12 @@
 
 import numpy as np
+import os
 import sys
 
+# Shared $readmemh codec + memmap bundle (verif/scripts/init_bundle.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+from init_bundle import load_init
+
 # ================= 配置 =================
 WEIGHTS_FILE = "conv1_weights.hex"
 BIAS_FILE    = "conv1_bias.hex"
@@ -15,41 +20,18 @@ OUT_W = 24  # 28 - 5 + 1
 CHANNELS = 6
 # =======================================
 
-def hex2int(s, bits=32):
-    """转换 Hex 补码字符串为整数"""
-    val = int(s, 16)
-    if val & (1 << (bits-1)):
-        val -= (1 << bits)
-    return val
-
 def load_data():
     print("Loading Hardware Init Files...")
 
     # 1. Load Bias
-    bias = []
-    with open(BIAS_FILE) as f:
-        for line in f:
-            bias.append(hex2int(line.strip(), 32))
+    bias = load_init(BIAS_FILE, 32).astype(np.int64)
 
     # 2. Load Weights (Format: MSB=Ch5 ... LSB=Ch0)
-    w_raw = [[], [], [], [], [], []] # 6 Channels
-    with open(WEIGHTS_FILE) as f:
-        for line in f:
-            val = int(line.strip(), 16)
-            for k in range(6):
-                byte = (val >> (k*8)) & 0xFF
-                if byte & 0x80: byte -= 0x100
-                w_raw[k].append(byte)
-
-    # Reshape to (6, 5, 5)
-    weights = np.array(w_raw).reshape(6, 5, 5)
+    # [25, 6 Channels] -> Reshape to (6, 5, 5)
+    weights = load_init(WEIGHTS_FILE, 8, 6).astype(np.int64).T.reshape(6, 5, 5)
 
     # 3. Load Image
-    img_data = []
-    with open(IMAGE_FILE) as f:
-        for line in f:
-            img_data.append(hex2int(line.strip(), 8))
-    img = np.array(img_data).reshape(28, 28)
+    img = load_init(IMAGE_FILE, 8).astype(np.int64).reshape(28, 28)
 
     # 4. Load Simulation Output
     print(f"Loading Simulation Output: {SIM_OUT_FILE}...")
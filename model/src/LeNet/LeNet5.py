@@ -8,6 +8,8 @@
 '''
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+import torch.nn.utils.prune as prune
 
 # Define a module: LeNet
 class LeNet5(nn.Module):
@@ -56,5 +58,222 @@ class LeNet5(nn.Module):
         return x
 
 
+#===============================
+# FC1 pruning (compressed weight stream, export_fc.py --sparse)
+#===============================
 
+PRUNE_MODES = ("magnitude", "structured")
 
+def prune_fc1(net, amount, mode="magnitude"):
+    '''
+    Prune classifier[1] (FC1, [120, 400]) in place with torch.nn.utils.prune.
+    magnitude : smallest |w| over the whole matrix (unstructured)
+    structured: whole input columns by L1 norm, i.e. FC1 inputs no neuron
+                reads; fc_accelerator_top can skip their CALC_STREAM cycles
+    The mask stays applied while fine-tuning (weight = weight_orig * weight_mask);
+    call remove_pruning() before saving so the checkpoint keys are unchanged.
+    '''
+    fc1 = net.classifier[1]
+    if mode == "magnitude":
+        prune.l1_unstructured(fc1, name="weight", amount=amount)
+    elif mode == "structured":
+        prune.ln_structured(fc1, name="weight", amount=amount, n=1, dim=1)
+    else:
+        raise ValueError(f"unknown prune mode '{mode}' (choose from {', '.join(PRUNE_MODES)})")
+    return fc1.weight_mask
+
+def remove_pruning(net):
+    '''Make the FC1 pruning permanent (plain weight tensor with zeros)'''
+    fc1 = net.classifier[1]
+    if prune.is_pruned(fc1):
+        prune.remove(fc1, "weight")
+
+def fc1_sparsity(net):
+    '''Fraction of exactly-zero FC1 weights'''
+    w = net.classifier[1].weight
+    return float((w == 0).sum()) / w.numel()
+
+#===============================
+# Hardware INT8 datapath (bit-exact)
+#===============================
+
+# Conv: Q1.7 input / weights, Q14 bias (export_conv1.py, export_conv2.py)
+CONV_SCALE = 128.0
+# FC: weights x64, bias x64*64 clamped to int8 (export_fc.py)
+FC_SCALE = 64.0
+# Every layer: ReLU -> (Pool) -> >> QUANT_SHIFT -> saturate to int8
+QUANT_SHIFT = 8
+# Conv2 runs in 3 passes of 6 output channels
+K_CHANNELS = 6
+
+def quantize_tensor(x, scale, clamp=True):
+    '''
+    round(x * scale) (round half to even) -> int32, optionally clamped to int8
+    '''
+    q = torch.round(x.detach().to(torch.float64) * scale)
+    if clamp:
+        q = torch.clamp(q, -128, 127)
+    return q.to(torch.int32)
+
+def _shift_saturate(x, shift):
+    return torch.clamp(x >> shift, -128, 127)
+
+class QuantLeNet5(nn.Module):
+    '''
+    Integer-only LeNet5 that reproduces the accelerator arithmetic exactly
+    (same results as verif/scripts/golden_model.run_batch):
+    Conv1 -> ReLU -> Pool -> >>8 -> Conv2 -> ReLU -> Pool -> >>8
+    -> Flatten (Channel-Major) -> FC1 -> ReLU -> >>8 -> FC2 -> ReLU -> >>8 -> FC3 -> >>8
+
+    Activations, bias, ReLU, pooling and shifts are int32 tensor ops. The MAC
+    sums go through float64 conv/matmul: every product and partial sum is an
+    integer far below 2^53, so the result is exact and works on any torch build
+    (integer conv2d is not available on all CPU backends).
+
+    Input: float images in [0, 1] (ToTensor) are quantized to Q1.7, integer
+    tensors are taken as already quantized. Output: int32 logits (int8 range).
+    '''
+    def __init__(self, params, shift=QUANT_SHIFT):
+        super().__init__()
+        self.shift = shift
+        # Integer parameters in PyTorch layout ([Out, In, R, S] / [Out, In])
+        for name in ["conv1_w", "conv1_b", "conv2_w", "conv2_b",
+                     "fc1_w", "fc1_b", "fc2_w", "fc2_b", "fc3_w", "fc3_b"]:
+            self.register_buffer(name, torch.as_tensor(params[name]).to(torch.int32))
+
+    @classmethod
+    def from_float(cls, net, shift=QUANT_SHIFT):
+        '''
+        Quantize a trained float LeNet5 the same way the exporters do
+        '''
+        conv1, conv2 = net.features[0], net.features[3]
+        fc1, fc2, fc3 = net.classifier[1], net.classifier[3], net.classifier[5]
+        params = {
+            "conv1_w": quantize_tensor(conv1.weight, CONV_SCALE),
+            "conv1_b": quantize_tensor(conv1.bias, CONV_SCALE * CONV_SCALE, clamp=False),
+            "conv2_w": quantize_tensor(conv2.weight, CONV_SCALE),
+        }
+        # conv2_bias.hex holds one 32-bit bias per line, but the bias loader
+        # (dma_transfer_bias) only fetches word[group] into lane 0 of each pass:
+        # Out_Ch 0 / 6 / 12 get bias line 0 / 1 / 2, the other channels get 0.
+        b2 = quantize_tensor(conv2.bias, CONV_SCALE * CONV_SCALE, clamp=False)
+        conv2_b = torch.zeros_like(b2)
+        n_groups = (len(b2) + K_CHANNELS - 1) // K_CHANNELS
+        conv2_b[0:n_groups * K_CHANNELS:K_CHANNELS] = b2[:n_groups]
+        params["conv2_b"] = conv2_b
+
+        for name, fc in [("fc1", fc1), ("fc2", fc2), ("fc3", fc3)]:
+            params[f"{name}_w"] = quantize_tensor(fc.weight, FC_SCALE)
+            params[f"{name}_b"] = quantize_tensor(fc.bias, FC_SCALE * FC_SCALE)
+        return cls(params, shift)
+
+    def _conv(self, x, w, b, padding=0):
+        acc = F.conv2d(x.to(torch.float64), w.to(torch.float64), padding=padding).to(torch.int32)
+        x = torch.relu(acc + b.view(1, -1, 1, 1))
+        x = F.max_pool2d(x, kernel_size=2, stride=2)
+        return _shift_saturate(x, self.shift)
+
+    def _fc(self, x, w, b, relu_en=True):
+        acc = (x.to(torch.float64) @ w.to(torch.float64).T).to(torch.int32)
+        x = acc + b
+        if relu_en:
+            x = torch.relu(x)
+        return _shift_saturate(x, self.shift)
+
+    def forward(self, x):
+        if x.is_floating_point():
+            x = quantize_tensor(x, CONV_SCALE)
+        x = x.to(torch.int32)
+
+        # [Batch, 1, 28, 28] -> [Batch, 6, 14, 14] -> [Batch, 16, 5, 5]
+        x = self._conv(x, self.conv1_w, self.conv1_b, padding=2)
+        x = self._conv(x, self.conv2_w, self.conv2_b)
+        # NCHW flatten == Channel-Major (Ch0 all pixels, then Ch1 ...)
+        x = torch.flatten(x, 1)
+        x = self._fc(x, self.fc1_w, self.fc1_b)
+        x = self._fc(x, self.fc2_w, self.fc2_b)
+        # FC3 (Output Layer) has no ReLU
+        return self._fc(x, self.fc3_w, self.fc3_b, relu_en=False)
+
+
+#===============================
+# Quantization-aware training (fake quant, exporter + RTL arithmetic)
+#===============================
+
+def qat_layers(shift=QUANT_SHIFT):
+    '''
+    Per-layer quantization in export_all.LAYER_CONFIG shape: the exporters'
+    scales (export_conv1/2.to_fixed, export_fc.quantize) and one >> shift
+    '''
+    conv = {"w_scale": CONV_SCALE, "b_scale": CONV_SCALE * CONV_SCALE, "b_clamp": False, "shift": shift}
+    fc = {"w_scale": FC_SCALE, "b_scale": FC_SCALE * FC_SCALE, "b_clamp": True, "shift": shift}
+    return {"conv1": dict(conv), "conv2": dict(conv), "fc1": dict(fc), "fc2": dict(fc), "fc3": dict(fc)}
+
+def _round_ste(x):
+    # round half to even forward (torch.round == np.round == Python round()), identity backward
+    return x + (torch.round(x) - x).detach()
+
+def _floor_ste(x):
+    return x + (torch.floor(x) - x).detach()
+
+def fake_quant(x, scale, clamp=True):
+    '''round(x * scale), optionally clamped to int8, as a float tensor with straight-through gradient'''
+    q = _round_ste(x * scale)
+    return torch.clamp(q, -128, 127) if clamp else q
+
+def _fake_shift_saturate(x, shift):
+    # >> shift on two's complement == floor(x / 2^shift)
+    return torch.clamp(_floor_ste(x / 2 ** shift), -128, 127)
+
+class QATLeNet5(LeNet5):
+    '''
+    LeNet5 trained through the accelerator's integer datapath.
+
+    Same parameters (and state_dict keys) as LeNet5: the checkpoint goes to the
+    exporters unchanged. The forward pass runs in integer units (float tensors
+    holding integers) with the exporters' rounding / clamping and the RTL's
+    per-layer >> shift + saturate:
+
+        image  -> round(x * 128), clamp int8 (Q1.7)
+        weight -> round(w * w_scale), clamp int8; bias -> round(b * b_scale) (FC: clamp int8)
+        Conv   -> + bias (Conv2: only bias lines 0/1/2 reach Out_Ch 0/6/12) -> ReLU -> Pool -> >> shift -> saturate
+        FC     -> + bias -> ReLU (not FC3) -> >> shift -> saturate
+
+    Rounding and the shift use straight-through gradients, saturation clamps.
+    Logits are the integer logits of QuantLeNet5 / golden_model.run_batch.
+    '''
+    def __init__(self, layers=None):
+        super().__init__()
+        self.layers = layers or qat_layers()
+
+    def _weights(self, name, module):
+        cfg = self.layers[name]
+        w = fake_quant(module.weight, cfg["w_scale"])
+        b = fake_quant(module.bias, cfg["b_scale"], clamp=cfg["b_clamp"])
+        return w, b, cfg["shift"]
+
+    def forward(self, x):
+        x = fake_quant(x, CONV_SCALE)
+
+        # Conv1: [Batch, 1, 28, 28] -> [Batch, 6, 14, 14]
+        w, b, shift = self._weights("conv1", self.features[0])
+        x = F.max_pool2d(torch.relu(F.conv2d(x, w, b, padding=2)), kernel_size=2, stride=2)
+        x = _fake_shift_saturate(x, shift)
+
+        # Conv2: [Batch, 6, 14, 14] -> [Batch, 16, 5, 5], dma_transfer_bias quirk
+        w, b, shift = self._weights("conv2", self.features[3])
+        n_groups = (len(b) + K_CHANNELS - 1) // K_CHANNELS
+        idx = torch.arange(0, n_groups * K_CHANNELS, K_CHANNELS, device=b.device)
+        b = torch.zeros_like(b).index_copy(0, idx, b[:n_groups])
+        x = F.max_pool2d(torch.relu(F.conv2d(x, w, b)), kernel_size=2, stride=2)
+        x = _fake_shift_saturate(x, shift)
+
+        # NCHW flatten == Channel-Major
+        x = torch.flatten(x, 1)
+        for name, idx, relu_en in [("fc1", 1, True), ("fc2", 3, True), ("fc3", 5, False)]:
+            w, b, shift = self._weights(name, self.classifier[idx])
+            x = F.linear(x, w, b)
+            if relu_en:
+                x = torch.relu(x)
+            x = _fake_shift_saturate(x, shift)
+        return x
@@ -0,0 +1,148 @@
+'''
+ @Description: Per-epoch test-set evaluation in a background process (train.py)
+               - The training loop hands over a CPU snapshot of the weights and
+                 continues; a spawned process scores it on the MNIST test set
+               - Float accuracy (LeNet5) and bit-exact quantized accuracy
+                 (QATLeNet5 forward == QuantLeNet5 / golden_model integer datapath)
+               - One JSON record per epoch appended to a .jsonl log
+               - Plateau: early stop once quantized accuracy stops improving
+ @FilePath: /cnn/model/src/LeNet/async_eval.py
+'''
+import json
+import queue
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+import torchvision
+
+from LeNet5 import LeNet5, QATLeNet5, qat_layers
+import mnist_data
+
+#==================== Configuration ==============
+EVAL_LOG = "train_eval.jsonl"
+EVAL_BATCH = 1000
+EVAL_THREADS = 1        # leave the cores to training
+
+# ================= Snapshot / Test set =================
+def snapshot(net):
+    '''
+    Plain LeNet5 state_dict on the CPU, detached from training.
+    Pruned layers (weight_orig * weight_mask) are folded into weight.
+    '''
+    sd = net.state_dict()
+    out = {}
+    for k, v in sd.items():
+        if k.endswith("_mask"):
+            continue
+        if k.endswith("_orig"):
+            k = k[:-len("_orig")]
+            v = v * sd[k + "_mask"]
+        out[k] = v.detach().to("cpu", copy=True)
+    return out
+
+def load_test_set(data, root):
+    '''uint8 [N, 28, 28], int64 [N] test split, same source as train.py --data'''
+    if data == "cached":
+        images, labels = mnist_data.load_cached(root, "test")
+        return np.asarray(images), np.asarray(labels).astype(np.int64)
+    ds = torchvision.datasets.MNIST(root=root, train=False, download=True)
+    return ds.data.numpy(), ds.targets.numpy().astype(np.int64)
+
+# ================= Evaluation =================
+def accuracy(net, images, labels, batch=EVAL_BATCH):
+    '''images uint8 [N, 28, 28] scaled like transforms.ToTensor()'''
+    net.eval()
+    correct = 0
+    with torch.no_grad():
+        for start in range(0, len(images), batch):
+            x = torch.from_numpy(images[start:start + batch].astype(np.float32) / 255.0)[:, None]
+            correct += int((net(x).argmax(dim=1).numpy() == labels[start:start + batch]).sum())
+    return correct / len(images)
+
+def evaluate(sd, images, labels, layers=None):
+    '''(float accuracy, quantized accuracy) of one plain LeNet5 state_dict'''
+    net = LeNet5()
+    net.load_state_dict(sd)
+    qnet = QATLeNet5(layers or qat_layers())
+    qnet.load_state_dict(sd)
+    return accuracy(net, images, labels), accuracy(qnet, images, labels)
+
+def _eval_worker(jobs, results, data, root, layers, log_path, threads):
+    torch.set_num_threads(threads)
+    images, labels = load_test_set(data, root)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        epoch, sd, info = job
+        t0 = time.perf_counter()
+        float_acc, quant_acc = evaluate(sd, images, labels, layers)
+        record = dict(info, epoch=epoch, float_acc=float_acc, quant_acc=quant_acc,
+                      eval_seconds=round(time.perf_counter() - t0, 3), test_images=len(images), time=time.time())
+        if log_path:
+            with open(log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        results.put(record)
+
+class AsyncEvaluator:
+    '''
+    Background evaluation process (records come back in epoch order).
+        submit(epoch, net, info)  snapshot + enqueue, never waits for the evaluation
+        poll()                    records finished since the last call
+        close()                   wait for the pending epochs, return their records
+    '''
+    def __init__(self, data, root, layers=None, log_path=EVAL_LOG, threads=EVAL_THREADS):
+        if log_path:
+            open(log_path, "w").close()     # one log per run
+        ctx = mp.get_context("spawn")
+        self.jobs, self.results = ctx.Queue(), ctx.Queue()
+        self.pending = 0
+        self.proc = ctx.Process(target=_eval_worker, daemon=True,
+                                args=(self.jobs, self.results, data, root, layers, log_path, threads))
+        self.proc.start()
+
+    def submit(self, epoch, net, info=None):
+        self.jobs.put((epoch, snapshot(net), info or {}))
+        self.pending += 1
+
+    def poll(self):
+        records = []
+        while self.pending:
+            try:
+                records.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+            self.pending -= 1
+        return records
+
+    def close(self):
+        records = []
+        while self.pending and self.proc.is_alive():
+            try:
+                records.append(self.results.get(timeout=1.0))
+                self.pending -= 1
+            except queue.Empty:
+                pass
+        self.jobs.put(None)
+        self.proc.join()
+        return records
+
+# ================= Early stop =================
+class Plateau:
+    '''Stop once quant_acc has not improved by more than min_delta for `patience` evaluated epochs'''
+    def __init__(self, patience, min_delta=0.0):
+        self.patience, self.min_delta = patience, min_delta
+        self.best, self.best_epoch, self.stale = -1.0, 0, 0
+
+    def update(self, record):
+        if record["quant_acc"] > self.best + self.min_delta:
+            self.best, self.best_epoch, self.stale = record["quant_acc"], record["epoch"], 0
+        else:
+            self.stale += 1
+        return self.stopped
+
+    @property
+    def stopped(self):
+        return self.patience > 0 and self.stale >= self.patience
@@ -0,0 +1,224 @@
+'''
+ @Description: Per-layer quantization calibration for the INT8 datapath
+               - Searches every layer's weight scale, bias scale and >> shift
+                 on a calibration split, scoring each candidate with the
+                 batched golden model (verif/scripts/golden_model.py)
+               - Candidates of one layer are evaluated in parallel (process pool)
+               - Greedy per-layer coordinate descent, starting from the legacy
+                 export (Q1.7 conv / x64 FC, >> 8 everywhere)
+               - Writes the per-layer config for export_all.py --config and
+                 prints the shift values for lenet5_controller / fc_controller
+ @FilePath: /cnn/model/src/LeNet/calibrate.py
+'''
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+import export_all
+from LeNet5 import LeNet5
+
+# Golden model + MNIST reader (verif/scripts)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+import golden_model
+from golden_sweep import DATA_ROOT, load_mnist
+
+#==================== Configuration ==============
+# Search space per layer
+W_SCALES = [16.0, 32.0, 64.0, 128.0, 256.0]
+SHIFTS = list(range(16))        # cfg_quant_shift_o / fc_quant_shift_o are 5 bits
+# Bias scale: "legacy" = today's export (conv x128*128, FC x64*64 clamped to int8),
+# "matched" = input scale x weight scale of the layer (no clamp, 32-bit word)
+BIAS_MODES = ["legacy", "matched"]
+
+# Image is Q1.7 (input_image.hex / golden_model.quantize_images)
+IMAGE_SCALE = 128.0
+
+# Exporter layer -> golden_model layer (shift key)
+GOLDEN_LAYER = {"conv1": "l1", "conv2": "l2", "fc1": "fc1", "fc2": "fc2", "fc3": "fc3"}
+
+CALIB_LIMIT = 2000
+OUTPUT_PATH = os.path.join(export_all.SCRIPT_DIR, "quant_config.json")
+
+# ================= Candidate -> Params =================
+def legacy_setting(name):
+    cfg = export_all.LAYER_CONFIG[name]
+    return {"w_scale": cfg["w_scale"], "shift": cfg["shift"], "bias": "legacy"}
+
+def layer_config(settings):
+    '''
+    {layer: {w_scale, shift, bias}} -> export_all LAYER_CONFIG shape.
+    The matched bias scale follows the activation scale down the chain:
+    in_scale(next) = in_scale * w_scale / 2^shift.
+    '''
+    layers = {}
+    in_scale = IMAGE_SCALE
+    for name, s in settings.items():
+        legacy = export_all.LAYER_CONFIG[name]
+        if s["bias"] == "legacy":
+            b_scale, b_clamp = legacy["b_scale"], legacy["b_clamp"]
+        else:
+            b_scale, b_clamp = in_scale * s["w_scale"], False
+        layers[name] = {"w_scale": s["w_scale"], "b_scale": b_scale, "b_clamp": b_clamp, "shift": s["shift"]}
+        in_scale = in_scale * s["w_scale"] / 2 ** s["shift"]
+    return layers
+
+def init_arrays(files):
+    '''Exporter {file: (values, bits, lanes, ...)} -> {file: array as golden_model.load_params() reads it}'''
+    init = {}
+    for name, (values, bits, lanes, *_) in files.items():
+        if name not in golden_model.INIT_READ:
+            continue
+        want = golden_model.INIT_READ[name][1]
+        # Two's complement `bits` wide, like the hex word read back
+        half = 1 << (bits - 1)
+        arr = (np.asarray(values).reshape(-1, lanes) + half) % (2 * half) - half
+        # $readmemh zero-extends a narrow line into a wider word (conv2_bias.hex)
+        arr = np.pad(arr, ((0, 0), (0, want - lanes)))
+        init[name] = arr[:, 0] if want == 1 else arr
+    return init
+
+def quantized_params(sd, layers):
+    '''Golden model params + per-layer shifts exactly as export_all.py would write them'''
+    files = {}
+    files.update(export_all.conv1_files(sd, layers))
+    files.update(export_all.conv2_files(sd, layers))
+    files.update(export_all.fc_files(sd, layers))
+    shifts = {GOLDEN_LAYER[name]: cfg["shift"] for name, cfg in layers.items()}
+    return golden_model.params_from_init(init_arrays(files)), shifts
+
+# ================= Evaluation =================
+_worker = {}
+
+def _init_worker(sd, images, labels):
+    _worker.update(sd=sd, images=images, labels=labels)
+
+def _evaluate(settings):
+    params, shifts = quantized_params(_worker["sd"], layer_config(settings))
+    _, pred = golden_model.predict(_worker["images"], params, shifts)
+    return float((pred == _worker["labels"]).mean())
+
+def evaluate(sd, images, labels, settings):
+    '''Accuracy of one setting in this process'''
+    _init_worker(sd, images, labels)
+    return _evaluate(settings)
+
+def calibrate(sd, images, labels, workers, passes=1):
+    '''
+    Greedy coordinate descent over the layers.
+    Returns (best settings, baseline accuracy, best accuracy, {layer: [(w_scale, shift, bias, acc)]} of the last pass)
+    '''
+    best = {name: legacy_setting(name) for name in export_all.LAYER_CONFIG}
+    grids = {}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(sd, images, labels)) as pool:
+        baseline = best_acc = pool.submit(_evaluate, best).result()
+        for p in range(passes):
+            changed = False
+            for name in best:
+                cands = [(w, sh, bias) for bias in BIAS_MODES for w in W_SCALES for sh in SHIFTS]
+                trials = [dict(best, **{name: {"w_scale": w, "shift": sh, "bias": bias}}) for w, sh, bias in cands]
+                accs = list(pool.map(_evaluate, trials, chunksize=max(1, len(trials) // (4 * workers))))
+                grids[name] = [c + (a,) for c, a in zip(cands, accs)]
+                # Strictly better only: ties keep the current (legacy-closest) setting
+                i = int(np.argmax(accs))
+                if accs[i] > best_acc:
+                    best, best_acc, changed = trials[i], accs[i], True
+                print(f"  pass {p + 1} {name:<5}: w x{best[name]['w_scale']:g}, >> {best[name]['shift']}, "
+                      f"{best[name]['bias']} bias -> {best_acc:.2%}")
+            if not changed:
+                break
+    return best, baseline, best_acc, grids
+
+# ================= Report =================
+def print_grid(name, grid, chosen):
+    for bias in BIAS_MODES:
+        print(f"\n{name} ({bias} bias): accuracy by weight scale (rows) x >> shift (cols)")
+        print(f"{'':>6}" + "".join(f"{sh:>7}" for sh in SHIFTS))
+        for w in W_SCALES:
+            row = {sh: a for w2, sh, b, a in grid if w2 == w and b == bias}
+            cells = []
+            for sh in SHIFTS:
+                mark = "*" if (w, sh, bias) == (chosen["w_scale"], chosen["shift"], chosen["bias"]) else " "
+                cells.append(f"{100 * row[sh]:>6.1f}{mark}")
+            print(f"{'x' + format(w, 'g'):>6}" + "".join(cells))
+
+def print_controller(layers):
+    print("\nRTL shift values (replace the hard-coded 8):")
+    print(f"  control/lenet5_controller.sv  L1_RUN/L1_WAIT: cfg_quant_shift_o = {layers['conv1']['shift']};")
+    print(f"  control/lenet5_controller.sv  L2_RUN/L2_WAIT: cfg_quant_shift_o = {layers['conv2']['shift']};")
+    for name in ("fc1", "fc2", "fc3"):
+        state = name.upper()
+        print(f"  control/fc_controller.sv      {state}_RUN/{state}_WAIT: fc_quant_shift_o = 5'd{layers[name]['shift']};")
+
+# ================= Main Process =================
+def float_labels(sd, images_u8):
+    '''Float LeNet5 predictions (reference labels for --synthetic)'''
+    net = LeNet5()
+    net.load_state_dict({k: torch.from_numpy(v) for k, v in sd.items()})
+    net.eval()
+    with torch.no_grad():
+        x = torch.from_numpy(images_u8.astype(np.float32) / 255.0)[:, None]
+        return net(x).argmax(dim=1).numpy()
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-layer quantization scale / shift calibration")
+    parser.add_argument("--weights", default=export_all.WEIGHTS_PATH, help="float checkpoint")
+    parser.add_argument("--data-root", default=DATA_ROOT, help="torchvision MNIST root")
+    parser.add_argument("--limit", type=int, default=CALIB_LIMIT, help="calibration images (first N of the train split)")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="N random images labelled by the float model instead of MNIST")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--passes", type=int, default=2, help="max coordinate-descent passes over the layers")
+    parser.add_argument("--grid", action="store_true", help="print the full accuracy grid of every layer")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="config JSON for export_all.py --config")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        print(f"Error: {args.weights} not found! Please run train.py first")
+        sys.exit(1)
+    sd = export_all.load_state_dict(args.weights)
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        calib = rng.integers(0, 256, (args.synthetic, 28, 28), dtype=np.uint8)
+        test = rng.integers(0, 256, (args.synthetic, 28, 28), dtype=np.uint8)
+        calib_labels, test_labels = float_labels(sd, calib), float_labels(sd, test)
+    else:
+        calib, calib_labels = load_mnist(args.data_root, "train")
+        calib, calib_labels = calib[:args.limit], calib_labels[:args.limit]
+        test, test_labels = load_mnist(args.data_root, "test")
+    calib_q, test_q = golden_model.quantize_images(calib), golden_model.quantize_images(test)
+
+    print(f"Calibrating on {len(calib)} images, {len(W_SCALES) * len(SHIFTS) * len(BIAS_MODES)} candidates "
+          f"per layer, {args.workers} worker(s)")
+    t0 = time.perf_counter()
+    best, baseline, best_acc, grids = calibrate(sd, calib_q, calib_labels, args.workers, args.passes)
+    t1 = time.perf_counter()
+    layers = layer_config(best)
+
+    if args.grid:
+        for name, grid in grids.items():
+            print_grid(name, grid, best[name])
+
+    legacy = {name: legacy_setting(name) for name in export_all.LAYER_CONFIG}
+    test_base = evaluate(sd, test_q, test_labels, legacy)
+    test_best = evaluate(sd, test_q, test_labels, best)
+    print(f"\n{'Layer':<6} {'w_scale':>8} {'b_scale':>10} {'b_clamp':>8} {'shift':>6}")
+    for name, cfg in layers.items():
+        print(f"{name:<6} {cfg['w_scale']:>8g} {cfg['b_scale']:>10g} {str(cfg['b_clamp']):>8} {cfg['shift']:>6}")
+    print(f"Calibration accuracy: {baseline:.2%} (legacy) -> {best_acc:.2%} ({t1 - t0:.1f} s)")
+    print(f"Held-out accuracy   : {test_base:.2%} (legacy) -> {test_best:.2%} ({len(test)} images)")
+    print_controller(layers)
+
+    with open(args.output, "w") as f:
+        json.dump({"layers": layers, "calib_images": len(calib), "calib_accuracy": best_acc,
+                   "legacy_accuracy": baseline, "test_accuracy": test_best}, f, indent=1)
+    print(f"\nConfig written to {os.path.abspath(args.output)} (python export_all.py --config {args.output})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+'''
+ @Description: Single-pass exporter: export_conv1.py + export_conv2.py + export_fc.py
+               - Loads lenet_weights.pth once
+               - Quantizes every tensor with numpy (no per-element .item() loops)
+               - Writes all .hex init files concurrently (temp file + atomic rename)
+               - Skips files whose inputs are unchanged (content-hash export cache)
+               Output is byte-identical to running the three scripts in order
+               (default LAYER_CONFIG; --config takes a calibrate.py JSON).
+ @FilePath: /cnn/model/src/LeNet/export_all.py
+'''
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+# Shared $readmemh codec + memmap bundle (verif/scripts/init_bundle.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+import hex_codec
+import init_bundle
+from init_bundle import write_init_files
+
+#==================== Configuration ==============
+# Conv: Q1.7 weights / image, Q14 bias (export_conv1.py, export_conv2.py)
+CONV_SCALE = 128.0
+# FC: weights x64, bias x64*64 clamped to int8 like export_fc.quantize()
+FC_SCALE = 64.0
+
+# Per-layer quantization (defaults = the scales above, i.e. the legacy export).
+# w_scale / b_scale: weight / bias multiplier, b_clamp: clamp the bias to int8,
+# shift: >> after ReLU/pool (RTL cfg_quant_shift_o / fc_quant_shift_o, not exported).
+# calibrate.py writes a JSON of this shape for --config.
+LAYER_CONFIG = {
+    "conv1": {"w_scale": CONV_SCALE, "b_scale": CONV_SCALE * CONV_SCALE, "b_clamp": False, "shift": 8},
+    "conv2": {"w_scale": CONV_SCALE, "b_scale": CONV_SCALE * CONV_SCALE, "b_clamp": False, "shift": 8},
+    "fc1"  : {"w_scale": FC_SCALE, "b_scale": FC_SCALE * FC_SCALE, "b_clamp": True, "shift": 8},
+    "fc2"  : {"w_scale": FC_SCALE, "b_scale": FC_SCALE * FC_SCALE, "b_clamp": True, "shift": 8},
+    "fc3"  : {"w_scale": FC_SCALE, "b_scale": FC_SCALE * FC_SCALE, "b_clamp": True, "shift": 8},
+}
+
+# Conv2 is exported in 3 passes of 6 output channels
+K_CHANNELS = 6
+CONV2_GROUPS = 3
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+WEIGHTS_PATH = os.path.join(SCRIPT_DIR, "lenet_weights.pth")
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "../../../hardware/rtl/init_files")
+
+# Export cache: {file: {key, src}} next to the .hex files
+CACHE_NAME = ".export_cache.json"
+
+# Every output file (the packing layout itself is keyed by EXPORTER_SOURCES)
+EXPORT_FILES = [
+    "conv1_weights.hex", "conv1_bias.hex", "input_image.hex",
+    "conv2_weights.hex", "conv2_bias.hex", "conv2_bias_burst.hex",
+    "fc1_weights.hex", "fc1_bias.hex", "fc2_weights.hex", "fc2_bias.hex", "fc3_weights.hex", "fc3_bias.hex",
+]
+
+# ================= Quantization =================
+def quantize(x, scale, clamp=True):
+    '''
+    Vectorized round(x * scale) (round half to even, like Python round() and
+    torch.round()), optionally clamped to int8. Returns int64.
+    '''
+    q = np.round(np.asarray(x, dtype=np.float64) * scale)
+    if clamp:
+        q = np.clip(q, -128, 127)
+    return q.astype(np.int64)
+
+def test_image():
+    '''Deterministic ramp ((y*28+x) % 255) / 255 used by export_conv1.py, float32 [28, 28]'''
+    idx = np.arange(28 * 28)
+    return ((idx % 255) / 255.0).astype(np.float32).reshape(28, 28)
+
+def conv1_files(sd, layers=LAYER_CONFIG):
+    # Weights [6, 1, 5, 5] -> 25 lines (r, s), Lane k = Out_Ch k
+    cfg = layers["conv1"]
+    w = quantize(sd["features.0.weight"], cfg["w_scale"])
+    b = quantize(sd["features.0.bias"], cfg["b_scale"], clamp=cfg["b_clamp"])
+    lanes = w[:, 0].reshape(w.shape[0], -1).T
+    return {
+        "conv1_weights.hex": (lanes, 8, w.shape[0], False, False),
+        "conv1_bias.hex"   : (b, 32, 1, False, False),
+        "input_image.hex"  : (quantize(test_image(), CONV_SCALE).ravel(), 8, 1, False, False),
+    }
+
+def conv2_files(sd, layers=LAYER_CONFIG):
+    # Weights [16, 6, 5, 5] -> 450 lines: Group -> In_Ch -> R -> S, Lane k = Out_Ch (Group*6 + k)
+    cfg = layers["conv2"]
+    w = quantize(sd["features.3.weight"], cfg["w_scale"])
+    b = quantize(sd["features.3.bias"], cfg["b_scale"], clamp=cfg["b_clamp"])
+    n_pad = CONV2_GROUPS * K_CHANNELS - w.shape[0]
+    w = np.pad(w, ((0, n_pad), (0, 0), (0, 0), (0, 0)))
+    lanes = w.reshape(CONV2_GROUPS, K_CHANNELS, *w.shape[1:]).transpose(0, 2, 3, 4, 1).reshape(-1, K_CHANNELS)
+    b = np.pad(b, (0, n_pad))
+    return {
+        "conv2_weights.hex"   : (lanes, 8, K_CHANNELS, False, False),
+        "conv2_bias.hex"      : (b, 32, 1, False, False),
+        # Single-burst load: one bias_buffer word (6 x 32b) per Group
+        "conv2_bias_burst.hex": (b.reshape(CONV2_GROUPS, K_CHANNELS), 32, K_CHANNELS, False, False),
+    }
+
+def fc_files(sd, layers=LAYER_CONFIG):
+    files = {}
+    for name, idx in [("fc1", 1), ("fc2", 3), ("fc3", 5)]:
+        cfg = layers[name]
+        w = quantize(sd[f"classifier.{idx}.weight"], cfg["w_scale"])
+        b = quantize(sd[f"classifier.{idx}.bias"], cfg["b_scale"], clamp=cfg["b_clamp"])
+        files[f"{name}_weights.hex"] = (w.ravel(), 8, 1, True, True)
+        files[f"{name}_bias.hex"] = (b, 32, 1, True, True)
+    return files
+
+def load_layer_config(path):
+    """LAYER_CONFIG with the per-layer overrides of a calibrate.py JSON ({"layers": {name: {...}}})"""
+    try:
+        with open(path) as f:
+            overrides = json.load(f).get("layers", {})
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: cannot read quantization config {path}: {e}")
+        sys.exit(1)
+    unknown = set(overrides) - set(LAYER_CONFIG)
+    if unknown:
+        print(f"Error: unknown layer(s) in {path}: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    return {name: dict(cfg, **overrides.get(name, {})) for name, cfg in LAYER_CONFIG.items()}
+
+def load_state_dict(path):
+    try:
+        sd = torch.load(path, map_location="cpu", weights_only=False)
+    except TypeError:
+        sd = torch.load(path, map_location="cpu")
+    if hasattr(sd, "state_dict"):
+        sd = sd.state_dict()
+    return {k: v.detach().cpu().numpy() for k, v in sd.items()}
+
+# ================= Export Cache =================
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _scales(layers):
+    """LAYER_CONFIG without the shifts (they live in the controllers, not in the files)"""
+    return {name: {k: v for k, v in cfg.items() if k != "shift"} for name, cfg in layers.items()}
+
+def exporter_hash():
+    """
+    sha256 of the code that quantizes, packs and formats the files (this script,
+    init_bundle.py, hex_codec.py): any edit to it invalidates every cached file
+    """
+    h = hashlib.sha256()
+    for path in (os.path.abspath(__file__), init_bundle.__file__, hex_codec.__file__):
+        h.update(file_sha256(path).encode())
+    return h.hexdigest()
+
+def cache_keys(ckpt_hash, layers=LAYER_CONFIG):
+    """Per-file key = sha256(checkpoint, quantization config, exporter code, file name)"""
+    config = json.dumps({"CONV_SCALE": CONV_SCALE, "FC_SCALE": FC_SCALE,
+                         "K_CHANNELS": K_CHANNELS, "CONV2_GROUPS": CONV2_GROUPS}, sort_keys=True)
+    # Per-layer scales only when they differ from the legacy export
+    if _scales(layers) != _scales(LAYER_CONFIG):
+        config += json.dumps(_scales(layers), sort_keys=True)
+    code = exporter_hash()
+    return {name: hashlib.sha256("\n".join([ckpt_hash, config, code, name]).encode()).hexdigest()
+            for name in EXPORT_FILES}
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def load_cache(out_dir):
+    try:
+        with open(os.path.join(out_dir, CACHE_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_cache(out_dir, cache):
+    path = os.path.join(out_dir, CACHE_NAME)
+    tmp = path + f".tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def stale_files(out_dir, cache, keys):
+    """Files whose key changed, or that were deleted / rewritten by something else since the export"""
+    stale = []
+    for name, key in keys.items():
+        path = os.path.join(out_dir, name)
+        entry = cache.get(name, {})
+        if entry.get("key") != key or not os.path.exists(path) or entry.get("src") != _stat(path):
+            stale.append(name)
+    return stale
+
+# ================= Main Process =================
+def main():
+    parser = argparse.ArgumentParser(description="Export all LeNet-5 init files in one pass")
+    parser.add_argument("--force", action="store_true", help="ignore the export cache and rewrite every file")
+    parser.add_argument("--config", default=None, help="per-layer quantization JSON from calibrate.py")
+    args = parser.parse_args()
+    layers = load_layer_config(args.config) if args.config else LAYER_CONFIG
+
+    try:
+        ckpt_hash = file_sha256(WEIGHTS_PATH)
+    except FileNotFoundError:
+        print("Error: lenet_weights.pth not found! Please run train.py first")
+        sys.exit(1)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    keys = cache_keys(ckpt_hash, layers)
+    cache = {} if args.force else load_cache(OUTPUT_DIR)
+    stale = stale_files(OUTPUT_DIR, cache, keys)
+    if not stale:
+        print(f"All {len(keys)} init files up to date in {os.path.abspath(OUTPUT_DIR)}, nothing to export.")
+        return
+
+    print(f"Loading model: {WEIGHTS_PATH}")
+    sd = load_state_dict(WEIGHTS_PATH)
+
+    t0 = time.perf_counter()
+    files = {}
+    files.update(conv1_files(sd, layers))
+    files.update(conv2_files(sd, layers))
+    files.update(fc_files(sd, layers))
+    files = {name: files[name] for name in stale}
+    counts = write_init_files(OUTPUT_DIR, files)
+    t1 = time.perf_counter()
+
+    for name in files:
+        cache[name] = {"key": keys[name], "src": _stat(os.path.join(OUTPUT_DIR, name))}
+    save_cache(OUTPUT_DIR, cache)
+
+    for name in files:
+        print(f"Exported {name}: {counts[name]} lines.")
+    print(f"Skipped {len(keys) - len(files)} up-to-date file(s).")
+    print(f"All files exported to: {os.path.abspath(OUTPUT_DIR)} ({1e3 * (t1 - t0):.1f} ms)")
+
+if __name__ == "__main__":
+    main()
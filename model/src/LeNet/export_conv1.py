@@ -12,9 +12,14 @@
 import torch
 import torch.nn as nn
 import os
+import sys
 import numpy as np
 from LeNet5 import LeNet5
 
+# Shared $readmemh codec + memmap bundle (verif/scripts/init_bundle.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+from init_bundle import write_init_hex
+
 #==================== Configuration ==============
 # 1. Quantization Setup (Q1.7 fixed point)
 SCALE_BITS = 7
@@ -38,27 +43,14 @@ def to_fixed(value, scale):
     int_val = max(min(int_val, 127), -128)
     return int_val
 
-def to_hex(val, width=8):
-    '''
-    Convert Integer to Hex string (Handle 2's complement)
+def write_hex_file(filename, values, bits=8, lanes=1):
     '''
-    mask = (1 << width) - 1
-    # Format: 2 hex chars for 8-bit, 8 hex chars for 32-bit
-    return f"{(val & mask):0{width//4}x}"
-
-def write_hex_file(filename, data_list):
-    '''
-    Helper to write list of hex strings to file without trailing newline
+    Helper to write integers (2's complement) to a hex file without trailing newline
+    values: [Lines] or [Lines, Lanes] (Lane0 -> LSB)
     '''
     path = os.path.join(OUTPUT_DIR, filename)
-    with open(path, 'w') as f:
-        for i, hex_str in enumerate(data_list):
-            # Write newline only if it's NOT the last line
-            if i < len(data_list) - 1:
-                f.write(hex_str + "\n")
-            else:
-                f.write(hex_str) # Last line, no newline
-    print(f"Exported {filename}: {len(data_list)} lines.")
+    n_lines = write_init_hex(path, values, bits, lanes, trailing_newline=False)
+    print(f"Exported {filename}: {n_lines} lines.")
 
 # ================= Main Process =================
 def main():
@@ -94,15 +86,14 @@ def main():
         for s in range(S):
             # For each spatial position, pack 6 output channels (K=0..5)
             # Order: MSB -> Ch5 ... Ch0 -> LSB
-            line_hex = ""
-            for k in range(K-1, -1, -1): # 5 down to 0
+            line_vals = []
+            for k in range(K):
                 val_float = w_tensor[k, 0, r, s].item()
-                val_int = to_fixed(val_float, SCALE_FACTOR)
-                line_hex += to_hex(val_int, 8)
+                line_vals.append(to_fixed(val_float, SCALE_FACTOR))
 
-            hex_lines.append(line_hex)
+            hex_lines.append(line_vals)
 
-    write_hex_file("conv1_weights.hex", hex_lines)
+    write_hex_file("conv1_weights.hex", hex_lines, 8, K)
 
     # Export Bias (Optional, for Acc Init)
     # Bias is usually 32-bit (Accumulator width)
@@ -112,9 +103,9 @@ def main():
         val_float = b_tensor[k].item()
         # Bias Scale = Scale_In * Scale_W = 128 * 128 = 16384 (Q14)
         val_int = int(round(val_float * (SCALE_FACTOR * SCALE_FACTOR)))
-        bias_lines.append(to_hex(val_int, 32))
+        bias_lines.append(val_int)
 
-    write_hex_file("conv1_bias.hex", bias_lines)
+    write_hex_file("conv1_bias.hex", bias_lines, 32)
 
 
     # ---------------------------------------------------------
@@ -138,7 +129,7 @@ def main():
         for x in range(28):
             val_float = img_tensor[0, y, x].item()
             val_int = to_fixed(val_float, SCALE_FACTOR)
-            img_lines.append(to_hex(val_int, 8))
+            img_lines.append(val_int)
 
     write_hex_file("input_image.hex", img_lines)
 
@@ -168,14 +159,13 @@ def main():
             for s in range(S2):
                 # 在每个空间位置 (r,s)，我们要一次性取出 6 个输入通道的权重
                 # Pack: MSB -> InCh5 ... InCh0 -> LSB
-                line_hex = ""
-                for in_ch in range(C2-1, -1, -1): # 5 down to 0
+                line_vals = []
+                for in_ch in range(C2):
                     val_float = w2_tensor[out_ch, in_ch, r, s].item()
-                    val_int = to_fixed(val_float, SCALE_FACTOR)
-                    line_hex += to_hex(val_int, 8)
-                conv2_hex_lines.append(line_hex)
+                    line_vals.append(to_fixed(val_float, SCALE_FACTOR))
+                conv2_hex_lines.append(line_vals)
 
-    write_hex_file("conv2_weights.hex", conv2_hex_lines)
+    write_hex_file("conv2_weights.hex", conv2_hex_lines, 8, C2)
 
     # Export Conv2 Bias
     b2_tensor = net.features[3].bias.data
@@ -213,9 +203,9 @@ def main():
     for k in range(K2):
         val_float = b2_tensor[k].item()
         val_int = int(round(val_float * (SCALE_FACTOR * SCALE_FACTOR)))
-        bias2_lines_flat.append(to_hex(val_int, 32))
+        bias2_lines_flat.append(val_int)
 
-    write_hex_file("conv2_bias.hex", bias2_lines_flat)
+    write_hex_file("conv2_bias.hex", bias2_lines_flat, 32)
 
     print(f"All files exported to: {os.path.abspath(OUTPUT_DIR)}")
 
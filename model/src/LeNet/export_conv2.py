@@ -6,16 +6,18 @@
  @Description:
  @FilePath: /cnn/model/src/LeNet/export_conv2.py
 '''
+import os
+import sys
 import torch
 import numpy as np
 
+# Shared $readmemh codec + memmap bundle (verif/scripts/init_bundle.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+from init_bundle import write_init_hex
+
 # 配置
 SCALE_FACTOR = 128.0
 
-def to_hex(val, width=8):
-    mask = (1 << width) - 1
-    return f"{(val & mask):0{width//4}x}"
-
 def to_fixed(val):
     int_val = int(round(val * SCALE_FACTOR))
     return max(min(int_val, 127), -128)
@@ -49,12 +51,12 @@ def export_conv2():
                 for s in range(5):
                     # 构造 48-bit 宽字
                     # 包含当前 Group 的 6 个输出通道的权重
-                    line_hex = ""
+                    line_vals = []
 
-                    # 倒序遍历 6 个输出位置 (MSB=Ch5, LSB=Ch0 relative to group)
+                    # 遍历 6 个输出位置, write_hex 负责打包 (MSB=Ch5, LSB=Ch0 relative to group)
                     # 之前的经验：Row 0 对应 LSB。Row 0 是 Group 中的第 0 个通道。
                     # 所以我们要把 Group+5 放在 MSB，Group+0 放在 LSB。
-                    for k in range(5, -1, -1):
+                    for k in range(6):
                         out_ch = start_ch + k
 
                         if out_ch < 16:
@@ -63,13 +65,12 @@ def export_conv2():
                         else:
                             fixed = 0 # Padding for last group
 
-                        line_hex += to_hex(fixed, 8)
+                        line_vals.append(fixed)
 
-                    hex_lines.append(line_hex)
+                    hex_lines.append(line_vals)
 
-    # 保存文件
-    with open("../../../hardware/rtl/init_files/conv2_weights.hex", "w") as f:
-        f.write("\n".join(hex_lines))
+    # 保存文件 (Lane0 -> LSB)
+    write_init_hex("../../../hardware/rtl/init_files/conv2_weights.hex", hex_lines, 8, 6, trailing_newline=False)
     print("Saved conv2_weights.hex")
 
     # 导出 Bias (同样按 Group 分组)
@@ -102,11 +103,17 @@ def export_conv2():
                 fixed = int(round(val * 128 * 128))
             else:
                 fixed = 0
-            bias_lines.append(to_hex(fixed, 32))
+            bias_lines.append(fixed)
 
-    with open("../../../hardware/rtl/init_files/conv2_bias.hex", "w") as f:
-        f.write("\n".join(bias_lines))
+    write_init_hex("../../../hardware/rtl/init_files/conv2_bias.hex", bias_lines, 32, trailing_newline=False)
     print("Saved conv2_bias.hex")
 
+    # Single-burst 模式: 3 个 Group 的 Bias 一次性加载到 bias_buffer 的不同地址
+    # 每行是一个完整的 bias_buffer word (6 x 32-bit, Lane k = Group*6 + k)
+    # Weights 不用改: conv2_weights.hex 本来就是 Group 连续存放 (Group g 在第 g*150 行)
+    burst_lines = [bias_lines[group * 6:(group + 1) * 6] for group in range(3)]
+    write_init_hex("../../../hardware/rtl/init_files/conv2_bias_burst.hex", burst_lines, 32, 6, trailing_newline=False)
+    print("Saved conv2_bias_burst.hex")
+
 if __name__ == "__main__":
     export_conv2()
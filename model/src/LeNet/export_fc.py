@@ -1,7 +1,15 @@
+import argparse
 import torch
 import torch.nn as nn
 import numpy as np
 import os
+import sys
+
+# Shared $readmemh codec + memmap bundle (verif/scripts/init_bundle.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+from init_bundle import write_init_hex
+import int4_pack
+import sparse_stream
 
 # 定义你的模型结构以便加载权重
 class LeNet5(nn.Module):
@@ -34,27 +42,78 @@ def write_linear_hex_file(filepath, data_array):
     导出线性 Hex 文件 (每行 1 个字节)
     data_array: numpy array or list of integers
     """
-    # 展平数组 (Flatten)
-    flat_data = data_array.flatten()
-
-    with open(filepath, 'w') as f:
-        for val in flat_data:
-            # 确保是 8-bit (两位 Hex)
-            val = val & 0xFF
-            f.write(f"{val:02X}\n")
+    # 展平数组 (Flatten), 8-bit (两位 Hex)
+    flat_data = np.asarray(data_array).flatten()
+    write_init_hex(filepath, flat_data, 8, upper=True)
     print(f"Exported: {filepath} (Count: {len(flat_data)})")
 
 def write_bias_file(filepath, data_list):
     """
     导出 Bias (每行 1 个 32-bit 数据)
     """
-    with open(filepath, 'w') as f:
-        for val in data_list:
-            val = val & 0xFFFFFFFF
-            f.write(f"{val:08X}\n")
+    write_init_hex(filepath, data_list, 32, upper=True)
     print(f"Exported: {filepath}")
 
+def write_int4_files(output_dir, name, w_scaled, mode):
+    """
+    INT4 模式: 每字节打包 2 个权重 + 每行 (row) / 每层 (layer) 的 2^e 缩放
+    w_scaled: float [Out, In], 已乘 Q_SCALE
+    返回 (INT8 字节数, INT4 字节数, INT8 RMS 误差, INT4 RMS 误差), 误差以 INT8 LSB 计
+    """
+    q4, exps = int4_pack.quantize_int4(w_scaled, mode)
+    packed = int4_pack.pack(q4)
+    write_init_hex(os.path.join(output_dir, int4_pack.weight_file(name)), packed, 8, upper=True)
+    write_init_hex(os.path.join(output_dir, int4_pack.exp_file(name)), exps, 8, upper=True)
+    print(f"Exported: {int4_pack.weight_file(name)} (Count: {len(packed)}), {int4_pack.exp_file(name)} (Count: {len(exps)})")
+
+    w8 = np.clip(np.round(w_scaled), -128, 127)
+    rms8 = np.sqrt(np.mean((w8 - w_scaled) ** 2))
+    rms4 = np.sqrt(np.mean((int4_pack.expand(q4, exps) - w_scaled) ** 2))
+    return w8.size, len(packed) + len(exps), rms8, rms4
+
+def print_int4_report(report, mode):
+    """FC 权重流量: INT8 vs INT4 (fc_accelerator_top 每周期读取一个权重向量)"""
+    print(f"\nINT4 ({mode} scale) vs INT8 weight traffic:")
+    print(f"{'Layer':<6} {'INT8 B':>8} {'INT4 B':>8} {'Saved':>7} {'RMS8':>6} {'RMS4':>6}")
+    for name, (b8, b4, rms8, rms4) in report.items():
+        print(f"{name:<6} {b8:>8} {b4:>8} {1 - b4 / b8:>7.1%} {rms8:>6.3f} {rms4:>6.3f}")
+    b8, b4 = sum(r[0] for r in report.values()), sum(r[1] for r in report.values())
+    print(f"{'Total':<6} {b8:>8} {b4:>8} {1 - b4 / b8:>7.1%}   (RMS error in INT8 LSB)")
+    print("Cycle impact when the stream is bandwidth-bound: verif/scripts/fc_stream_sim.py --int4")
+
+def write_sparse_files(output_dir, name, w_q, fmt):
+    """
+    剪枝后的 FC1: 按 fc_accelerator_top 的 100-neuron batch 压缩权重流 (sparse_stream.py)
+    w_q: 量化后的 int [Out, In]. 返回 stream_stats() + 实际写出的字节数
+    """
+    stream, offsets = sparse_stream.encode(w_q, fmt)
+    # Bit-exact: 解码必须还原 fc*_weights.hex 的内容
+    if not np.array_equal(sparse_stream.decode(stream, *w_q.shape), w_q):
+        print(f"[Error] {name}: compressed stream does not decode to the dense weights")
+        sys.exit(1)
+    write_init_hex(os.path.join(output_dir, sparse_stream.stream_file(name)), stream, 8, upper=True)
+    write_init_hex(os.path.join(output_dir, sparse_stream.index_file(name)), offsets, 32, upper=True)
+    print(f"Exported: {sparse_stream.stream_file(name)} (Count: {len(stream)}), "
+          f"{sparse_stream.index_file(name)} (Count: {len(offsets)})")
+    return dict(sparse_stream.stream_stats(w_q), written=len(stream) + 4 * len(offsets))
+
+def print_sparse_report(name, stats, fmt, other_bytes):
+    """每张图片 DRAM -> FC core 的权重字节数: dense vs 压缩流"""
+    dense, sparse = stats["dense"] + other_bytes, stats["written"] + other_bytes
+    print(f"\n{name.upper()} sparsity {stats['sparsity']:.1%} ({stats['nnz']} non-zero), "
+          f"stream bytes: dense {stats['dense']}, mask {stats['mask']}, csr {stats['csr']} (written: {fmt} + index)")
+    print(f"CALC_STREAM cycles ({name.upper()}, all batches): {stats['cycles_dense']} -> {stats['cycles_sparse']} "
+          f"(all-zero columns skipped)")
+    print(f"FC weight bytes per image: {dense} -> {sparse} ({1 - sparse / dense:.1%} saved)")
+
 def main():
+    parser = argparse.ArgumentParser(description="Export FC weights/bias (linear hex)")
+    parser.add_argument("--int4", choices=int4_pack.MODES, default=None,
+                        help="also export INT4 packed weights with a per-row or per-layer scale")
+    parser.add_argument("--sparse", choices=sparse_stream.FORMATS, default=None,
+                        help="also export FC1 as a compressed stream (pruned model, train.py --prune)")
+    args = parser.parse_args()
+
     # ======================================================
     # 1. 路径自动定位
     # ======================================================
@@ -125,5 +184,21 @@ def main():
 
     print("All FC weights exported successfully (Linear 8-bit format).")
 
+    # ======================================================
+    # 4. INT4 Packed Weights (optional, bias / shift unchanged)
+    # ======================================================
+    if args.int4:
+        report = {}
+        for name, w in [("fc1", fc1_w), ("fc2", fc2_w), ("fc3", fc3_w)]:
+            report[name] = write_int4_files(output_dir, name, w.numpy().astype(np.float64) * Q_SCALE, args.int4)
+        print_int4_report(report, args.int4)
+
+    # ======================================================
+    # 5. Compressed FC1 Stream (optional, pruned model)
+    # ======================================================
+    if args.sparse:
+        stats = write_sparse_files(output_dir, "fc1", fc1_w_q, args.sparse)
+        print_sparse_report("fc1", stats, args.sparse, fc2_w_q.size + fc3_w_q.size)
+
 if __name__ == "__main__":
     main()
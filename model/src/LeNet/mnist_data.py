@@ -0,0 +1,86 @@
+'''
+ @Description: In-memory uint8 MNIST for train.py (--data cached)
+               - Decodes MNIST once (torchvision) into a uint8 .npy cache per split
+               - Memory-maps the cache; a batch is one index into the tensor,
+                 no per-sample PIL decode / ToTensor
+               - Same float values as transforms.ToTensor(): uint8 / 255
+ @FilePath: /cnn/model/src/LeNet/mnist_data.py
+'''
+import os
+
+import numpy as np
+import torch
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
+from torch.utils.data.distributed import DistributedSampler
+import torchvision
+
+#==================== Configuration ==============
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Same directory as train.py's root="../../data" when run from model/src/LeNet
+DATA_ROOT = os.path.join(SCRIPT_DIR, "../../data")
+CACHE_DIR = "MNIST/cache"
+
+# ================= Cache =================
+def cache_paths(root, split):
+    base = os.path.join(root, CACHE_DIR, split)
+    return base + "_images_u8.npy", base + "_labels_u8.npy"
+
+def _save_atomic(path, arr):
+    tmp = path + f".tmp{os.getpid()}.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+def build_cache(root, split):
+    '''Decode the torchvision MNIST split once into uint8 [N, 28, 28] / [N] .npy files'''
+    ds = torchvision.datasets.MNIST(root=root, train=(split == "train"), download=True)
+    images_path, labels_path = cache_paths(root, split)
+    os.makedirs(os.path.dirname(images_path), exist_ok=True)
+    _save_atomic(images_path, ds.data.numpy().astype(np.uint8))
+    _save_atomic(labels_path, ds.targets.numpy().astype(np.uint8))
+    return images_path, labels_path
+
+def load_cached(root=DATA_ROOT, split="train"):
+    '''(images uint8 [N, 28, 28], labels uint8 [N]) memory-mapped, building the cache if missing'''
+    images_path, labels_path = cache_paths(root, split)
+    if not (os.path.exists(images_path) and os.path.exists(labels_path)):
+        print(f"Building uint8 MNIST cache ({split}) in {os.path.dirname(images_path)} ...")
+        build_cache(root, split)
+    return np.load(images_path, mmap_mode="r"), np.load(labels_path, mmap_mode="r")
+
+# ================= Batches =================
+class CachedMNIST(Dataset):
+    '''
+    Indexed by a list of sample indices (one batch), returns
+    (float32 [B, 1, 28, 28] in [0, 1], int64 [B]).
+    The memmap is opened lazily so every DataLoader worker maps the file itself.
+    '''
+    def __init__(self, root=DATA_ROOT, split="train"):
+        self.root, self.split = root, split
+        self.n = len(load_cached(root, split)[1])
+        self._arrays = None
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, idx):
+        if self._arrays is None:
+            self._arrays = load_cached(self.root, self.split)
+        images, labels = self._arrays
+        idx = np.asarray(idx)
+        x = torch.from_numpy(images[idx]).to(torch.float32).div_(255.0).unsqueeze_(1)
+        return x, torch.from_numpy(labels[idx].astype(np.int64))
+
+def make_loader(root=DATA_ROOT, split="train", batch_size=256, shuffle=True, workers=0, pin_memory=False,
+                rank=0, world_size=1):
+    '''
+    DataLoader over whole batches: the sampler yields index lists, the dataset
+    slices the cached tensor once per batch (workers build batches in parallel).
+    world_size > 1: only this rank's 1/world_size shard (DistributedSampler, set_epoch() per epoch).
+    '''
+    ds = CachedMNIST(root, split)
+    if world_size > 1:
+        base = DistributedSampler(ds, num_replicas=world_size, rank=rank, shuffle=shuffle)
+    else:
+        base = RandomSampler(ds) if shuffle else SequentialSampler(ds)
+    return DataLoader(ds, sampler=BatchSampler(base, batch_size, drop_last=False), batch_size=None,
+                      num_workers=workers, pin_memory=pin_memory, persistent_workers=workers > 0)
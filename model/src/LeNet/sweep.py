@@ -0,0 +1,209 @@
+'''
+ @Description: Hyperparameter / quantization sweep on a local process pool
+               - Grid over learning rate, epochs, conv SCALE_FACTOR, FC Q_SCALE,
+                 per-layer >> shifts and seeds (optionally QAT training)
+               - Each job: train LeNet5 -> export in memory (export_all layer
+                 config, no .hex) -> batched golden model on the test set
+               - One JSON row per finished job appended to a shared results
+                 file; a rerun skips the jobs already in it (resume)
+ @FilePath: /cnn/model/src/LeNet/sweep.py
+'''
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+
+import numpy as np
+import torch
+
+import calibrate
+import export_all
+import mnist_data
+from async_eval import accuracy, load_test_set
+from LeNet5 import LeNet5, QATLeNet5, QUANT_SHIFT
+from train import BATCH_SIZE, train_epoch
+
+# Golden model (verif/scripts)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../verif/scripts"))
+import golden_model
+
+#==================== Configuration ==============
+RESULTS_PATH = "sweep_results.jsonl"
+# Fields that identify a job (resume key)
+SPEC_KEYS = ["lr", "epochs", "scale_factor", "q_scale", "shifts", "seed", "qat"]
+# The image stays Q1.7 (golden_model.SCALE_FACTOR), SCALE_FACTOR only rescales conv weights / bias
+CONV_LAYERS = ("conv1", "conv2")
+
+# ================= Grid =================
+def parse_list(text, cast):
+    return [cast(v) for v in text.split(",") if v.strip()]
+
+def parse_shifts(text):
+    '''"7" -> every layer >> 7, "conv2=7,fc1=9" -> those layers, the rest QUANT_SHIFT'''
+    if "=" not in text:
+        return {name: int(text) for name in export_all.LAYER_CONFIG}
+    shifts = {name: QUANT_SHIFT for name in export_all.LAYER_CONFIG}
+    for item in text.split(","):
+        name, value = item.split("=")
+        if name not in shifts:
+            print(f"Error: unknown layer '{name}' in --shifts {text} (layers: {', '.join(shifts)})")
+            sys.exit(1)
+        shifts[name] = int(value)
+    return shifts
+
+def job_key(spec):
+    return json.dumps({k: spec[k] for k in SPEC_KEYS}, sort_keys=True)
+
+def layer_config(spec):
+    '''
+    Job -> export_all LAYER_CONFIG, as if SCALE_FACTOR (export_conv1/2) and
+    Q_SCALE (export_fc) had been edited: bias scale = scale^2, FC bias still clamped
+    '''
+    layers = {}
+    for name, cfg in export_all.LAYER_CONFIG.items():
+        scale = spec["scale_factor"] if name in CONV_LAYERS else spec["q_scale"]
+        layers[name] = dict(cfg, w_scale=scale, b_scale=scale * scale, shift=spec["shifts"][name])
+    return layers
+
+# ================= Job =================
+_worker = {}
+
+def _init_worker(data_root, batch_size, threads):
+    torch.set_num_threads(threads)
+    images, labels = load_test_set("cached", data_root)
+    _worker.update(data_root=data_root, batch_size=batch_size, test_images=images, test_labels=labels,
+                   test_q=golden_model.quantize_images(images))
+
+def run_job(spec):
+    '''train -> in-memory export -> golden evaluation, returns one result row'''
+    t0 = time.perf_counter()
+    torch.manual_seed(spec["seed"])
+    layers = layer_config(spec)
+    net = QATLeNet5(layers) if spec["qat"] else LeNet5()
+    train_iter = mnist_data.make_loader(_worker["data_root"], "train", _worker["batch_size"], True)
+    loss = torch.nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(net.parameters(), lr=spec["lr"])
+    avg_loss = float("nan")
+    for _ in range(spec["epochs"]):
+        running_loss, batches, _ = train_epoch(net, train_iter, loss, optimizer, torch.device("cpu"))
+        avg_loss = running_loss / batches
+    t1 = time.perf_counter()
+
+    sd = {k: v.detach().numpy() for k, v in net.state_dict().items()}
+    params, shifts = calibrate.quantized_params(sd, layers)
+    _, pred = golden_model.predict(_worker["test_q"], params, shifts)
+    plain = LeNet5()
+    plain.load_state_dict(net.state_dict())
+    labels = _worker["test_labels"]
+    return dict(spec, loss=avg_loss, float_acc=accuracy(plain, _worker["test_images"], labels),
+                quant_acc=float(np.mean(pred == labels)), train_seconds=round(t1 - t0, 3),
+                seconds=round(time.perf_counter() - t0, 3), pid=os.getpid(), time=time.time())
+
+# ================= Results file =================
+def load_rows(path):
+    '''Rows of an earlier (possibly interrupted) sweep, a torn last line is dropped'''
+    rows = []
+    if not os.path.exists(path):
+        return rows
+    with open(path) as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+    return rows
+
+def open_results(path):
+    f = open(path, "a+")
+    # Interrupted mid-write: start the next row on a fresh line
+    f.seek(0, os.SEEK_END)
+    if f.tell() > 0:
+        f.seek(f.tell() - 1)
+        if f.read(1) != "\n":
+            f.write("\n")
+    return f
+
+def append_row(f, row):
+    f.write(json.dumps(row) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+def print_top(rows, n):
+    rows = sorted(rows, key=lambda r: (-r["quant_acc"], -r["float_acc"]))[:n]
+    print(f"\n{'quant':>7} {'float':>7} {'lr':>8} {'ep':>3} {'conv':>5} {'fc':>5}  shifts (conv1 conv2 fc1 fc2 fc3)  qat seed")
+    for r in rows:
+        shifts = " ".join(str(r["shifts"][name]) for name in export_all.LAYER_CONFIG)
+        print(f"{r['quant_acc']:>7.2%} {r['float_acc']:>7.2%} {r['lr']:>8g} {r['epochs']:>3} "
+              f"{r['scale_factor']:>5g} {r['q_scale']:>5g}  {shifts:<31}  {str(r['qat']):<5} {r['seed']}")
+
+# ================= Main Process =================
+def main():
+    parser = argparse.ArgumentParser(description="Parallel train -> export -> golden sweep with resume")
+    parser.add_argument("--lr", default="0.001", help="comma list")
+    parser.add_argument("--epochs", default="10", help="comma list")
+    parser.add_argument("--scale-factor", default="128", help="conv weight scale (export_conv*.SCALE_FACTOR), comma list")
+    parser.add_argument("--q-scale", default="64", help="FC weight scale (export_fc.Q_SCALE), comma list")
+    parser.add_argument("--shifts", nargs="+", default=[str(QUANT_SHIFT)],
+                        help="one entry per setting: N (all layers) or conv1=..,conv2=..,fc1=..,fc2=..,fc3=..")
+    parser.add_argument("--seeds", default="0", help="comma list")
+    parser.add_argument("--qat", action="store_true", help="train every job through the quantized datapath")
+    parser.add_argument("--data-root", default=mnist_data.DATA_ROOT, help="MNIST root (uint8 cache is built once)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel jobs")
+    parser.add_argument("--threads", type=int, default=1, help="torch threads per job")
+    parser.add_argument("--results", default=RESULTS_PATH, help="shared JSONL results file (resumed if it exists)")
+    parser.add_argument("--top", type=int, default=10, help="best rows to print")
+    args = parser.parse_args()
+
+    grid = itertools.product(parse_list(args.lr, float), parse_list(args.epochs, int),
+                             parse_list(args.scale_factor, float), parse_list(args.q_scale, float),
+                             [parse_shifts(s) for s in args.shifts], parse_list(args.seeds, int))
+    specs = [{"lr": lr, "epochs": ep, "scale_factor": sf, "q_scale": qs, "shifts": sh, "seed": seed, "qat": args.qat}
+             for lr, ep, sf, qs, sh, seed in grid]
+
+    rows = load_rows(args.results)
+    done = {job_key(r) for r in rows}
+    todo = [s for s in specs if job_key(s) not in done]
+    print(f"{len(specs)} jobs, {len(specs) - len(todo)} already in {args.results}, "
+          f"running {len(todo)} on {args.workers} worker(s)")
+
+    # Decode MNIST once before the workers map it
+    mnist_data.load_cached(args.data_root, "train")
+    mnist_data.load_cached(args.data_root, "test")
+
+    t0 = time.perf_counter()
+    failed = 0
+    pool = ProcessPoolExecutor(args.workers, mp_context=mp.get_context("spawn"), initializer=_init_worker,
+                               initargs=(args.data_root, args.batch_size, args.threads))
+    with open_results(args.results) as f:
+        try:
+            futures = {pool.submit(run_job, s): s for s in todo}
+            for i, fut in enumerate(as_completed(futures), 1):
+                spec = futures[fut]
+                try:
+                    row = fut.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[Error] job {job_key(spec)}: {e}")
+                    continue
+                append_row(f, row)
+                rows.append(row)
+                print(f"[{i}/{len(todo)}] lr {row['lr']:g}, {row['epochs']} ep, conv x{row['scale_factor']:g}, "
+                      f"fc x{row['q_scale']:g}, shifts {list(row['shifts'].values())} -> float {row['float_acc']:.2%}, "
+                      f"quant {row['quant_acc']:.2%} ({row['seconds']:.1f} s)")
+        except KeyboardInterrupt:
+            # Finished rows are on disk; a rerun resumes from them
+            pool.shutdown(wait=False, cancel_futures=True)
+            print(f"\nInterrupted: {len(rows)} rows in {args.results}, rerun the same command to resume")
+            sys.exit(130)
+    pool.shutdown()
+    print(f"Sweep finished in {time.perf_counter() - t0:.1f} s ({failed} failed, rerun to retry)")
+    if rows:
+        print_top(rows, args.top)
+
+if __name__ == "__main__":
+    main()
@@ -4,68 +4,329 @@
  @LastEditTime: 2025-12-18 20:37:22
  @LastEditors: Qiao Zhang
  @Description: Download dataset and train model
+               --world-size N: CPU data-parallel training (torch.distributed,
+               gloo on localhost), each process trains on 1/N of the train set
+               Per-epoch float / quantized test accuracy in a background process
+               (async_eval.py), JSON records, optional early stop
  @FilePath: /cnn/model/src/LeNet/train.py
 '''
 
 # Import library
+import argparse
+import os
+import sys
+import time
+
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
 import torchvision
 from torchvision import transforms
 
-from LeNet5 import LeNet5
+from LeNet5 import LeNet5, QATLeNet5, PRUNE_MODES, QUANT_SHIFT, prune_fc1, remove_pruning, fc1_sparsity, qat_layers
+import mnist_data
+from async_eval import EVAL_LOG, AsyncEvaluator, Plateau
+
+EPOCHS = 10
+BATCH_SIZE = 256
+LR = 0.001
+WEIGHTS_PATH = "lenet_weights.pth"
+
+# Data parallel: gloo rendezvous on localhost
+MASTER_ADDR = "127.0.0.1"
+MASTER_PORT = 29500
+# Learning rate vs worker count (global batch = N x --batch-size)
+LR_SCALING = ["linear", "sqrt", "none"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train LeNet5 on MNIST")
+    parser.add_argument("--prune", type=float, default=0.0,
+                        help="prune this fraction of FC1 from --init, then fine-tune (0 = plain training)")
+    parser.add_argument("--prune-mode", choices=PRUNE_MODES, default="magnitude")
+    parser.add_argument("--finetune-epochs", type=int, default=3, help="epochs of fine-tuning after pruning / QAT")
+    parser.add_argument("--init", default=WEIGHTS_PATH, help="trained checkpoint to prune / QAT fine-tune")
+    parser.add_argument("--output", default=WEIGHTS_PATH,
+                        help="checkpoint to write (must differ from --init when pruning / QAT fine-tuning)")
+    parser.add_argument("--qat", action="store_true",
+                        help="quantization-aware training: forward through the exporters' INT8 rounding and "
+                             "the RTL >> shift + saturate (fine-tunes --init if it exists)")
+    parser.add_argument("--qat-shift", type=int, default=QUANT_SHIFT, help="QAT >> shift of every layer")
+    parser.add_argument("--qat-config", default=None,
+                        help="per-layer scales / shifts for QAT (calibrate.py JSON, export with export_all.py --config)")
+    parser.add_argument("--data", choices=["torchvision", "cached"], default="torchvision",
+                        help="cached: uint8 MNIST decoded once, memory-mapped, batches by tensor indexing")
+    parser.add_argument("--data-root", default="../../data", help="MNIST root")
+    parser.add_argument("--workers", type=int, default=0, help="DataLoader worker processes (per training process)")
+    parser.add_argument("--pin-memory", action="store_true", help="page-locked batches (faster copies to CUDA)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch intra-op threads per process (default: torch's choice, cores / N with --world-size)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="batch size per training process")
+    parser.add_argument("--lr", type=float, default=LR, help="learning rate of one process")
+    parser.add_argument("--world-size", type=int, default=1,
+                        help="data-parallel training processes on this machine (gloo all-reduce, CPU)")
+    parser.add_argument("--lr-scaling", choices=LR_SCALING, default="linear",
+                        help="learning rate x N (linear) or x sqrt(N) for N processes")
+    parser.add_argument("--master-port", type=int, default=MASTER_PORT)
+    parser.add_argument("--bench-workers", default=None,
+                        help="comma list, e.g. 1,2,4: time --epochs-bench epochs per worker count and exit (no save)")
+    parser.add_argument("--epochs-bench", type=int, default=1)
+    parser.add_argument("--no-eval", action="store_true", help="skip the per-epoch background test-set evaluation")
+    parser.add_argument("--eval-log", default=EVAL_LOG, help="per-epoch JSON records (float / quantized accuracy)")
+    parser.add_argument("--early-stop", type=int, default=0,
+                        help="stop after N evaluated epochs without quantized accuracy gain (0 = off)")
+    parser.add_argument("--min-delta", type=float, default=0.0, help="quantized accuracy gain that counts for --early-stop")
+    return parser.parse_args()
+
+def scaled_lr(lr, world_size, scaling):
+    if scaling == "linear":
+        return lr * world_size
+    if scaling == "sqrt":
+        return lr * world_size ** 0.5
+    return lr
+
+def prepare_data(args):
+    '''Download / decode once in the parent, so N processes never race on the files'''
+    if args.data == "cached":
+        mnist_data.load_cached(args.data_root, "train")
+        mnist_data.load_cached(args.data_root, "test")
+    else:
+        torchvision.datasets.MNIST(root=args.data_root, train=True, download=True)
+        torchvision.datasets.MNIST(root=args.data_root, train=False, download=True)
+
+def build_train_loader(args, rank=0, world_size=1):
+    # The test split is evaluated by async_eval.py
+    if args.data == "cached":
+        # 1-3. uint8 tensors cached on disk, no per-sample transform
+        return mnist_data.make_loader(args.data_root, "train", args.batch_size, True, args.workers,
+                                      args.pin_memory, rank, world_size)
 
-def main():
     # 1. Data preprocess
     trans = transforms.ToTensor()
 
     # 2. Download/ Load dataset
-    print("Loading data ...")
     # Note: please make sure the download path is right
     mnist_train = torchvision.datasets.MNIST(
-        root="../../data", train=True, transform=trans, download=True
-    )
-    mnist_test = torchvision.datasets.MNIST(
-        root="../../data", train=False, transform=trans, download=True
+        root=args.data_root, train=True, transform=trans, download=True
     )
 
-    # 3. Loading DataLoader
-    train_iter = DataLoader(mnist_train, batch_size=256, shuffle=True)
-    test_iter  = DataLoader(mnist_test, batch_size=256, shuffle=False)
+    # 3. Loading DataLoader (each process sees its 1/N shard of the train set)
+    if world_size > 1:
+        sampler = DistributedSampler(mnist_train, num_replicas=world_size, rank=rank, shuffle=True)
+        train_iter = DataLoader(mnist_train, batch_size=args.batch_size, sampler=sampler,
+                                num_workers=args.workers, pin_memory=args.pin_memory)
+    else:
+        train_iter = DataLoader(mnist_train, batch_size=args.batch_size, shuffle=True,
+                                num_workers=args.workers, pin_memory=args.pin_memory)
+    return train_iter
+
+def set_epoch(loader, epoch):
+    # DistributedSampler reshuffles per epoch (cached loader: wrapped in a BatchSampler)
+    sampler = getattr(loader.sampler, "sampler", loader.sampler)
+    if isinstance(sampler, DistributedSampler):
+        sampler.set_epoch(epoch)
+
+def train_epoch(model, train_iter, loss, optimizer, device, non_blocking=False):
+    '''One pass over train_iter, returns (summed batch loss, batches, samples)'''
+    # turn on the train mode
+    model.train()
+    running_loss = 0.0
+    samples = 0
+    for X, y in train_iter:
+        X, y = X.to(device, non_blocking=non_blocking), y.to(device)# Loading data to device
+        samples += len(y)
+        l = loss(model(X), y)# Calculate loss
+        optimizer.zero_grad()# Clear gradient
+        l.backward()# backward to calculate gradient (DDP: all-reduce)
+        optimizer.step()# call step(), modify in-place the parameter tensor of optimizer
+        running_loss += l.item()# don't put tensor into running_loss
+        pass
+    return running_loss, len(train_iter), samples
+
+def _quiet(*args, **kwargs):
+    pass
+
+def print_record(r):
+    print(f"[Eval] Epoch {r['epoch']}: float {r['float_acc']:.2%}, quantized {r['quant_acc']:.2%} "
+          f"({r['eval_seconds']:.1f} s)")
+
+def train_worker(rank, args, world_size=1, results=None):
+    '''
+    One training process. world_size > 1: joins the gloo group, trains its shard
+    with DistributedDataParallel (gradients all-reduced every step), rank 0 logs / saves.
+    Returns [(epoch seconds, samples of all processes)], also put on `results` by rank 0.
+    '''
+    distributed = world_size > 1
+    if distributed:
+        os.environ["MASTER_ADDR"] = MASTER_ADDR
+        os.environ["MASTER_PORT"] = str(args.master_port)
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+        # N processes share the cores
+        torch.set_num_threads(args.threads or max(1, (os.cpu_count() or 1) // world_size))
+    elif args.threads:
+        torch.set_num_threads(args.threads)
+    main_rank = rank == 0
+    log = print if main_rank else _quiet
+
+    log("Loading data ...")
+    train_iter = build_train_loader(args, rank, world_size)
 
     # 4. Instantiate Model
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Use the device :{device}")
-    print(f"Loading Model to {device}")
-    net    = LeNet5().to(device)
-    print("Load Model finished!")
+    device = torch.device("cuda" if torch.cuda.is_available() and not distributed else "cpu")
+    log(f"Use the device :{device}")
+    log(f"Loading Model to {device}")
+    # Quantized datapath of QAT and of the quantized evaluation
+    if args.qat_config:
+        import export_all
+        layers = export_all.load_layer_config(args.qat_config)
+    else:
+        layers = qat_layers(args.qat_shift)
+    if args.qat:
+        # Same parameters / state_dict keys as LeNet5: the checkpoint goes to the exporters unchanged
+        net = QATLeNet5(layers).to(device)
+    else:
+        net = LeNet5().to(device)
+    log("Load Model finished!")
+
+    epochs = EPOCHS
+    if args.qat:
+        if os.path.exists(args.init):
+            net.load_state_dict(torch.load(args.init, map_location=device))
+            epochs = args.finetune_epochs
+            log(f"QAT fine-tuning {args.init} for {epochs} epochs")
+        shifts = ", ".join(f"{name} >> {cfg['shift']}" for name, cfg in net.layers.items())
+        log(f"QAT datapath: {shifts}")
+    if args.prune > 0:
+        # Prune FC1 of a trained model and fine-tune with the mask held
+        if not args.qat:
+            net.load_state_dict(torch.load(args.init, map_location=device))
+        prune_fc1(net, args.prune, args.prune_mode)
+        epochs = args.finetune_epochs
+        log(f"Pruned FC1 ({args.prune_mode}, {args.prune:.0%}), fine-tuning {epochs} epochs")
+    if args.bench_workers:
+        epochs = args.epochs_bench
+
+    model = net
+    if distributed:
+        # Broadcasts rank 0's parameters, then all-reduces (averages) gradients in backward
+        model = DistributedDataParallel(net)
 
     # 5. define loss function and optimizer
+    lr = scaled_lr(args.lr, world_size, args.lr_scaling)
     loss = torch.nn.CrossEntropyLoss()
-    optimizer = torch.optim.Adam(net.parameters(), lr=0.001)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    if distributed:
+        log(f"Data parallel: {world_size} processes x batch {args.batch_size}, lr {lr:g} ({args.lr_scaling} scaling)")
+
+    # Rank 0 evaluates every epoch in the background
+    evaluator = None
+    if main_rank and not args.no_eval and not args.bench_workers:
+        evaluator = AsyncEvaluator(args.data, args.data_root, layers, args.eval_log)
+    plateau = Plateau(args.early_stop, args.min_delta)
 
     # 6. Start training
-    print("Starting training ...")
-    for epoch in range(10):
-        # turn on the train mode
-        net.train()
-        running_loss = 0.0
-        for X, y in train_iter:
-            X, y = X.to(device), y.to(device)# Loading data to device
-            l = loss(net(X), y)# Calculate loss
-            optimizer.zero_grad()# Clear gradient
-            l.backward()# backward to calculate gradient
-            optimizer.step()# call step(), modify in-place the parameter tensor of optimizer
-            running_loss += l.item()# don't put tensor into running_loss
-            pass
-        print(f"Epoch {epoch+1} finished，Avg Loss: {running_loss / len(train_iter):.4f}")
+    log("Starting training ...")
+    epoch_stats = []
+    for epoch in range(epochs):
+        set_epoch(train_iter, epoch)
+        t0 = time.perf_counter()
+        running_loss, batches, samples = train_epoch(model, train_iter, loss, optimizer, device, args.pin_memory)
+        if distributed:
+            # Loss / samples over all shards
+            stats = torch.tensor([running_loss, batches, samples], dtype=torch.float64)
+            dist.all_reduce(stats)
+            running_loss, batches, samples = stats.tolist()
+        seconds = time.perf_counter() - t0
+        epoch_stats.append((seconds, samples))
+        log(f"Epoch {epoch+1} finished，Avg Loss: {running_loss / batches:.4f}, "
+            f"{seconds:.1f} s, {samples / seconds:.0f} samples/s")
+
+        # 7. Hand the weights to the evaluator, pick up finished epochs (lag of ~1 epoch)
+        if evaluator:
+            evaluator.submit(epoch + 1, net, {"loss": running_loss / batches, "train_seconds": round(seconds, 3),
+                                              "lr": lr, "world_size": world_size})
+            for r in evaluator.poll():
+                print_record(r)
+                plateau.update(r)
+        stop = plateau.stopped
+        if distributed:
+            flag = torch.tensor([int(stop)])
+            dist.broadcast(flag, 0)
+            stop = bool(flag.item())
+        if stop:
+            log(f"Early stop: quantized accuracy {plateau.best:.2%} at epoch {plateau.best_epoch}, "
+                f"no gain for {plateau.patience} epochs")
+            break
         pass
 
-    torch.save(net.state_dict(), "lenet_weights.pth")
-    print("Model saved.")
+    if evaluator:
+        for r in evaluator.close():
+            print_record(r)
+            plateau.update(r)
+        log(f"Best quantized accuracy {plateau.best:.2%} (epoch {plateau.best_epoch}), records in {args.eval_log}")
+
+    if main_rank and not args.bench_workers:
+        if args.prune > 0:
+            remove_pruning(net)
+            print(f"FC1 sparsity: {fc1_sparsity(net):.1%}")
+        torch.save(net.state_dict(), args.output)
+        print(f"Model saved: {args.output}")
+    if main_rank and results is not None:
+        results.put(epoch_stats)
+    if distributed:
+        dist.destroy_process_group()
+    return epoch_stats
+
+def run(args, world_size):
+    '''Train with world_size processes, returns rank 0's [(epoch seconds, samples)]'''
+    if world_size == 1:
+        return train_worker(0, args)
+    results = mp.get_context("spawn").SimpleQueue()
+    mp.spawn(train_worker, args=(args, world_size, results), nprocs=world_size, join=True)
+    return results.get()
+
+def mean_epoch(epoch_stats):
+    '''(seconds / epoch, samples / s)'''
+    seconds = sum(s for s, _ in epoch_stats)
+    return seconds / len(epoch_stats), sum(n for _, n in epoch_stats) / seconds
+
+def main():
+    args = parse_args()
+    if args.world_size < 1:
+        print("Error: --world-size must be >= 1")
+        sys.exit(1)
+    if args.prune > 0 and not os.path.exists(args.init):
+        print(f"Error: {args.init} not found! Please run train.py first")
+        sys.exit(1)
+    # Pruning / QAT fine-tuning must not overwrite the dense checkpoint they start from
+    fine_tune = args.prune > 0 or (args.qat and os.path.exists(args.init))
+    if fine_tune and not args.bench_workers and os.path.abspath(args.output) == os.path.abspath(args.init):
+        print(f"Error: --output {args.output} would overwrite --init {args.init}; "
+              f"copy the dense model first (e.g. cp {args.init} lenet_dense.pth, --init lenet_dense.pth) "
+              f"or pass another --output")
+        sys.exit(1)
+    prepare_data(args)
+
+    if not args.bench_workers:
+        sec, rate = mean_epoch(run(args, args.world_size))
+        print(f"{args.world_size} process(es): {sec:.1f} s / epoch, {rate:.0f} samples/s")
+        return
+
+    # Epoch time vs worker count
+    counts = [int(n) for n in args.bench_workers.split(",")]
+    table = []
+    for n in counts:
+        print(f"\n==== {n} process(es) ====")
+        table.append((n,) + mean_epoch(run(args, n)))
+    # Speedup / parallel efficiency relative to the first count
+    n0, sec0, _ = table[0]
+    print(f"\n{'Procs':>5} {'s/epoch':>8} {'samples/s':>10} {'speedup':>8} {'efficiency':>10}  ({os.cpu_count()} cores)")
+    for n, sec, rate in table:
+        print(f"{n:>5} {sec:>8.2f} {rate:>10.0f} {sec0 / sec:>7.2f}x {sec0 / sec * n0 / n:>10.0%}")
     pass
 
 if __name__ == "__main__":
     main()
     pass
-
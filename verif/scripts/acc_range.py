@@ -0,0 +1,159 @@
+"""
+Accumulator range analyzer: how many of the 32 ACC_WIDTH bits does each layer use?
+
+Sweeps a calibration set through the golden datapath and records the exact
+(int64) min/max of every accumulator the RTL keeps:
+
+    Conv  pe     : PE register within one pass (running sum over the K x K window)
+          psum   : partial_sum_accumulator psum_mem after every input-channel pass
+          bias   : + bias (result_handler)
+    FC    pe     : fc_pe running sum over the input stream
+          bias   : + bias (post_process)
+
+and, at the >> QUANT_SHIFT + saturate step, how many values clip at 127 / -128
+and how many non-zero values shift to 0.
+
+Observed widths are checked against a worst-case bound from the weights alone
+(every layer input is >= 0: Q1.7 image, ReLU outputs; max 127):
+
+    max = 127 * sum(w > 0) (+ bias),  min = 127 * sum(w < 0) (+ bias)
+
+Usage:
+    python acc_range.py --split test --limit 2000
+    python acc_range.py --synthetic 500
+"""
+import argparse
+
+import numpy as np
+
+from conv_engine import im2col, pad_hw
+from golden_model import PADDING, QUANT_SHIFT, RTL_INIT_DIR, load_params, quantize_images, run_batch
+from golden_sweep import DATA_ROOT, load_mnist
+from int_gemm import exact_matmul
+
+# ================= 配置区域 =================
+ACC_WIDTH = 32          # definitions.sv
+INPUT_MAX = 127         # int8 activations after ReLU / Q1.7 image
+CHUNK_SIZE = 32         # images per step (the running-sum tensors are N x Out x In)
+# ============================================
+
+# ================= Widths =================
+
+def signed_bits(lo, hi):
+    """Two's complement width holding [lo, hi]"""
+    lo, hi = int(lo), int(hi)
+    return max(hi.bit_length(), (-lo - 1).bit_length() if lo < 0 else 0) + 1
+
+def weight_bound(w, b=None):
+    """Worst-case (min, max) accumulator per layer for inputs in [0, INPUT_MAX]"""
+    w = np.asarray(w, dtype=np.int64).reshape(len(w), -1)
+    hi = INPUT_MAX * np.where(w > 0, w, 0).sum(axis=1)
+    lo = INPUT_MAX * np.where(w < 0, w, 0).sum(axis=1)
+    if b is not None:
+        hi, lo = hi + np.maximum(b, 0), lo + np.minimum(b, 0)
+    return int(lo.min()), int(hi.max())
+
+# ================= Accumulators =================
+
+def conv_accumulators(x, w, b):
+    """
+    x: [N, H, W, C] padded input, w: [K, C, R, S], b: [K].
+    Returns {stage: int64 array} with pe (all running sums), psum, bias.
+    """
+    k, c, r, s = w.shape
+    cols = im2col(x.astype(np.int64), r, s).reshape(-1, c, r * s)
+    wc = w.reshape(k, c, r * s).astype(np.int64)
+    # PE: running sum over the window of one pass, every pass
+    pe = np.cumsum(cols[:, :, :, None] * wc.transpose(1, 2, 0)[None], axis=2)
+    # psum_mem: running sum over passes (input channels)
+    per_pass = np.stack([exact_matmul(cols[:, ch], wc[:, ch].T) for ch in range(c)], axis=1)
+    psum = np.cumsum(per_pass, axis=1)
+    return {"pe": pe, "psum": psum, "bias": psum[:, -1] + b}
+
+def fc_accumulators(x, w, b):
+    """x: [N, In], w: [Out, In], b: [Out] -> {pe: [N, Out, In] running sums, bias: [N, Out]}"""
+    pe = np.cumsum(x.astype(np.int64)[:, None, :] * w.astype(np.int64)[None], axis=2)
+    return {"pe": pe, "bias": pe[..., -1] + b}
+
+def quant_events(v, shift):
+    """(clip hi, clip lo, non-zero -> 0, count) of the >> shift + saturate step"""
+    q = v >> shift
+    return np.array([(q > 127).sum(), (q < -128).sum(), ((v != 0) & (q == 0)).sum(), v.size], dtype=np.int64)
+
+def analyze(images_u8, params, shift=QUANT_SHIFT, chunk=CHUNK_SIZE):
+    """
+    Returns {layer: {"range": {stage: [min, max]}, "quant": [hi, lo, zeroed, count], "bound": (min, max)}}
+    """
+    layers = {
+        "Conv1": ("conv1_w", "conv1_b"), "Conv2": ("conv2_w", "conv2_b"),
+        "FC1": ("fc1_w", "fc1_b"), "FC2": ("fc2_w", "fc2_b"), "FC3": ("fc3_w", "fc3_b"),
+    }
+    stats = {name: {"range": {}, "quant": np.zeros(4, dtype=np.int64),
+                    "bound": weight_bound(params[w], params[b])} for name, (w, b) in layers.items()}
+
+    for start in range(0, len(images_u8), chunk):
+        images = quantize_images(images_u8[start:start + chunk])
+        res = run_batch(images, params, shift)
+        inputs = {
+            "Conv1": pad_hw(images[..., None], PADDING),
+            "Conv2": res["l1"]["final"],
+            "FC1": res["fc_in"], "FC2": res["fc1"]["final"], "FC3": res["fc2"]["final"],
+        }
+        # Value entering >> shift: pooled ReLU (conv), ReLU (FC1/FC2), bias (FC3)
+        quant_in = {
+            "Conv1": res["l1"]["pool"], "Conv2": res["l2"]["pool"],
+            "FC1": res["fc1"]["relu"], "FC2": res["fc2"]["relu"], "FC3": res["fc3"]["relu"],
+        }
+        for name, (wk, bk) in layers.items():
+            w, b = params[wk], params[bk].astype(np.int64)
+            acc = conv_accumulators(inputs[name], w, b) if name.startswith("Conv") else fc_accumulators(inputs[name], w, b)
+            for stage, v in acc.items():
+                lo, hi = stats[name]["range"].get(stage, (0, 0))
+                stats[name]["range"][stage] = (min(lo, int(v.min())), max(hi, int(v.max())))
+            stats[name]["quant"] += quant_events(np.asarray(quant_in[name], dtype=np.int64), shift)
+    return stats
+
+# ================= Report =================
+
+def print_report(stats, shift=QUANT_SHIFT):
+    print(f"{'Layer':<6} {'Stage':<6} {'Min':>10} {'Max':>10} {'Bits':>5} {'Bound bits':>10} {'Spare':>6}")
+    for name, s in stats.items():
+        for stage, (lo, hi) in s["range"].items():
+            print(f"{name:<6} {stage:<6} {lo:>10} {hi:>10} {signed_bits(lo, hi):>5} "
+                  f"{signed_bits(*s['bound']):>10} {ACC_WIDTH - signed_bits(*s['bound']):>6}")
+    need = max(signed_bits(lo, hi) for s in stats.values() for lo, hi in s["range"].values())
+    proven = max(signed_bits(*s["bound"]) for s in stats.values())
+    print(f"Observed accumulator width: {need} bits, proven for any input: {proven} bits (ACC_WIDTH = {ACC_WIDTH})")
+
+    print(f"\n>> {shift} + saturate_cast:")
+    print(f"{'Layer':<6} {'Clip 127':>9} {'Clip -128':>9} {'Non-0 -> 0':>11} {'Values':>10}")
+    for name, s in stats.items():
+        hi, lo, zeroed, count = s["quant"]
+        print(f"{name:<6} {hi:>9} {lo:>9} {zeroed:>11} {count:>10}   "
+              f"({hi / count:.2%} / {lo / count:.2%} / {zeroed / count:.1%})")
+
+# ================= Entry =================
+
+def main():
+    parser = argparse.ArgumentParser(description="Accumulator range analyzer (golden datapath)")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR, help="directory of the .hex init files")
+    parser.add_argument("--data-root", default=DATA_ROOT, help="torchvision MNIST root")
+    parser.add_argument("--split", choices=["test", "train"], default="test")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N images")
+    parser.add_argument("--synthetic", type=int, default=0, help="N random images instead of MNIST")
+    parser.add_argument("--shift", type=int, default=QUANT_SHIFT, help="QUANT_SHIFT to analyze")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        images = rng.integers(0, 256, (args.synthetic, 28, 28), dtype=np.uint8)
+    else:
+        images, _ = load_mnist(args.data_root, args.split)
+    images = images[:args.limit] if args.limit else images
+
+    stats = analyze(images, load_params(args.init_dir), args.shift)
+    print(f"Images: {len(images)}")
+    print_report(stats, args.shift)
+
+if __name__ == "__main__":
+    main()
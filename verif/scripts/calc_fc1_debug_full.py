@@ -1,7 +1,13 @@
+import argparse
 import numpy as np
 import os
 import sys
 
+import int4_pack
+import sparse_stream
+from golden_model import fc_layer, fc_layer_int4
+from init_bundle import load_init
+
 # ================= 配置区域 =================
 # 输入/输出目录
 RTL_INIT_DIR = "../../hardware/rtl/init_files"
@@ -11,6 +17,11 @@ DEBUG_DIR    = "debug_data_fc1"
 # 权重/偏置文件
 WEIGHTS_FILE = os.path.join(RTL_INIT_DIR, "fc1_weights.hex")
 BIAS_FILE    = os.path.join(RTL_INIT_DIR, "fc1_bias.hex")
+# INT4 模式 (export_fc.py --int4)
+INT4_WEIGHTS_FILE = os.path.join(RTL_INIT_DIR, int4_pack.weight_file("fc1"))
+INT4_EXP_FILE     = os.path.join(RTL_INIT_DIR, int4_pack.exp_file("fc1"))
+# 剪枝压缩流 (export_fc.py --sparse)
+SPARSE_FILE       = os.path.join(RTL_INIT_DIR, sparse_stream.stream_file("fc1"))
 
 # 硬件参数
 INPUT_LEN   = 400  # 16ch * 5 * 5
@@ -22,31 +33,10 @@ if not os.path.exists(DEBUG_DIR):
 
 # ===========================================
 
-def hex2signed8(val):
-    """转换 8-bit Hex 到有符号整数"""
-    if val > 127: val -= 256
-    return val
-
-def hex2signed32(val):
-    """转换 32-bit Hex 到有符号整数"""
-    if val > 0x7FFFFFFF: val -= 0x100000000
-    return val
-
-def saturate_cast(val):
-    """硬件截断逻辑 (-128 ~ 127)"""
-    if val > 127: return 127
-    elif val < -128: return -128
-    else: return int(val)
-
 def load_hex_weights(filepath, rows, cols):
     print(f"Loading Weights from {filepath}...")
-    data = []
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                data.append(hex2signed8(int(line, 16)))
+        data = load_init(filepath, 8)
     except FileNotFoundError:
         print(f"[Error] File not found: {filepath}")
         sys.exit(1)
@@ -59,19 +49,43 @@ def load_hex_weights(filepath, rows, cols):
 
     return arr.reshape(rows, cols)
 
+def load_hex_int4(weights_path, exp_path, rows, cols):
+    """INT4 packed weights -> (q4 [rows, cols], per-row exponent [rows])"""
+    print(f"Loading INT4 Weights from {weights_path}...")
+    try:
+        packed = load_init(weights_path, 8)
+        exps = load_init(exp_path, 8)
+    except FileNotFoundError as e:
+        print(f"[Error] File not found: {e.filename} (run export_fc.py --int4 first)")
+        sys.exit(1)
+
+    q4 = int4_pack.unpack(packed).astype(np.int32)
+    if len(q4) != rows * cols:
+        print(f"[Warning] Size mismatch! Expected {rows*cols}, got {len(q4)}")
+        q4.resize(rows * cols, refcheck=False)
+
+    return q4.reshape(rows, cols), int4_pack.row_exps(exps, rows)
+
+def load_hex_sparse(filepath, rows, cols):
+    """Compressed (pruned) weight stream -> dense [rows, cols]"""
+    print(f"Loading Sparse Weights from {filepath}...")
+    try:
+        stream = load_init(filepath, 8)
+    except FileNotFoundError:
+        print(f"[Error] File not found: {filepath} (run export_fc.py --sparse first)")
+        sys.exit(1)
+
+    w = sparse_stream.decode(stream, rows, cols)
+    print(f"   -> {len(stream)} bytes, {np.count_nonzero(w)} non-zero weights")
+    return w
+
 def load_hex_bias(filepath, rows):
     print(f"Loading Bias from {filepath}...")
-    data = []
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                data.append(hex2signed32(int(line, 16)))
+        return load_init(filepath, 32).astype(np.int32)
     except FileNotFoundError:
         print(f"[Error] File not found: {filepath}")
         sys.exit(1)
-    return np.array(data, dtype=np.int32)
 
 def load_l2_output_and_flatten():
     """
@@ -122,38 +136,40 @@ def save_debug_file(filename, data, desc):
         for i, val in enumerate(data):
             f.write(f"{val}\n")
 
-def simulate_fc1(input_vec, weights, bias):
-    print("\n--- Simulating FC1 ---")
+def simulate_fc1(input_vec, weights, bias, exps=None):
+    print("\n--- Simulating FC1 ---" + (" (INT4)" if exps is not None else ""))
 
-    # 1. Matrix Multiplication (Accumulation)
     # [120, 400] x [400] -> [120]
-    acc = np.dot(weights, input_vec)
-    save_debug_file("fc1_debug_1_acc.txt", acc, "Raw Accumulation (Sum)")
-
-    # 2. Add Bias
-    biased = acc + bias
-    save_debug_file("fc1_debug_2_bias.txt", biased, "Accumulation + Bias")
-
-    # 3. ReLU
-    relu = np.maximum(0, biased)
-    save_debug_file("fc1_debug_3_relu.txt", relu, "ReLU")
+    if exps is None:
+        stages = fc_layer(input_vec, weights, bias, QUANT_SHIFT)
+    else:
+        # 8 x 4-bit MAC, acc << e (per row)
+        stages = fc_layer_int4(input_vec, weights, exps, bias, QUANT_SHIFT)
 
-    # 4. Quantization
-    # Right shift 8 (Arithmetic)
-    quant = relu >> QUANT_SHIFT
-
-    # Saturate to 8-bit
-    final = np.array([saturate_cast(x) for x in quant], dtype=np.int32)
-    save_debug_file("fc1_debug_4_final.txt", final, "Final Quantized (8-bit)")
+    save_debug_file("fc1_debug_1_acc.txt", stages["acc"], "Raw Accumulation (Sum)")
+    save_debug_file("fc1_debug_2_bias.txt", stages["bias"], "Accumulation + Bias")
+    save_debug_file("fc1_debug_3_relu.txt", stages["relu"], "ReLU")
+    save_debug_file("fc1_debug_4_final.txt", stages["final"], "Final Quantized (8-bit)")
 
     print("\nSimulation Complete.")
     print(f"Check '{DEBUG_DIR}' for output files.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FC1 golden debug data")
+    parser.add_argument("--int4", action="store_true", help="use the INT4 packed weights (export_fc.py --int4)")
+    parser.add_argument("--sparse", action="store_true", help="use the compressed FC1 stream (export_fc.py --sparse)")
+    args = parser.parse_args()
+
     # Load Data
     fc_in = load_l2_output_and_flatten()
-    fc_w  = load_hex_weights(WEIGHTS_FILE, OUTPUT_LEN, INPUT_LEN)
+    fc_exp = None
+    if args.sparse:
+        fc_w = load_hex_sparse(SPARSE_FILE, OUTPUT_LEN, INPUT_LEN)
+    elif args.int4:
+        fc_w, fc_exp = load_hex_int4(INT4_WEIGHTS_FILE, INT4_EXP_FILE, OUTPUT_LEN, INPUT_LEN)
+    else:
+        fc_w = load_hex_weights(WEIGHTS_FILE, OUTPUT_LEN, INPUT_LEN)
     fc_b  = load_hex_bias(BIAS_FILE, OUTPUT_LEN)
 
     # Run Sim
-    simulate_fc1(fc_in, fc_w, fc_b)
+    simulate_fc1(fc_in, fc_w, fc_b, fc_exp)
@@ -6,10 +6,15 @@
  @Description:
  @FilePath: /cnn/verif/scripts/calc_fc2_fc3_debug_full.py
 '''
+import argparse
 import numpy as np
 import os
 import sys
 
+import int4_pack
+from golden_model import fc_layer, fc_layer_int4
+from init_bundle import load_init
+
 # ================= 配置区域 =================
 # 路径配置
 RTL_INIT_DIR = "../../hardware/rtl/init_files"
@@ -38,30 +43,11 @@ if not os.path.exists(DEBUG_DIR_FC3): os.makedirs(DEBUG_DIR_FC3)
 
 # ===========================================
 
-def hex2signed8(val):
-    if val > 127: val -= 256
-    return val
-
-def hex2signed32(val):
-    if val > 0x7FFFFFFF: val -= 0x100000000
-    return val
-
-def saturate_cast(val):
-    """硬件截断逻辑 (-128 ~ 127)"""
-    if val > 127: return 127
-    elif val < -128: return -128
-    else: return int(val)
-
 def load_hex_weights(filename, rows, cols):
     filepath = os.path.join(RTL_INIT_DIR, filename)
     print(f"Loading Weights from {filepath}...")
-    data = []
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                data.append(hex2signed8(int(line, 16)))
+        data = load_init(filepath, 8)
     except FileNotFoundError:
         print(f"[Error] File not found: {filepath}")
         sys.exit(1)
@@ -72,20 +58,30 @@ def load_hex_weights(filename, rows, cols):
         arr.resize(rows * cols)
     return arr.reshape(rows, cols)
 
+def load_hex_int4(name, rows, cols):
+    """INT4 packed weights (export_fc.py --int4) -> (q4 [rows, cols], per-row exponent [rows])"""
+    filepath = os.path.join(RTL_INIT_DIR, int4_pack.weight_file(name))
+    print(f"Loading INT4 Weights from {filepath}...")
+    try:
+        packed = load_init(filepath, 8)
+        exps = load_init(os.path.join(RTL_INIT_DIR, int4_pack.exp_file(name)), 8)
+    except FileNotFoundError as e:
+        print(f"[Error] File not found: {e.filename} (run export_fc.py --int4 first)")
+        sys.exit(1)
+
+    q4 = int4_pack.unpack(packed).astype(np.int32)
+    if len(q4) != rows * cols:
+        q4.resize(rows * cols, refcheck=False)
+    return q4.reshape(rows, cols), int4_pack.row_exps(exps, rows)
+
 def load_hex_bias(filename, rows):
     filepath = os.path.join(RTL_INIT_DIR, filename)
     print(f"Loading Bias from {filepath}...")
-    data = []
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                data.append(hex2signed32(int(line, 16)))
+        return load_init(filepath, 32).astype(np.int32)
     except FileNotFoundError:
         print(f"[Error] File not found: {filepath}")
         sys.exit(1)
-    return np.array(data, dtype=np.int32)
 
 def load_previous_output(filepath, expected_len):
     """读取上一层的输出 txt 文件 (每行一个十进制数)"""
@@ -115,51 +111,56 @@ def save_debug_file(folder, filename, data, desc):
         for val in data:
             f.write(f"{val}\n")
 
-def simulate_layer(layer_name, input_vec, weights, bias, out_dir, use_relu=True):
-    print(f"\n--- Simulating {layer_name.upper()} ---")
+def simulate_layer(layer_name, input_vec, weights, bias, out_dir, use_relu=True, exps=None):
+    print(f"\n--- Simulating {layer_name.upper()} ---" + (" (INT4)" if exps is not None else ""))
 
-    # 1. Matrix Mult (Accumulation)
-    acc = np.dot(weights, input_vec)
-    save_debug_file(out_dir, f"{layer_name}_debug_1_acc.txt", acc, "Raw Accumulation")
+    if exps is None:
+        stages = fc_layer(input_vec, weights, bias, QUANT_SHIFT, relu_en=use_relu)
+    else:
+        # 8 x 4-bit MAC, acc << e (per row)
+        stages = fc_layer_int4(input_vec, weights, exps, bias, QUANT_SHIFT, relu_en=use_relu)
 
-    # 2. Add Bias
-    biased = acc + bias
-    save_debug_file(out_dir, f"{layer_name}_debug_2_bias.txt", biased, "Accumulation + Bias")
+    save_debug_file(out_dir, f"{layer_name}_debug_1_acc.txt", stages["acc"], "Raw Accumulation")
+    save_debug_file(out_dir, f"{layer_name}_debug_2_bias.txt", stages["bias"], "Accumulation + Bias")
 
-    # 3. ReLU (Optional)
+    # ReLU (Optional)
     if use_relu:
-        activated = np.maximum(0, biased)
-        save_debug_file(out_dir, f"{layer_name}_debug_3_relu.txt", activated, "ReLU")
+        save_debug_file(out_dir, f"{layer_name}_debug_3_relu.txt", stages["relu"], "ReLU")
     else:
-        activated = biased # Pass through
         print(f"   (Skipping ReLU for {layer_name})")
 
-    # 4. Quantization
-    quant = activated >> QUANT_SHIFT
-
-    # Saturate
-    final = np.array([saturate_cast(x) for x in quant], dtype=np.int32)
-    save_debug_file(out_dir, f"{layer_name}_debug_4_final.txt", final, "Final 8-bit")
+    save_debug_file(out_dir, f"{layer_name}_debug_4_final.txt", stages["final"], "Final 8-bit")
 
-    return final
+    return stages["final"]
 
 def main():
+    parser = argparse.ArgumentParser(description="FC2 / FC3 golden debug data")
+    parser.add_argument("--int4", action="store_true", help="use the INT4 packed weights (export_fc.py --int4)")
+    args = parser.parse_args()
+
     # 1. Load FC1 Output (which is FC2 Input)
     fc1_out = load_previous_output(FC1_OUT_FILE, FC2_IN_LEN)
 
     # 2. Calculate FC2
-    fc2_w = load_hex_weights("fc2_weights.hex", FC2_OUT_LEN, FC2_IN_LEN)
+    fc2_exp = fc3_exp = None
+    if args.int4:
+        fc2_w, fc2_exp = load_hex_int4("fc2", FC2_OUT_LEN, FC2_IN_LEN)
+    else:
+        fc2_w = load_hex_weights("fc2_weights.hex", FC2_OUT_LEN, FC2_IN_LEN)
     fc2_b = load_hex_bias("fc2_bias.hex", FC2_OUT_LEN)
 
-    fc2_out = simulate_layer("fc2", fc1_out, fc2_w, fc2_b, DEBUG_DIR_FC2, use_relu=True)
+    fc2_out = simulate_layer("fc2", fc1_out, fc2_w, fc2_b, DEBUG_DIR_FC2, use_relu=True, exps=fc2_exp)
 
     # 3. Calculate FC3 (Input is FC2 Output)
-    fc3_w = load_hex_weights("fc3_weights.hex", FC3_OUT_LEN, FC3_IN_LEN)
+    if args.int4:
+        fc3_w, fc3_exp = load_hex_int4("fc3", FC3_OUT_LEN, FC3_IN_LEN)
+    else:
+        fc3_w = load_hex_weights("fc3_weights.hex", FC3_OUT_LEN, FC3_IN_LEN)
     fc3_b = load_hex_bias("fc3_bias.hex", FC3_OUT_LEN)
 
     # 注意：FC3 (Output Layer) 通常不加 ReLU，直接输出 Logits
     # 请根据你的 RTL 配置确认。这里假设 FC3 没有 ReLU。
-    fc3_out = simulate_layer("fc3", fc2_out, fc3_w, fc3_b, DEBUG_DIR_FC3, use_relu=False)
+    fc3_out = simulate_layer("fc3", fc2_out, fc3_w, fc3_b, DEBUG_DIR_FC3, use_relu=False, exps=fc3_exp)
 
     print("\nDone! Check debug_data_fc2/ and debug_data_fc3/")
 
@@ -2,6 +2,10 @@ import numpy as np
 import os
 import sys
 
+from conv_engine import conv_layer
+from golden_model import decode_conv2_weights, decode_conv2_bias
+from init_bundle import load_init
+
 # ================= 配置区域 (必须精确匹配) =================
 QUANT_SHIFT = 8
 
@@ -31,16 +35,6 @@ if not os.path.exists(DEBUG_DIR):
     os.makedirs(DEBUG_DIR)
 # ===========================================
 
-def hex2signed(val, bits):
-    if val & (1 << (bits - 1)):
-        val -= (1 << bits)
-    return val
-
-def saturate_cast(val):
-    if val > 127: return 127
-    elif val < -128: return -128
-    else: return int(val)
-
 def save_debug_file(filename, data, desc):
     path = os.path.join(DEBUG_DIR, filename)
     print(f"   -> Generating {filename} ({desc})...")
@@ -82,104 +76,29 @@ def load_l1_output():
 def load_weights_bias():
     print("2. Loading L2 Weights and Bias...")
 
-    w_tensor = np.zeros((OUTPUT_CH, INPUT_CH, KERNEL_SIZE, KERNEL_SIZE), dtype=np.int32)
-    with open(WEIGHTS_FILE, 'r') as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    groups = [(0, 6), (6, 12), (12, 16)]
-    line_idx = 0
-
-    for start_ch, end_ch in groups:
-        for in_c in range(INPUT_CH):
-            for r in range(KERNEL_SIZE):
-                for s in range(KERNEL_SIZE):
-                    if line_idx >= len(lines): break
-                    val_hex = int(lines[line_idx], 16)
-                    line_idx += 1
-                    for k in range(6):
-                        out_c = start_ch + k
-                        if out_c < end_ch:
-                            byte = (val_hex >> (k*8)) & 0xFF
-                            w_tensor[out_c, in_c, r, s] = hex2signed(byte, 8)
-
-    b_tensor = np.zeros((OUTPUT_CH,), dtype=np.int32)
-    with open(BIAS_FILE, 'r') as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    for i, (start_ch, end_ch) in enumerate(groups):
-        if i >= len(lines): break
-        val_hex = int(lines[i], 16)
-        for k in range(6):
-            out_c = start_ch + k
-            if out_c < end_ch:
-                chunk = (val_hex >> (k*32)) & 0xFFFFFFFF
-                b_tensor[out_c] = hex2signed(chunk, 32)
+    w_tensor = decode_conv2_weights(load_init(WEIGHTS_FILE, 8, 6))
+    b_tensor = decode_conv2_bias(load_init(BIAS_FILE, 32, 6))
     return w_tensor, b_tensor
 
 def simulate_layer2(img, weights, bias):
     print("3. Simulating Layer 2 Calculation Steps...")
 
-    # Step A: Valid Convolution
-    # In: 14x14, K: 5x5 -> Out: 10x10
-    conv_h = INPUT_H - KERNEL_SIZE + 1
-    conv_w = INPUT_W - KERNEL_SIZE + 1
-
-    conv_out = np.zeros((conv_h, conv_w, OUTPUT_CH), dtype=np.int32)
-
-    for k in range(OUTPUT_CH):
-        for r in range(conv_h):
-            for c in range(conv_w):
-                acc = 0
-                for in_c in range(INPUT_CH):
-                    patch = img[r:r+KERNEL_SIZE, c:c+KERNEL_SIZE, in_c]
-                    kernel = weights[k, in_c, :, :]
-                    partial = np.sum(patch * kernel)
-
-                    acc += partial
-
-                    # 【新增验证】：打印 (0,0) 位置 Input Ch 0 的部分和
-                    if k == 0 and r == 0 and c == 0 and in_c == 0:
-                        print(f"\n[DEBUG CHECK] Out(0,0) OutCh 0:")
-                        print(f"  Input Ch 0 Contribution: {partial}")
-                        debug_acc_ch0 = partial
-
-                    if k == 0 and r == 0 and c == 0 and in_c == 5:
-                         print(f"  Total Conv Sum (All 6 Chs): {acc}\n")
-                conv_out[r, c, k] = acc
-    save_debug_file("l2_debug_1_conv.txt", conv_out, "Raw Conv")
-
-    # Step B & C: Bias & ReLU
-    relu_out = np.zeros_like(conv_out)
-    for k in range(OUTPUT_CH):
-        val = conv_out[:, :, k] + bias[k]
-        val[val < 0] = 0
-        relu_out[:, :, k] = val
-    save_debug_file("l2_debug_3_relu.txt", relu_out, "Bias + ReLU")
-
-    # Step D: Max Pooling (2x2)
-    # In: 10x10 -> Out: 5x5
-    # 【注意】：10/2 = 5. 这里的尺寸是 5x5.
-    pool_out = np.zeros((OUT_H_FINAL, OUT_W_FINAL, OUTPUT_CH), dtype=np.int32)
-
-    for k in range(OUTPUT_CH):
-        for r in range(OUT_H_FINAL):
-            for c in range(OUT_W_FINAL):
-                window = relu_out[2*r : 2*r+2, 2*c : 2*c+2, k]
-                pool_out[r, c, k] = np.max(window)
-    save_debug_file("l2_debug_4_pool.txt", pool_out, "Pool")
-
-    # Step E: Quantization
-    final_out = np.zeros_like(pool_out, dtype=np.int8)
+    # Step A ~ E: Conv -> Bias -> ReLU -> Pool -> Quant (shared engine)
+    # In: 14x14, K: 5x5 -> Conv: 10x10 -> Pool: 5x5
     print(f"   [Quantization] Right Shift: {QUANT_SHIFT}")
-    for k in range(OUTPUT_CH):
-        for r in range(OUT_H_FINAL):
-            for c in range(OUT_W_FINAL):
-                val = pool_out[r, c, k]
-                val_shifted = val >> QUANT_SHIFT
-                final_out[r, c, k] = saturate_cast(val_shifted)
-
-    save_debug_file("l2_debug_5_final.txt", final_out, "Final L2 Out")
-    return final_out
+    stages = conv_layer(img, weights, bias, QUANT_SHIFT)
+
+    # 【验证】：(0,0) 位置 OutCh 0 的 Input Ch 0 部分和
+    partial = np.sum(img[0:KERNEL_SIZE, 0:KERNEL_SIZE, 0] * weights[0, 0])
+    print(f"\n[DEBUG CHECK] Out(0,0) OutCh 0:")
+    print(f"  Input Ch 0 Contribution: {partial}")
+    print(f"  Total Conv Sum (All 6 Chs): {stages['conv'][0, 0, 0]}\n")
+
+    save_debug_file("l2_debug_1_conv.txt", stages["conv"], "Raw Conv")
+    save_debug_file("l2_debug_3_relu.txt", stages["relu"], "Bias + ReLU")
+    save_debug_file("l2_debug_4_pool.txt", stages["pool"], "Pool")
+    save_debug_file("l2_debug_5_final.txt", stages["final"], "Final L2 Out")
+    return stages["final"]
 
 def generate_comparison_file(data):
     filename = "l2_golden_compare.txt"
@@ -0,0 +1,92 @@
+"""
+Vectorized INT8 convolution engine shared by the layer golden models.
+
+Every stage mirrors the systolic datapath of the RTL:
+    Conv (int32 acc) -> + Bias -> ReLU -> 2x2 MaxPool -> >> QUANT_SHIFT -> Saturate(int8)
+
+Feature maps are channel-last: [..., H, W, C]. Any leading axes are treated as
+batch axes, so the same functions run on one image [H, W, C] or on N images.
+Weights use the PyTorch layout [K (Out_Ch), C (In_Ch), R, S].
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from int_gemm import exact_matmul
+
+# ================= Stages =================
+
+def pad_hw(x, padding):
+    """Zero padding on H/W (Loader behaviour). x: [..., H, W, C]"""
+    if padding == 0:
+        return x
+    pad = [(0, 0)] * (x.ndim - 3) + [(padding, padding), (padding, padding), (0, 0)]
+    return np.pad(x, pad)
+
+def im2col(x, kernel_r, kernel_s):
+    """
+    Build the im2col matrix with stride tricks (no copy until the reshape).
+    x: [..., H, W, C] -> [..., OH, OW, C*R*S]
+    Column order is (c, r, s), i.e. the same as weights.reshape(K, -1).
+    """
+    # sliding_window_view appends the window axes: [..., OH, OW, C, R, S]
+    win = sliding_window_view(x, (kernel_r, kernel_s), axis=(-3, -2))
+    oh, ow, c = win.shape[-5:-2]
+    return win.reshape(x.shape[:-3] + (oh, ow, c * kernel_r * kernel_s))
+
+def conv2d(x, weights):
+    """
+    Valid convolution as one exact integer GEMM.
+    x: [..., H, W, C] int, weights: [K, C, R, S] int -> [..., OH, OW, K] int32
+    """
+    k, c, r, s = weights.shape
+    if x.shape[-1] != c:
+        raise ValueError(f"Channel mismatch: input has {x.shape[-1]}, weights expect {c}")
+
+    cols = im2col(np.asarray(x), r, s)
+    w_mat = np.asarray(weights).reshape(k, c * r * s).T # [C*R*S, K]
+
+    # Exact int64 sums via float BLAS (int_gemm.py), then
+    # 32-bit accumulator (ACC_WIDTH): wrap like the hardware adder
+    acc = exact_matmul(cols.reshape(-1, c * r * s), w_mat)
+    return acc.astype(np.int32).reshape(cols.shape[:-1] + (k,))
+
+def add_bias(acc, bias):
+    """acc: [..., K] int32, bias: [K] int32"""
+    return (acc + np.asarray(bias, dtype=np.int32)).astype(np.int32)
+
+def relu(x):
+    return np.maximum(x, 0)
+
+def maxpool2x2(x):
+    """2x2 / stride 2 max pooling. x: [..., H, W, C] -> [..., H/2, W/2, C]"""
+    h, w, c = x.shape[-3:]
+    ph, pw = h // 2, w // 2
+    x = x[..., :ph * 2, :pw * 2, :]
+    return x.reshape(x.shape[:-3] + (ph, 2, pw, 2, c)).max(axis=(-4, -2))
+
+def shift_saturate(x, shift):
+    """Arithmetic right shift then saturate to int8 (-128 ~ 127)"""
+    return np.clip(x >> shift, -128, 127).astype(np.int8)
+
+# ================= Fused Layer =================
+
+def conv_layer(x, weights, bias, shift, padding=0, relu_en=True, pool_en=True):
+    """
+    Run one full conv layer and keep every intermediate stage.
+
+    Returns a dict of channel-last arrays:
+        padded : padded input
+        conv   : raw accumulation (int32)
+        bias   : conv + bias (int32)
+        relu   : after ReLU (int32)
+        pool   : after 2x2 max pooling (int32)
+        final  : quantized output (int8)
+    """
+    stages = {}
+    stages["padded"] = pad_hw(np.asarray(x, dtype=np.int32), padding)
+    stages["conv"] = conv2d(stages["padded"], weights)
+    stages["bias"] = add_bias(stages["conv"], bias)
+    stages["relu"] = relu(stages["bias"]) if relu_en else stages["bias"]
+    stages["pool"] = maxpool2x2(stages["relu"]) if pool_en else stages["relu"]
+    stages["final"] = shift_saturate(stages["pool"], shift)
+    return stages
@@ -0,0 +1,247 @@
+"""
+FC weight-streaming simulator for the fc_accelerator_top Req/Ack micro-batch protocol.
+
+Per micro-batch of FC_BATCH neurons fc_accelerator_top raises weight_req_o
+(REQ_WEIGHTS), waits for weight_ack_i, then consumes one weight vector
+(batch_size bytes, one column of W^T) per cycle for in_len cycles through the
+weights_vector_d1/_d2 registers, drains, writes back and loops:
+
+    REQ_WEIGHTS -> CALC_STREAM (in_len + 4) -> WAIT_SA x2 -> WRITE_BACK (size) -> CHECK_LOOP
+
+The testbench serves every vector from an array, i.e. an ideal memory. Here
+the vectors come from a DRAM model instead:
+
+    DRAM_LATENCY   cycles from issuing a vector fetch to its first byte
+                   (fetches are pipelined, the latency overlaps)
+    DRAM_BW        bytes/cycle of the (serialized) data bus
+    PREFETCH_DEPTH weight vectors the prefetcher may hold / have in flight ahead
+                   of the PE array (0 = fetch on demand, one vector at a time)
+    GATE_ON_REQ    1: no fetch for a batch before its weight_req_o (today's
+                   handshake), 0: prefetch runs ahead across batches and layers
+                   (also during the LOAD_SRAM flatten)
+    WEIGHT_BITS    8, or 4 for INT4 packed weights (export_fc.py --int4): half
+                   the bytes per vector, plus one exponent byte per neuron with
+                   the first vector (per-row scale, int4_pack.py)
+
+The first vector of a batch also carries the 32-bit bias of every neuron. When
+a vector is late the array stalls (weights_vector_i held, calc_en low), which
+the RTL would need a valid/stall input for; the stall cycles are what it costs.
+
+    overlap efficiency = ideal cycles (ideal memory, = perf_model.py) / simulated cycles
+
+Usage:
+    python fc_stream_sim.py
+    python fc_stream_sim.py --set DRAM_LATENCY=100 --sweep PREFETCH_DEPTH=0,1,8,64,256
+    python fc_stream_sim.py --size-depth --target 0.99
+    python fc_stream_sim.py --int4 --set DRAM_BW=16
+"""
+import argparse
+import itertools
+import math
+
+import perf_model
+
+# ================= 配置区域 =================
+DEFAULT_CFG = {
+    # fc_systolic_array #(100)
+    "FC_BATCH"      : perf_model.DEFAULT_CFG["FC_BATCH"],
+    # TB FC feed: weight_req_o -> @(negedge) fc_weight_ack
+    "FC_ACK_LATENCY": perf_model.DEFAULT_CFG["FC_ACK_LATENCY"],
+    "CLK_MHZ"       : perf_model.DEFAULT_CFG["CLK_MHZ"],
+    # Memory system (assumed, not in RTL yet)
+    "DRAM_LATENCY"  : 40,
+    "DRAM_BW"       : 128.0,
+    "PREFETCH_DEPTH": 16,
+    "GATE_ON_REQ"   : 1,
+    "WEIGHT_BITS"   : 8,
+}
+BIAS_BYTES = 4
+EXP_BYTES = 1
+# ============================================
+
+# ================= Weight Stream =================
+
+def batches(cfg):
+    """[(layer, in_len, out_len, batch size)] in fc_accelerator_top order"""
+    out = []
+    for name, in_len, out_len in perf_model.FC_LAYERS:
+        for b in range(math.ceil(out_len / cfg["FC_BATCH"])):
+            out.append((name, in_len, out_len, min(cfg["FC_BATCH"], out_len - b * cfg["FC_BATCH"])))
+    return out
+
+class Dram:
+    """Pipelined latency, one shared data bus of DRAM_BW bytes/cycle"""
+    def __init__(self, latency, bw):
+        self.latency = latency
+        self.bw = bw
+        self.bus_free = 0.0
+        self.busy = 0.0
+        self.bytes = 0
+
+    def fetch(self, issue, nbytes):
+        """Returns the cycle the last byte of a fetch issued at `issue` arrives"""
+        xfer = nbytes / self.bw
+        start = max(issue + self.latency, self.bus_free)
+        self.bus_free = start + xfer
+        self.busy += xfer
+        self.bytes += nbytes
+        return self.bus_free
+
+# ================= Simulation =================
+
+def simulate(cfg=None):
+    """
+    Returns a dict: cfg, layers {name: {cycles, ideal, stall}}, total, ideal,
+    stall, dram_busy, dram_bytes, efficiency, images_per_s (FC part only), vectors.
+    """
+    cfg = dict(DEFAULT_CFG, **(cfg or {}))
+    depth = int(cfg["PREFETCH_DEPTH"])
+    dram = Dram(cfg["DRAM_LATENCY"], cfg["DRAM_BW"])
+    int4 = cfg["WEIGHT_BITS"] < 8
+
+    consumed = []   # consume cycle of every vector, global order
+    layers = {}
+    # fc_controller LOAD_SRAM runs first, prefetch can start with it
+    t = perf_model.fc_flatten_cycles(perf_model.FC_LAYERS[0][1])
+    prev = None
+    for name, in_len, out_len, size in batches(cfg):
+        if name != prev:
+            if prev is not None:
+                t += 2
+                layers[prev]["cycles"] = t - layers[prev]["start"]
+            # FCx_RUN, core IDLE -> REQ_WEIGHTS
+            t += 2
+            ideal = perf_model.fc_layer_cycles(in_len, out_len, dict(perf_model.DEFAULT_CFG, **cfg))["total"]
+            layers[name] = {"start": t - 2, "stall": 0, "ideal": ideal}
+            prev = name
+
+        t_req = t
+        c = None
+        for j in range(in_len):
+            i = len(consumed)
+            # Earliest issue: a free prefetch slot (or on demand), and the handshake
+            if depth == 0:
+                issue = t_req if c is None else c + 1
+            else:
+                issue = consumed[i - depth] if i >= depth else 0
+            if cfg["GATE_ON_REQ"]:
+                issue = max(issue, t_req)
+            nbytes = math.ceil(size * cfg["WEIGHT_BITS"] / 8)
+            if j == 0:
+                nbytes += (BIAS_BYTES + (EXP_BYTES if int4 else 0)) * size
+            ready = math.ceil(dram.fetch(issue, nbytes))
+
+            want = (t_req + 1 + cfg["FC_ACK_LATENCY"]) if c is None else c + 1
+            c = max(want, ready)
+            layers[name]["stall"] += c - want
+            consumed.append(c)
+        # Pipeline drain (+4), WAIT_SA x2, WRITE_BACK, CHECK_LOOP
+        t = c + 1 + 4 + 2 + size + 1
+    # DONE, done_o register
+    t += 2
+    layers[prev]["cycles"] = t - layers[prev]["start"]
+
+    flatten = perf_model.fc_flatten_cycles(perf_model.FC_LAYERS[0][1])
+    ideal = flatten + sum(l["ideal"] for l in layers.values())
+    stall = sum(l["stall"] for l in layers.values())
+    return {
+        "cfg"         : cfg,
+        "layers"      : layers,
+        "flatten"     : flatten,
+        "total"       : t,
+        "ideal"       : ideal,
+        "stall"       : stall,
+        "dram_busy"   : dram.busy,
+        "dram_bytes"  : dram.bytes,
+        "efficiency"  : ideal / t,
+        "images_per_s": cfg["CLK_MHZ"] * 1e6 / t,
+        "vectors"     : len(consumed),
+    }
+
+def size_depth(cfg, target):
+    """Smallest PREFETCH_DEPTH with efficiency >= target (None if even a full-size FIFO misses it)"""
+    hi = simulate(dict(cfg, PREFETCH_DEPTH=0))["vectors"]
+    if simulate(dict(cfg, PREFETCH_DEPTH=hi))["efficiency"] < target:
+        return None
+    lo = 0
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if simulate(dict(cfg, PREFETCH_DEPTH=mid))["efficiency"] >= target:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def print_report(sim):
+    cfg = sim["cfg"]
+    print(f"Config: FC_BATCH={cfg['FC_BATCH']}, DRAM_LATENCY={cfg['DRAM_LATENCY']}, DRAM_BW={cfg['DRAM_BW']:g} B/cycle, "
+          f"PREFETCH_DEPTH={cfg['PREFETCH_DEPTH']}, GATE_ON_REQ={cfg['GATE_ON_REQ']}, WEIGHT_BITS={cfg['WEIGHT_BITS']}")
+    print(f"{'Layer':<8} {'Cycles':>8} {'Ideal':>8} {'Stall':>8} {'Eff':>7}")
+    print(f"{'Flatten':<8} {sim['flatten']:>8} {sim['flatten']:>8} {0:>8} {1:>7.1%}")
+    for name, l in sim["layers"].items():
+        print(f"{name:<8} {l['cycles']:>8} {l['ideal']:>8} {l['stall']:>8} {l['ideal'] / l['cycles']:>7.1%}")
+    print(f"Total: {sim['total']} cycles (ideal {sim['ideal']}), {sim['stall']} PE stall cycles, "
+          f"overlap efficiency {sim['efficiency']:.1%}")
+    bound = "bandwidth-bound" if sim["dram_busy"] > sim["ideal"] else "latency/depth-bound" if sim["stall"] else "hidden"
+    print(f"DRAM: {sim['vectors']} vectors, {sim['dram_bytes']} B, bus busy {sim['dram_busy']:.0f} cycles ({bound})")
+
+def print_int4_report(cfg):
+    """INT8 vs INT4 weight stream: bytes, bus time and FC cycles"""
+    sims = {bits: simulate(dict(cfg, WEIGHT_BITS=bits)) for bits in (8, 4)}
+    print(f"DRAM_BW={cfg['DRAM_BW']:g} B/cycle, DRAM_LATENCY={cfg['DRAM_LATENCY']}, PREFETCH_DEPTH={cfg['PREFETCH_DEPTH']}, "
+          f"GATE_ON_REQ={cfg['GATE_ON_REQ']}")
+    print(f"{'Weights':<8} {'Bytes':>8} {'Bus busy':>9} {'Cycles':>8} {'Stall':>8} {'img/s':>8}")
+    for bits, sim in sims.items():
+        print(f"{'INT' + str(bits):<8} {sim['dram_bytes']:>8} {sim['dram_busy']:>9.0f} {sim['total']:>8} "
+              f"{sim['stall']:>8} {sim['images_per_s']:>8.0f}")
+    s8, s4 = sims[8], sims[4]
+    print(f"INT4 moves {1 - s4['dram_bytes'] / s8['dram_bytes']:.1%} fewer bytes "
+          f"({1 - s4['dram_busy'] / s8['dram_busy']:.1%} less bus time), "
+          f"FC phase {s8['total']} -> {s4['total']} cycles ({1 - s4['total'] / s8['total']:.1%} saved); "
+          f"floor without stalls: {s8['ideal']} cycles")
+
+# ================= Entry =================
+
+def main():
+    parser = argparse.ArgumentParser(description="FC weight-streaming / prefetch simulator")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VAL",
+                        help="override one parameter, e.g. DRAM_LATENCY=100")
+    parser.add_argument("--sweep", action="append", default=[], metavar="KEY=V1,V2",
+                        help="sweep a parameter (repeat for a cartesian product)")
+    parser.add_argument("--size-depth", action="store_true",
+                        help="find the smallest PREFETCH_DEPTH reaching --target efficiency")
+    parser.add_argument("--target", type=float, default=0.99, help="overlap efficiency target for --size-depth")
+    parser.add_argument("--int4", action="store_true", help="compare INT8 and INT4 packed weight streams")
+    args = parser.parse_args()
+
+    base = dict(DEFAULT_CFG, **dict(perf_model.parse_assign(s, cfg=DEFAULT_CFG) for s in args.set))
+    if args.int4:
+        print_int4_report(base)
+        return
+    if args.size_depth:
+        for gate in (1, 0):
+            cfg = dict(base, GATE_ON_REQ=gate)
+            depth = size_depth(cfg, args.target)
+            label = "gated by weight_req" if gate else "free-running"
+            if depth is None:
+                print(f"{label:<20}: {args.target:.0%} not reachable at any depth "
+                      f"(max {simulate(dict(cfg, PREFETCH_DEPTH=10 ** 6))['efficiency']:.1%})")
+            else:
+                sim = simulate(dict(cfg, PREFETCH_DEPTH=depth))
+                print(f"{label:<20}: PREFETCH_DEPTH={depth} vectors ({depth * cfg['FC_BATCH']} B), "
+                      f"efficiency {sim['efficiency']:.1%}, {sim['stall']} stall cycles")
+        return
+    if not args.sweep:
+        print_report(simulate(base))
+        return
+
+    sweeps = dict(perf_model.parse_assign(s, multi=True, cfg=DEFAULT_CFG) for s in args.sweep)
+    keys = list(sweeps)
+    print(" ".join(f"{k:>14}" for k in keys) + f" {'Cycles':>8} {'Stall':>8} {'Eff':>7} {'img/s':>8}")
+    for combo in itertools.product(*sweeps.values()):
+        sim = simulate(dict(base, **dict(zip(keys, combo))))
+        print(" ".join(f"{v:>14}" for v in combo)
+              + f" {sim['total']:>8} {sim['stall']:>8} {sim['efficiency']:>7.1%} {sim['images_per_s']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
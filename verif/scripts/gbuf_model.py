@@ -0,0 +1,276 @@
+"""
+Transaction-level model of global_buffer (K_CHANNELS banks x SRAM_DEPTH bytes,
+one read port + one write port per bank) and of the address remapping that
+lenet5_top / fc_accelerator_top use for the FC flattened read.
+
+The access streams of one image are replayed cycle by cycle:
+
+    Preload  : TB loader writes the 32x32 padded image into bank 0
+    L1       : input_buffer_bank reads bank 0 (1 byte/cycle), result_handler
+               writes 14x14 pooled pixels to banks 0..5 @ ADDR_L1_OUT
+    L2 g0..2 : 6 input-channel passes reading bank c @ ADDR_L1_OUT, pooled 5x5
+               outputs to banks 0..5 @ ADDR_L2_OUT + g * L2_OUT_CH_SIZE
+    FC load  : fc_accelerator_top LOAD_L2 reads ch 0..15 x 25 pixels from
+               bank ch % 6 @ ADDR_L2_OUT + px + (ch / 6) * 25
+
+Timing of the conv phases comes from perf_model.py. Every phase reports per-bank
+reads / writes / port conflicts / idle cycles and bytes moved. When a golden
+result is given, the data written by the conv streams is checked against what
+the FC remap reads back (Channel-Major flatten).
+
+Usage:
+    python gbuf_model.py            # uses the init files + golden model for data
+"""
+import argparse
+
+import numpy as np
+
+import perf_model
+from golden_model import RTL_INIT_DIR, flatten_channel_major, load_image_hex, load_params, run_batch
+
+# ================= 配置区域 (lenet_controller / definitions.sv) =================
+N_BANKS = 6             # K_CHANNELS
+SRAM_DEPTH = 4096
+ADDR_IMG_IN = 0x0000
+ADDR_L1_OUT = 0x0400
+ADDR_L2_OUT = 0x0800
+L2_OUT_CH_SIZE = 25
+# ===============================================================================
+
+# ================= Bank Model =================
+
+class GlobalBuffer:
+    """
+    n_banks x depth bytes, 1 read + 1 write port per bank.
+    Requests beyond one per port and cycle are conflicts: they are serialized,
+    i.e. the transaction takes as many cycles as the busiest port needs.
+    """
+    def __init__(self, n_banks=N_BANKS, depth=SRAM_DEPTH):
+        self.n_banks = n_banks
+        self.depth = depth
+        self.mem = np.zeros((n_banks, depth), dtype=np.int8)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.cycles = 0
+        self.reads = np.zeros(self.n_banks, dtype=np.int64)
+        self.writes = np.zeros(self.n_banks, dtype=np.int64)
+        self.conflicts = np.zeros(self.n_banks, dtype=np.int64)
+        self.busy = np.zeros(self.n_banks, dtype=np.int64)
+
+    def _check(self, bank, addr):
+        if not (0 <= bank < self.n_banks and 0 <= addr < self.depth):
+            raise IndexError(f"Global buffer access out of range: bank {bank}, addr 0x{addr:x}")
+
+    def access(self, reads=(), writes=()):
+        """
+        One transaction slot. reads: [(bank, addr)], writes: [(bank, addr, value)].
+        Returns (read data list, cycles taken).
+        """
+        rd_cnt = np.zeros(self.n_banks, dtype=np.int64)
+        wr_cnt = np.zeros(self.n_banks, dtype=np.int64)
+        data = []
+        # Same-cycle read and write of one address returns the old data (read-first SRAM)
+        for bank, addr in reads:
+            self._check(bank, addr)
+            rd_cnt[bank] += 1
+            data.append(int(self.mem[bank, addr]))
+        for bank, addr, value in writes:
+            self._check(bank, addr)
+            wr_cnt[bank] += 1
+            self.mem[bank, addr] = value
+
+        cycles = int(max(1, rd_cnt.max(initial=0), wr_cnt.max(initial=0)))
+        self.reads += rd_cnt
+        self.writes += wr_cnt
+        self.conflicts += np.maximum(rd_cnt - 1, 0) + np.maximum(wr_cnt - 1, 0)
+        self.busy += np.minimum(np.maximum(rd_cnt, wr_cnt), cycles)
+        self.cycles += cycles
+        return data, cycles
+
+    def stats(self):
+        return {
+            "cycles"   : self.cycles,
+            "reads"    : self.reads.copy(),
+            "writes"   : self.writes.copy(),
+            "conflicts": self.conflicts.copy(),
+            "idle"     : self.cycles - self.busy,
+            "bytes"    : int(self.reads.sum() + self.writes.sum()),
+        }
+
+# ================= Access Streams =================
+
+def fc_remap(ch, px, n_banks=N_BANKS, ch_size=L2_OUT_CH_SIZE, base=ADDR_L2_OUT):
+    """fc_accelerator_top LOAD_L2: logical (ch, px) -> (bank, addr)"""
+    return ch % n_banks, base + px + (ch // n_banks) * ch_size
+
+def preload_stream(image):
+    """TB load_image_to_sram: 32x32 zero-padded image, one byte per cycle into bank 0"""
+    padded = np.zeros((32, 32), dtype=np.int8)
+    padded[2:30, 2:30] = image
+    for i, v in enumerate(padded.ravel()):
+        yield [], [(0, ADDR_IMG_IN + i, int(v))]
+
+def conv_pass_stream(img_hw, kernel, in_bank, read_base, cfg, out=None, write_base=0, n_banks=N_BANKS):
+    """
+    One systolic_wrapper input-channel pass.
+    Reads: K rows prefetch, then one row refill per output row (1 byte/cycle).
+    Writes (last pass only, out = [OH/2, OW/2, n_banks]): every second conv row
+    the pooled row is written, one pixel per 2 cycles, bank k skewed by k cycles.
+    """
+    row_cycles = perf_model.conv_row_cycles(img_hw, kernel, cfg)
+    rows = img_hw - kernel + 1
+    addr = 0
+    for _ in range(kernel * img_hw):
+        yield [(in_bank, read_base + addr)], []
+        addr += 1
+    yield [], []
+    yield [], []
+
+    wr_ptr = 0
+    # Writes that leave the array after their row ended: {cycle offset into the next row: [writes]}
+    carry = {}
+    for r in range(rows):
+        slots = [([], []) for _ in range(row_cycles)]
+        pending, carry = carry, {}
+        if addr < img_hw * img_hw:
+            for c in range(img_hw):
+                slots[c][0].append((in_bank, read_base + addr))
+                addr += 1
+        if out is not None and r % 2 == 1 and r // 2 < out.shape[0]:
+            # First output pixel leaves the array once the K*(K-1) skew is filled
+            t0 = kernel * (kernel - 1)
+            for j in range(out.shape[1]):
+                for k in range(n_banks):
+                    t = t0 + 2 * j + 1 + k
+                    pending.setdefault(t, []).append((k, write_base + wr_ptr + j, int(out[r // 2, j, k])))
+            wr_ptr += out.shape[1]
+        for t, writes in pending.items():
+            if t < row_cycles:
+                slots[t][1].extend(writes)
+            else:
+                carry.setdefault(t - row_cycles, []).extend(writes)
+        for s in slots:
+            yield s
+    # Writes still in flight after the last row: extra cycles at the end of the pass
+    for t in range(max(carry, default=-1) + 1):
+        yield [], carry.get(t, [])
+
+def group_output(final, img_hw, kernel, out_ch, g, n_banks=N_BANKS):
+    """
+    Pooled data result_handler writes for output group g: [OH/2, OW/2, n_banks].
+    Channels past out_ch (L2 group 2, banks 4/5) are written as padding.
+    """
+    pooled = (img_hw - kernel + 1) // 2
+    out = np.zeros((pooled, pooled, n_banks), dtype=np.int8)
+    if final is not None:
+        chs = final[:, :, g * n_banks:(g + 1) * n_banks]
+        out[:, :, :chs.shape[-1]] = chs
+    return out
+
+def conv_layer_streams(name, img_hw, kernel, in_ch, out_ch, read_base, write_base, cfg, final=None,
+                       n_banks=N_BANKS, group_stride=0):
+    """
+    {phase name: stream} for every output group of a conv layer.
+    final: golden output [OH/2, OW/2, out_ch] or None (zeros are written).
+    """
+    groups = -(-out_ch // n_banks)
+    phases = {}
+    for g in range(groups):
+        out = group_output(final, img_hw, kernel, out_ch, g, n_banks)
+
+        def stream(g=g, out=out):
+            for c in range(in_ch):
+                last = (c == in_ch - 1)
+                yield from conv_pass_stream(img_hw, kernel, c, read_base, cfg,
+                                            out if last else None, write_base + g * group_stride, n_banks)
+        phases[f"{name} g{g}" if groups > 1 else name] = stream()
+    return phases
+
+def fc_load_stream(in_len=400, ch_size=L2_OUT_CH_SIZE, n_banks=N_BANKS):
+    """LOAD_L2: one logical element per cycle through fc_remap()"""
+    for i in range(in_len):
+        ch, px = divmod(i, ch_size)
+        yield [fc_remap(ch, px, n_banks, ch_size)], []
+    # WAIT_LAST_WRITE_1/2
+    yield [], []
+    yield [], []
+
+# ================= Replay =================
+
+def replay(image=None, params=None, cfg=None, n_banks=N_BANKS):
+    """
+    Replay one image through the global buffer.
+    image: [1, 28, 28] int8 or None (addresses only).
+    Returns (phase stats dict, fc_in read back by the FC remap, golden fc_in);
+    the last two are None without an image.
+    """
+    cfg = dict(perf_model.DEFAULT_CFG, **(cfg or {}))
+    result = run_batch(image, params) if image is not None else None
+    l1 = result["l1"]["final"][0] if result else None
+    l2 = result["l2"]["final"][0] if result else None
+
+    (l1_name, l1_hw, l1_k, l1_in, l1_out), (l2_name, l2_hw, l2_k, l2_in, l2_out) = perf_model.CONV_LAYERS
+    phases = {"Preload": preload_stream(image[0] if image is not None else np.zeros((28, 28), np.int8))}
+    phases.update(conv_layer_streams(l1_name, l1_hw, l1_k, l1_in, l1_out, ADDR_IMG_IN, ADDR_L1_OUT, cfg, l1, n_banks))
+    phases.update(conv_layer_streams(l2_name, l2_hw, l2_k, l2_in, l2_out, ADDR_L1_OUT, ADDR_L2_OUT, cfg, l2, n_banks,
+                                     group_stride=L2_OUT_CH_SIZE))
+    phases["FC load"] = fc_load_stream(n_banks=n_banks)
+
+    gb = GlobalBuffer(n_banks)
+    stats, fc_in = {}, []
+    for name, stream in phases.items():
+        gb.reset_stats()
+        for reads, writes in stream:
+            data, _ = gb.access(reads, writes)
+            if name == "FC load":
+                fc_in.extend(data)
+        stats[name] = gb.stats()
+
+    readback = np.array(fc_in, dtype=np.int8) if result else None
+    expected = flatten_channel_major(result["l2"]["final"])[0] if result else None
+    return stats, readback, expected
+
+def print_report(stats):
+    n_banks = len(next(iter(stats.values()))["reads"])
+    print(f"{'Phase':<9} {'Cycles':>7} {'Bytes':>6} {'B/cyc':>6} " + " ".join(f"{'Bank' + str(b):>17}" for b in range(n_banks)))
+    print(f"{'':<9} {'':>7} {'':>6} {'':>6} " + " ".join(f"{'rd/wr/cf/idle%':>17}" for _ in range(n_banks)))
+    total = None
+    for name, s in stats.items():
+        cells = [f"{r}/{w}/{c}/{i / max(s['cycles'], 1):.0%}"
+                 for r, w, c, i in zip(s["reads"], s["writes"], s["conflicts"], s["idle"])]
+        print(f"{name:<9} {s['cycles']:>7} {s['bytes']:>6} {s['bytes'] / max(s['cycles'], 1):>6.2f} "
+              + " ".join(f"{c:>17}" for c in cells))
+        total = s if total is None else {k: total[k] + s[k] for k in s}
+    print(f"Total: {total['cycles']} cycles, {total['bytes']} bytes moved, "
+          f"{int(total['conflicts'].sum())} port conflicts, "
+          f"peak {2 * n_banks} B/cycle, achieved {total['bytes'] / total['cycles']:.2f} B/cycle")
+
+    fc = stats.get("FC load")
+    if fc is not None:
+        # Busiest bank bounds a bank-parallel flatten (fc_buffer still takes 1 byte/cycle)
+        n = int(fc["reads"].sum())
+        print(f"FC load: {n} reads over {fc['cycles']} cycles with {int(fc['conflicts'].sum())} conflicts, one bank per cycle "
+              f"(banks {np.mean(fc['idle'] / fc['cycles']):.0%} idle on average). "
+              f"Reading all {n_banks} banks per cycle would need ~{int(fc['reads'].max())} cycles.")
+
+# ================= Entry =================
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaction-level global_buffer model")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR, help="directory of the .hex init files")
+    parser.add_argument("--no-data", action="store_true", help="replay addresses only (no golden data check)")
+    args = parser.parse_args()
+
+    image = params = None
+    if not args.no_data:
+        params = load_params(args.init_dir)
+        image = load_image_hex(f"{args.init_dir}/input_image.hex")
+    stats, readback, expected = replay(image, params)
+    print_report(stats)
+    if readback is not None:
+        ok = np.array_equal(readback, expected)
+        print(f"FC remap read-back vs golden Channel-Major flatten: {'PASS' if ok else 'FAIL'}")
+
+if __name__ == "__main__":
+    main()
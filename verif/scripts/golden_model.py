@@ -0,0 +1,267 @@
+"""
+Batched golden model of the whole LeNet-5 INT8 datapath.
+
+    [N, 28, 28] int8 -> Conv1 -> Conv2 -> Flatten (Channel-Major) -> FC1 -> FC2 -> FC3
+
+Every layer runs on all N images at once (Conv: one GEMM per layer, FC: one
+[N, In] x [In, Out] matmul per layer) and keeps the same intermediate stages
+as the single-image debug scripts.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+import int4_pack
+import sparse_stream
+from conv_engine import conv_layer, shift_saturate
+from init_bundle import load_init
+from int_gemm import exact_matmul
+
+# ================= 配置区域 (请与 RTL 参数保持一致) =================
+QUANT_SHIFT = 8
+INPUT_H, INPUT_W = 28, 28
+PADDING = 2
+KERNEL_SIZE = 5
+
+# Layers with their own >> shift (cfg_quant_shift_o: L1/L2, fc_quant_shift_o: FC1..3)
+LAYERS = ("l1", "l2", "fc1", "fc2", "fc3")
+
+# Conv2 is computed in 3 passes of 6 output channels (out_group_cnt)
+K_CHANNELS = 6
+CONV2_GROUPS = [(0, 6), (6, 12), (12, 16)]
+
+# Init file -> (bits, lanes) as read by load_params(). 32-bit conv2 bias lines
+# are read as 6-lane words (lane 0 = the word) like dma_transfer_bias does.
+INIT_READ = {
+    "conv1_weights.hex": (8, K_CHANNELS), "conv1_bias.hex": (32, 1),
+    "conv2_weights.hex": (8, K_CHANNELS),
+    "conv2_bias.hex": (32, K_CHANNELS), "conv2_bias_burst.hex": (32, K_CHANNELS),
+    "fc1_weights.hex": (8, 1), "fc1_bias.hex": (32, 1),
+    "fc2_weights.hex": (8, 1), "fc2_bias.hex": (32, 1),
+    "fc3_weights.hex": (8, 1), "fc3_bias.hex": (32, 1),
+}
+# INT4 packed FC weights (export_fc.py --int4), used instead of fc*_weights.hex
+for _name in ("fc1", "fc2", "fc3"):
+    INIT_READ[int4_pack.weight_file(_name)] = (8, 1)
+    INIT_READ[int4_pack.exp_file(_name)] = (8, 1)
+# Pruned FC1 compressed stream (export_fc.py --sparse), used instead of fc1_weights.hex
+INIT_READ[sparse_stream.stream_file("fc1")] = (8, 1)
+
+# Image quantization (export_conv1.py: Q1.7)
+SCALE_FACTOR = 128.0
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RTL_INIT_DIR = os.path.join(SCRIPT_DIR, "../../hardware/rtl/init_files")
+# ===================================================================
+
+# ================= Parameter Loading =================
+
+def _read_hex(filepath, bits=8, lanes=1):
+    try:
+        return load_init(filepath, bits, lanes)
+    except FileNotFoundError:
+        print(f"[Error] File not found: {filepath}")
+        sys.exit(1)
+
+def decode_conv2_weights(lanes):
+    """
+    conv2_weights.hex lanes [Lines, 6] -> [16, 6, 5, 5]
+    Line order: Group -> In_Ch -> R -> S, Lane k = Out_Ch (Group*6 + k).
+    Missing lines read as 0.
+    """
+    n_lines = len(CONV2_GROUPS) * K_CHANNELS * KERNEL_SIZE * KERNEL_SIZE
+    lanes = np.pad(lanes, ((0, max(0, n_lines - len(lanes))), (0, 0)))[:n_lines]
+    w = lanes.reshape(len(CONV2_GROUPS), K_CHANNELS, KERNEL_SIZE, KERNEL_SIZE, K_CHANNELS)
+    w = w.transpose(0, 4, 1, 2, 3).reshape(-1, K_CHANNELS, KERNEL_SIZE, KERNEL_SIZE)
+    return w[:CONV2_GROUPS[-1][1]].astype(np.int32)
+
+def decode_conv2_bias(lanes):
+    """
+    conv2_bias.hex lanes [Lines, 6] (32-bit) -> [16]
+    The loader (dma_transfer_bias) pushes one word per pass into the 6x32-bit
+    bias vector, so only word[group] is consumed for each pass.
+    """
+    bias = np.zeros(CONV2_GROUPS[-1][1], dtype=np.int32)
+    for i, (start_ch, end_ch) in enumerate(CONV2_GROUPS[:len(lanes)]):
+        bias[start_ch:end_ch] = lanes[i, :end_ch - start_ch]
+    return bias
+
+def decode_conv2_bias_burst(lanes):
+    """
+    conv2_bias_burst.hex lanes [3, 6] (32-bit) -> [16]
+    Single-burst mode loads one full bias_buffer word per group, so every
+    output channel gets its bias (no word[group] quirk).
+    """
+    return lanes.reshape(-1)[:CONV2_GROUPS[-1][1]].astype(np.int32)
+
+def init_files(conv2_burst=False, fc_int4=False, fc1_sparse=False):
+    """Init files params_from_init() needs"""
+    skip = {"conv2_bias.hex" if conv2_burst else "conv2_bias_burst.hex"}
+    for name in ("fc1", "fc2", "fc3"):
+        int4_files = {int4_pack.weight_file(name), int4_pack.exp_file(name)}
+        if name == "fc1" and fc1_sparse:
+            skip |= int4_files | {"fc1_weights.hex"}
+        else:
+            skip |= {f"{name}_weights.hex"} if fc_int4 else int4_files
+    if not fc1_sparse:
+        skip.add(sparse_stream.stream_file("fc1"))
+    return [name for name in INIT_READ if name not in skip]
+
+def params_from_init(init, conv2_burst=False, fc_int4=False, fc1_sparse=False):
+    """
+    Decode init file contents into weights/biases.
+    init: {file name: array as read by load_params()}, e.g. straight from the exporters.
+    fc_int4   : FC weights from the INT4 packed files; fc*_w is then the equivalent
+                q4 << e INT8 matrix and fc*_w4 / fc*_wexp the packed form (fc_layer_int4)
+    fc1_sparse: FC1 weights decoded from the compressed stream (sparse_stream.py)
+    Returns a dict of int32 arrays in PyTorch layout ([Out, In, R, S] / [Out, In]).
+    """
+    params = {}
+
+    # --- Conv1: 25 lines, 48-bit (MSB=Ch5 ... LSB=Ch0) ---
+    params["conv1_w"] = init["conv1_weights.hex"].T.reshape(K_CHANNELS, 1, KERNEL_SIZE, KERNEL_SIZE).astype(np.int32)
+    params["conv1_b"] = init["conv1_bias.hex"].astype(np.int32)
+
+    # --- Conv2: 3 output groups (passes) ---
+    params["conv2_w"] = decode_conv2_weights(init["conv2_weights.hex"])
+    if conv2_burst:
+        params["conv2_b"] = decode_conv2_bias_burst(init["conv2_bias_burst.hex"])
+    else:
+        params["conv2_b"] = decode_conv2_bias(init["conv2_bias.hex"])
+
+    # --- FC1/FC2/FC3: linear 8-bit weights (row-major [Out, In]), 32-bit bias ---
+    for name, out_len, in_len in [("fc1", 120, 400), ("fc2", 84, 120), ("fc3", 10, 84)]:
+        if name == "fc1" and fc1_sparse:
+            w = sparse_stream.decode(init[sparse_stream.stream_file(name)], out_len, in_len).ravel()
+        elif fc_int4:
+            w = int4_pack.unpack(init[int4_pack.weight_file(name)])
+        else:
+            w = init[f"{name}_weights.hex"]
+        # Zero pad / truncate like ndarray.resize() in the debug scripts
+        w = np.pad(w, (0, max(0, out_len * in_len - w.size)))[:out_len * in_len]
+        params[f"{name}_w"] = w.reshape(out_len, in_len).astype(np.int32)
+        params[f"{name}_b"] = init[f"{name}_bias.hex"].astype(np.int32)
+        if fc_int4 and not (name == "fc1" and fc1_sparse):
+            params[f"{name}_w4"] = params[f"{name}_w"]
+            params[f"{name}_wexp"] = int4_pack.row_exps(init[int4_pack.exp_file(name)], out_len).astype(np.int32)
+            params[f"{name}_w"] = int4_pack.expand(params[f"{name}_w4"], params[f"{name}_wexp"])
+
+    return params
+
+def load_params(init_dir=RTL_INIT_DIR, conv2_burst=False, fc_int4=False, fc1_sparse=False):
+    """
+    Load all quantized weights/biases from the $readmemh init files.
+    conv2_burst: Conv2 bias from conv2_bias_burst.hex (single-burst preload)
+    fc_int4    : FC weights from fc*_weights_int4.hex + fc*_wexp.hex
+    fc1_sparse : FC1 weights from fc1_weights_sparse.hex (pruned, compressed)
+    Returns a dict of int32 arrays in PyTorch layout ([Out, In, R, S] / [Out, In]).
+    """
+    init = {name: _read_hex(os.path.join(init_dir, name), *INIT_READ[name])
+            for name in init_files(conv2_burst, fc_int4, fc1_sparse)}
+    return params_from_init(init, conv2_burst, fc_int4, fc1_sparse)
+
+def load_image_hex(filepath=os.path.join(RTL_INIT_DIR, "input_image.hex")):
+    """input_image.hex -> [1, 28, 28] int8"""
+    img = _read_hex(filepath, 8)
+    return img.reshape(1, INPUT_H, INPUT_W).astype(np.int8)
+
+def quantize_images(images_u8):
+    """
+    MNIST uint8 pixels [N, 28, 28] -> Q1.7 int8, same as export_conv1.to_fixed()
+    applied to ToTensor() output (float32 x/255, round half to even, clamp).
+    """
+    x = np.asarray(images_u8, dtype=np.float32) / np.float32(255.0)
+    x = np.round(x.astype(np.float64) * SCALE_FACTOR)
+    return np.clip(x, -128, 127).astype(np.int8)
+
+# ================= Layers =================
+
+def flatten_channel_major(x):
+    """[..., H, W, C] -> [..., C*H*W] (Ch0 all pixels, then Ch1 ...)"""
+    h, w, c = x.shape[-3:]
+    return np.moveaxis(x, -1, -3).reshape(x.shape[:-3] + (c * h * w,))
+
+def fc_layer(x, weights, bias, shift=QUANT_SHIFT, relu_en=True):
+    """
+    Fully connected layer: [..., In] x [Out, In]^T -> [..., Out]
+    Returns a dict of stages: acc / bias / relu / final (int8).
+    """
+    x = np.asarray(x)
+    # Exact int64 sums via float BLAS (int_gemm.py), 32-bit accumulator wrap
+    acc = exact_matmul(x.reshape(-1, x.shape[-1]), np.asarray(weights).T)
+    return _fc_stages(acc.astype(np.int32).reshape(x.shape[:-1] + (acc.shape[-1],)), bias, shift, relu_en)
+
+def fc_layer_int4(x, q4, exps, bias, shift=QUANT_SHIFT, relu_en=True):
+    """
+    FC layer on INT4 weights: 8 x 4-bit MACs, then acc << e per output row.
+    Same stages as fc_layer(x, int4_pack.expand(q4, exps), ...), bit for bit.
+    """
+    x = np.asarray(x)
+    acc = exact_matmul(x.reshape(-1, x.shape[-1]), np.asarray(q4).T)
+    acc = acc.astype(np.int32) << int4_pack.row_exps(exps, len(q4)).astype(np.int32)
+    return _fc_stages(acc.reshape(x.shape[:-1] + (acc.shape[-1],)), bias, shift, relu_en)
+
+def _fc_stages(acc, bias, shift, relu_en):
+    stages = {"acc": acc}
+    stages["bias"] = (stages["acc"] + np.asarray(bias, dtype=np.int32)).astype(np.int32)
+    stages["relu"] = np.maximum(stages["bias"], 0) if relu_en else stages["bias"]
+    stages["final"] = shift_saturate(stages["relu"], shift)
+    return stages
+
+def layer_shifts(shift):
+    """QUANT_SHIFT int, or per-layer {"l1", "l2", "fc1", "fc2", "fc3": shift} -> per-layer dict"""
+    if isinstance(shift, dict):
+        return {name: shift.get(name, QUANT_SHIFT) for name in LAYERS}
+    return {name: shift for name in LAYERS}
+
+def run_batch(images, params, shift=QUANT_SHIFT):
+    """
+    Run the full datapath on a batch.
+    images: [N, 28, 28] int8 (a single [28, 28] image is also accepted)
+    shift : one QUANT_SHIFT for every layer, or per-layer (layer_shifts())
+
+    Returns a dict:
+        l1, l2          : conv_layer() stages, channel-last [N, H, W, C]
+        fc_in           : [N, 400] int8 (Channel-Major flatten of l2 final)
+        fc1, fc2, fc3   : fc_layer() stages
+        logits          : [N, 10] int8
+        pred            : [N] predicted labels
+    """
+    images = np.asarray(images)
+    if images.ndim == 2:
+        images = images[None]
+
+    shift = layer_shifts(shift)
+    out = {}
+    out["l1"] = conv_layer(images[..., None], params["conv1_w"], params["conv1_b"], shift["l1"], padding=PADDING)
+    out["l2"] = conv_layer(out["l1"]["final"], params["conv2_w"], params["conv2_b"], shift["l2"])
+    out["fc_in"] = flatten_channel_major(out["l2"]["final"])
+    out["fc1"] = fc_layer(out["fc_in"], params["fc1_w"], params["fc1_b"], shift["fc1"])
+    out["fc2"] = fc_layer(out["fc1"]["final"], params["fc2_w"], params["fc2_b"], shift["fc2"])
+    # FC3 (Output Layer) has no ReLU
+    out["fc3"] = fc_layer(out["fc2"]["final"], params["fc3_w"], params["fc3_b"], shift["fc3"], relu_en=False)
+    out["logits"] = out["fc3"]["final"]
+    out["pred"] = np.argmax(out["logits"], axis=-1)
+    return out
+
+def predict(images, params, shift=QUANT_SHIFT, chunk=1024):
+    """Logits/labels only, processed in chunks to bound memory on large N."""
+    images = np.asarray(images)
+    logits = np.zeros((len(images), params["fc3_w"].shape[0]), dtype=np.int8)
+    for start in range(0, len(images), chunk):
+        logits[start:start + chunk] = run_batch(images[start:start + chunk], params, shift)["logits"]
+    return logits, np.argmax(logits, axis=-1)
+
+if __name__ == "__main__":
+    params = load_params()
+    img = load_image_hex()
+
+    t0 = time.perf_counter()
+    result = run_batch(img, params)
+    t1 = time.perf_counter()
+
+    print(f"Batch: {img.shape[0]} image(s), {1e3 * (t1 - t0):.2f} ms")
+    print(f"Logits: {result['logits'][0]}")
+    print(f"Pred  : {result['pred'][0]}")
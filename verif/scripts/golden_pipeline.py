@@ -0,0 +1,128 @@
+"""
+End-to-end golden pipeline: L1 -> L2 -> FC1 -> FC2 -> FC3 in one process.
+
+Activations are passed between layers in memory (golden_model.run_batch), so
+there is no text round-trip between the per-layer scripts. The debug dumps are
+optional and use exactly the same files/format as the per-layer scripts:
+
+    debug_data/       calc_layer1_debug_full.py
+    debug_data_l2/    clac_layer2_debug_full.py (+ l2_golden_compare.txt)
+    debug_data_fc1/   calc_fc1_debug_full.py
+    debug_data_fc2/   calc_fc2_fc3_debug_full.py
+    debug_data_fc3/
+
+Usage:
+    python golden_pipeline.py                 # logits only
+    python golden_pipeline.py --dump          # + all debug dumps
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from golden_model import RTL_INIT_DIR, K_CHANNELS, load_params, load_image_hex, run_batch
+
+# ================= Dump Writers =================
+
+def _write_rows(path, header, rows):
+    with open(path, 'w') as f:
+        f.write(header)
+        np.savetxt(f, rows, fmt="%d")
+
+def dump_l1(stages, out_dir):
+    """Same files as calc_layer1_debug_full.py: (H, W, C) -> one pixel per line"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = [("debug_0_padded_input.txt", stages["padded"]),
+             ("debug_1_conv_raw.txt", stages["conv"]),
+             ("debug_2_bias_added.txt", stages["bias"]),
+             ("debug_3_relu.txt", stages["relu"]),
+             ("debug_4_pool.txt", stages["pool"]),
+             ("debug_5_final_quant.txt", stages["final"])]
+    for filename, data in files:
+        h, w, c = data.shape
+        header = (f"# Shape: {h}x{w}, Channels: {c}\n"
+                  f"# Format: Each line is one pixel location. Columns are Channels 0 to {c-1}\n")
+        _write_rows(os.path.join(out_dir, filename), header, data.reshape(h * w, c))
+
+def dump_l2(stages, out_dir, compare_file="l2_golden_compare.txt"):
+    """Same files as clac_layer2_debug_full.py"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = [("l2_debug_1_conv.txt", stages["conv"], "Raw Conv"),
+             ("l2_debug_3_relu.txt", stages["relu"], "Bias + ReLU"),
+             ("l2_debug_4_pool.txt", stages["pool"], "Pool"),
+             ("l2_debug_5_final.txt", stages["final"], "Final L2 Out")]
+    for filename, data, desc in files:
+        h, w, c = data.shape
+        header = f"# Description: {desc}\n# Shape: {h}x{w}x{c}\n"
+        _write_rows(os.path.join(out_dir, filename), header, data.reshape(h * w, c))
+
+    # TB Dump order: Group (6 channels) -> Pixel -> Channel in group
+    final = stages["final"]
+    h, w, c = final.shape
+    with open(compare_file, 'w') as f:
+        for start_ch in range(0, c, K_CHANNELS):
+            np.savetxt(f, final[:, :, start_ch:start_ch + K_CHANNELS].reshape(h * w, -1), fmt="%d")
+
+def dump_fc(layer_name, stages, out_dir, use_relu=True, with_shape=False):
+    """Same files as calc_fc1_debug_full.py / calc_fc2_fc3_debug_full.py"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = [(f"{layer_name}_debug_1_acc.txt", stages["acc"], "Raw Accumulation"),
+             (f"{layer_name}_debug_2_bias.txt", stages["bias"], "Accumulation + Bias"),
+             (f"{layer_name}_debug_3_relu.txt", stages["relu"], "ReLU"),
+             (f"{layer_name}_debug_4_final.txt", stages["final"], "Final 8-bit")]
+    if with_shape:
+        # FC1 script uses slightly different descriptions and a shape line
+        files[0] = files[0][:2] + ("Raw Accumulation (Sum)",)
+        files[3] = files[3][:2] + ("Final Quantized (8-bit)",)
+    if not use_relu:
+        del files[2]
+
+    for filename, data, desc in files:
+        header = f"# Description: {desc}\n"
+        if with_shape:
+            header += f"# Shape: {len(data)} (1D Vector)\n"
+        _write_rows(os.path.join(out_dir, filename), header, data)
+
+def write_dumps(result, idx=0, root="."):
+    """Write all per-layer debug dumps of image `idx` of a run_batch() result."""
+    def pick(stages):
+        return {k: v[idx] for k, v in stages.items()}
+
+    dump_l1(pick(result["l1"]), os.path.join(root, "debug_data"))
+    dump_l2(pick(result["l2"]), os.path.join(root, "debug_data_l2"),
+            os.path.join(root, "l2_golden_compare.txt"))
+    dump_fc("fc1", pick(result["fc1"]), os.path.join(root, "debug_data_fc1"), with_shape=True)
+    dump_fc("fc2", pick(result["fc2"]), os.path.join(root, "debug_data_fc2"))
+    dump_fc("fc3", pick(result["fc3"]), os.path.join(root, "debug_data_fc3"), use_relu=False)
+
+# ================= Entry =================
+
+def run_pipeline(image_file=None, init_dir=RTL_INIT_DIR, dump=False, dump_root="."):
+    params = load_params(init_dir)
+    images = load_image_hex(image_file or os.path.join(init_dir, "input_image.hex"))
+
+    t0 = time.perf_counter()
+    result = run_batch(images, params)
+    t1 = time.perf_counter()
+    print(f"Golden L1 -> L2 -> FC1 -> FC2 -> FC3: {1e3 * (t1 - t0):.2f} ms")
+
+    if dump:
+        write_dumps(result, root=dump_root)
+        print(f"Debug dumps written to '{os.path.abspath(dump_root)}'")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="LeNet-5 end-to-end golden pipeline")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR, help="directory of the .hex init files")
+    parser.add_argument("--image", default=None, help="input image hex (default: <init-dir>/input_image.hex)")
+    parser.add_argument("--dump", action="store_true", help="write the per-layer debug dumps")
+    parser.add_argument("--dump-root", default=".", help="root directory of the debug dumps")
+    args = parser.parse_args()
+
+    result = run_pipeline(args.image, args.init_dir, args.dump, args.dump_root)
+    print(f"Logits: {result['logits'][0]}")
+    print(f"Pred  : {result['pred'][0]}")
+
+if __name__ == "__main__":
+    main()
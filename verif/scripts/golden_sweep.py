@@ -0,0 +1,206 @@
+"""
+Dataset-wide golden sweep on a process pool.
+
+The quantized weights (golden_model.load_params) and the uint8 images are put
+in one multiprocessing.shared_memory block each, so workers only receive the
+block names and a small layout table, never the arrays themselves. Every
+worker runs golden_model.run_batch() on shards of images and writes logits and
+predicted labels straight into a shared, preallocated output block.
+
+Throughput is reported for every requested worker count (BLAS is pinned to 1
+thread per process so the numbers reflect process scaling).
+
+MNIST is read from the raw IDX files that torchvision downloads
+(<root>/MNIST/raw/{train,t10k}-images-idx3-ubyte[.gz]).
+
+Usage:
+    python golden_sweep.py --split test --workers 1,2,4,8
+    python golden_sweep.py --synthetic 20000 --workers 1,4
+"""
+import os
+
+# One BLAS thread per worker process (must be set before numpy is imported)
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse
+import gzip
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from golden_model import RTL_INIT_DIR, load_params, quantize_images, run_batch
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Same dataset root as model/src/LeNet/train.py ("../../data")
+DATA_ROOT = os.path.join(SCRIPT_DIR, "../../model/data")
+
+SHARD_SIZE = 1024
+CHUNK_SIZE = 256
+N_CLASSES = 10
+
+# ================= Dataset =================
+
+def _read_idx(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        data = f.read()
+    ndim = data[3]
+    shape = tuple(int.from_bytes(data[4 + 4 * i:8 + 4 * i], "big") for i in range(ndim))
+    return np.frombuffer(data, dtype=np.uint8, offset=4 + 4 * ndim).reshape(shape)
+
+def load_mnist(root=DATA_ROOT, split="test"):
+    """MNIST IDX files -> (images [N, 28, 28] uint8, labels [N] uint8)"""
+    prefix = "t10k" if split == "test" else "train"
+    raw_dir = os.path.join(root, "MNIST", "raw")
+    arrays = []
+    for kind in ("images-idx3-ubyte", "labels-idx1-ubyte"):
+        base = os.path.join(raw_dir, f"{prefix}-{kind}")
+        path = next((p for p in (base, base + ".gz") if os.path.exists(p)), None)
+        if path is None:
+            print(f"[Error] File not found: {base}[.gz] (run model/src/LeNet/train.py once to download MNIST)")
+            sys.exit(1)
+        arrays.append(_read_idx(path))
+    return arrays[0], arrays[1]
+
+# ================= Shared Memory =================
+
+def share_arrays(arrays):
+    """
+    Copy {name: ndarray} into one shared memory block.
+    Returns (shm, layout) with layout = {name: (offset, shape, dtype str)}.
+    """
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        offset = (offset + 63) // 64 * 64
+        layout[name] = (offset, arr.shape, arr.dtype.str)
+        offset += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, arr in arrays.items():
+        attach_view(shm, layout[name])[...] = arr
+    return shm, layout
+
+def attach_view(shm, entry):
+    offset, shape, dtype = entry
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+def _attach(name):
+    # The parent owns (and unlinks) every block
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: no track flag. Spawned workers share the parent's
+        # resource tracker, so the extra registration is harmless.
+        return shared_memory.SharedMemory(name=name)
+
+# ================= Worker =================
+
+_worker = {}
+
+def _init_worker(blocks):
+    """blocks: {block name: layout}. Views into every block are kept for the worker's lifetime."""
+    for shm_name, layout in blocks.items():
+        shm = _attach(shm_name)
+        _worker.setdefault("shm", []).append(shm)
+        for name, entry in layout.items():
+            _worker[name] = attach_view(shm, entry)
+    _worker["params"] = {k[len("param:"):]: v for k, v in _worker.items() if k.startswith("param:")}
+
+def _ping(_):
+    return os.getpid()
+
+def _run_shard(bounds):
+    start, end = bounds
+    images, logits, pred = _worker["images"], _worker["logits"], _worker["pred"]
+    for s in range(start, end, CHUNK_SIZE):
+        e = min(s + CHUNK_SIZE, end)
+        out = run_batch(quantize_images(images[s:e]), _worker["params"])
+        logits[s:e] = out["logits"]
+        pred[s:e] = out["pred"]
+    return end - start
+
+# ================= Sweep =================
+
+def sweep(images, params, workers, shard_size=SHARD_SIZE):
+    """
+    Run the golden datapath over all images on `workers` processes.
+    Returns (logits [N, 10] int8, pred [N] int64, seconds excluding pool start-up).
+    """
+    n = len(images)
+    in_shm, in_layout = share_arrays({"images": np.ascontiguousarray(images, dtype=np.uint8),
+                                      **{f"param:{k}": v for k, v in params.items()}})
+    out_shm, out_layout = share_arrays({"logits": np.zeros((n, N_CLASSES), dtype=np.int8),
+                                        "pred": np.zeros(n, dtype=np.int64)})
+    shards = [(s, min(s + shard_size, n)) for s in range(0, n, shard_size)]
+    try:
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=({in_shm.name: in_layout, out_shm.name: out_layout},)) as pool:
+            # Wait until every worker is up and attached
+            pool.map(_ping, range(workers), chunksize=1)
+            t0 = time.perf_counter()
+            done = sum(pool.imap_unordered(_run_shard, shards))
+            seconds = time.perf_counter() - t0
+        assert done == n
+        logits = attach_view(out_shm, out_layout["logits"]).copy()
+        pred = attach_view(out_shm, out_layout["pred"]).copy()
+    finally:
+        for shm in (in_shm, out_shm):
+            shm.close()
+            shm.unlink()
+    return logits, pred, seconds
+
+# ================= Entry =================
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset-wide LeNet-5 golden sweep on a process pool")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR, help="directory of the .hex init files")
+    parser.add_argument("--data-root", default=DATA_ROOT, help="torchvision MNIST root")
+    parser.add_argument("--split", choices=["test", "train"], default="test")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N images")
+    parser.add_argument("--synthetic", type=int, default=0, help="N random images instead of MNIST")
+    parser.add_argument("--workers", default=str(os.cpu_count()),
+                        help="comma separated worker counts, e.g. 1,2,4,8")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--save", default=None, help="write logits/pred (and labels) to this .npz")
+    parser.add_argument("--fc-int4", action="store_true", help="FC weights from the INT4 packed files")
+    parser.add_argument("--fc1-sparse", action="store_true", help="FC1 weights from the compressed (pruned) stream")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        images, labels = rng.integers(0, 256, (args.synthetic, 28, 28), dtype=np.uint8), None
+    else:
+        images, labels = load_mnist(args.data_root, args.split)
+    if args.limit:
+        images = images[:args.limit]
+        labels = labels[:args.limit] if labels is not None else None
+
+    params = load_params(args.init_dir, fc_int4=args.fc_int4, fc1_sparse=args.fc1_sparse)
+    counts = [int(w) for w in args.workers.split(",")]
+    print(f"Images: {len(images)}, shard {args.shard_size}, workers {counts}")
+
+    print(f"{'Workers':>8} {'Time(s)':>9} {'Img/s':>10} {'Speedup':>8} {'Eff':>6}")
+    base, ref = None, None
+    for w in counts:
+        logits, pred, seconds = sweep(images, params, w, args.shard_size)
+        rate = len(images) / seconds
+        base = base or rate / w
+        print(f"{w:>8} {seconds:>9.3f} {rate:>10.0f} {rate / base:>7.2f}x {rate / base / w:>6.0%}")
+        if ref is not None and not np.array_equal(ref, logits):
+            print(f"[Error] Logits differ between worker counts ({counts[0]} vs {w})")
+            sys.exit(1)
+        ref = logits
+
+    if labels is not None:
+        print(f"Golden (HW INT8) accuracy: {np.mean(pred == labels):.4%}")
+    if args.save:
+        np.savez(args.save, logits=logits, pred=pred,
+                 **({"labels": labels} if labels is not None else {}))
+        print(f"Saved: {os.path.abspath(args.save)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Vectorized codec for $readmemh-style hex files.
+
+One word per line, no address (@) or comment (//) directives. A word may pack
+several lanes of `bits` each, ordered MSB=Lane[n-1] ... LSB=Lane0, e.g.
+
+    conv1_weights.hex : 48-bit word = 6 lanes x 8-bit   (Ch5 ... Ch0)
+    conv1_bias.hex    : 32-bit word = 1 lane  x 32-bit
+    fc1_weights.hex   :  8-bit word = 1 lane  x 8-bit
+
+Shared by the exporters (model/src/LeNet), the golden scripts (verif/scripts)
+and the compare tools (hardware/sim/scripts). Fields up to 64 bits per lane.
+"""
+import numpy as np
+
+# ASCII -> nibble lookup (0-9, a-f, A-F). Anything else maps to 0xFF.
+_ASCII2NIB = np.full(256, 0xFF, dtype=np.uint8)
+_ASCII2NIB[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+_ASCII2NIB[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+_ASCII2NIB[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+_NIB2ASCII_LOWER = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_NIB2ASCII_UPPER = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+# ================= Helpers =================
+
+def to_signed(vals, bits):
+    """Two's complement reinterpretation of unsigned `bits`-wide fields -> int64"""
+    vals = np.asarray(vals).astype(np.uint64) & np.uint64((1 << bits) - 1)
+    vals = vals.astype(np.int64) if bits < 64 else vals.view(np.int64)
+    if bits < 64:
+        vals = np.where(vals >= (1 << (bits - 1)), vals - (1 << bits), vals)
+    return vals
+
+def to_unsigned(vals, bits):
+    """Signed/unsigned ints -> unsigned `bits`-wide fields (uint64), i.e. val & mask"""
+    vals = np.asarray(vals).astype(np.int64).view(np.uint64)
+    return vals & np.uint64((1 << bits) - 1) if bits < 64 else vals
+
+def _check_bits(bits):
+    if bits % 4 or not 0 < bits <= 64:
+        raise ValueError(f"Lane width must be a multiple of 4 in 4..64, got {bits}")
+
+# ================= Decode =================
+
+def _fixed_width_view(text):
+    """
+    Zero-copy [N, W] view of `text` when every line is exactly W hex chars
+    followed by '\n' (the last newline is optional). None otherwise.
+    """
+    if not text.endswith(b"\n"):
+        text += b"\n"
+    width = text.find(b"\n")
+    if width <= 0 or len(text) % (width + 1):
+        return None
+    lines = np.frombuffer(text, dtype=np.uint8).reshape(-1, width + 1)
+    if (lines[:, -1] != ord("\n")).any():
+        return None
+    return lines[:, :-1]
+
+def parse_hex(text, bits=8, lanes=1, signed=True):
+    """
+    Decode hex text (bytes or str), one word per line.
+    Returns [N] (lanes == 1) or [N, lanes] int64 (uint64 if not signed).
+    Words wider than lanes*bits are truncated to the low bits, shorter words
+    are zero-extended, like `(val >> (k*bits)) & mask`.
+    """
+    _check_bits(bits)
+    if isinstance(text, str):
+        text = text.encode("ascii")
+    # CRLF (files edited on Windows): keeps the fixed-width fast path
+    if b"\r" in text:
+        text = text.replace(b"\r", b"")
+
+    nib = _fixed_width_view(text)
+    if nib is None:
+        # Ragged / blank lines: tokenize and right-align
+        tokens = text.split()
+        width = max((len(t) for t in tokens), default=0)
+        tokens = [t.rjust(width, b"0") for t in tokens]
+        nib = np.frombuffer(b"".join(tokens), dtype=np.uint8).reshape(len(tokens), width)
+    nib = _ASCII2NIB[nib]
+    if (nib == 0xFF).any():
+        raise ValueError("Invalid hex digit in input")
+
+    # Align to exactly lanes*bits/4 nibbles: drop high digits / zero-extend
+    n, width = nib.shape
+    digits = lanes * bits // 4
+    if width >= digits:
+        nib = nib[:, width - digits:]
+    else:
+        nib = np.pad(nib, ((0, 0), (digits - width, 0)))
+
+    # [N, lanes(MSB first), bits/4] -> lane values (LSB lane first)
+    nib = nib.reshape(n, lanes, bits // 4)[:, ::-1, :]
+    vals = np.zeros((n, lanes), dtype=np.uint64)
+    for j in range(bits // 4):
+        vals <<= np.uint64(4)
+        vals |= nib[:, :, j]
+
+    if signed:
+        vals = to_signed(vals, bits)
+    return vals[:, 0] if lanes == 1 else np.ascontiguousarray(vals)
+
+def read_hex(path, bits=8, lanes=1, signed=True):
+    """Read a $readmemh file. See parse_hex()."""
+    with open(path, "rb") as f:
+        return parse_hex(f.read(), bits, lanes, signed)
+
+# ================= Encode =================
+
+def format_hex(values, bits=8, lanes=1, upper=False, trailing_newline=True):
+    """
+    Encode ints as hex text (bytes), one word per line.
+    values: [N] (lanes == 1) or [N, lanes] with Lane0 at the LSB.
+    Negative values are written in two's complement (val & mask).
+    """
+    _check_bits(bits)
+    vals = np.asarray(values)
+    vals = vals.reshape(-1, lanes)
+    n = vals.shape[0]
+    nib_per_lane = bits // 4
+
+    # [N, lanes] -> [N, lanes(MSB first), nibbles(MSB first)]
+    u = to_unsigned(vals[:, ::-1], bits)
+    shifts = np.arange(nib_per_lane - 1, -1, -1, dtype=np.uint64) * np.uint64(4)
+    nib = ((u[:, :, None] >> shifts) & np.uint64(0xF)).astype(np.uint8).reshape(n, lanes * nib_per_lane)
+
+    table = _NIB2ASCII_UPPER if upper else _NIB2ASCII_LOWER
+    out = np.empty((n, lanes * nib_per_lane + 1), dtype=np.uint8)
+    out[:, :-1] = table[nib]
+    out[:, -1] = ord("\n")
+
+    buf = out.tobytes()
+    return buf if trailing_newline or not buf else buf[:-1]
+
+def write_hex(path, values, bits=8, lanes=1, upper=False, trailing_newline=True):
+    """Write a $readmemh file. See format_hex(). Returns the number of lines."""
+    buf = format_hex(values, bits, lanes, upper, trailing_newline)
+    with open(path, "wb") as f:
+        f.write(buf)
+    return np.asarray(values).size // lanes
+
+# ================= Self check =================
+
+def _self_check():
+    """format_hex -> parse_hex round trip with LF and CRLF line endings"""
+    rng = np.random.default_rng(0)
+    for bits, lanes in [(8, 1), (8, 6), (32, 1), (64, 1)]:
+        lo, hi = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+        vals = rng.integers(lo, hi, size=(100, lanes), endpoint=True, dtype=np.int64)
+        vals = vals[:, 0] if lanes == 1 else vals
+        lf = format_hex(vals, bits, lanes)
+        crlf = lf.replace(b"\n", b"\r\n")
+        for name, text in [("LF", lf), ("CRLF", crlf), ("CRLF, no final newline", crlf[:-2])]:
+            if not np.array_equal(parse_hex(text, bits, lanes), vals):
+                raise AssertionError(f"round trip failed: {bits}-bit x {lanes}, {name}")
+    assert parse_hex(b"7F\r\n80\r\n01\r\n", 8).tolist() == [127, -128, 1]
+    print("hex_codec self check passed")
+
+if __name__ == "__main__":
+    _self_check()
@@ -0,0 +1,225 @@
+"""
+Binary, memory-mappable mirror of hardware/rtl/init_files/*.hex.
+
+The exporters write every .hex file through write_init_hex(), which also stores
+the decoded tensor in `lenet5_init.bin` next to it. Golden/compare scripts read
+through load_init(): the tensor comes straight out of an np.memmap of the
+bundle (no parsing, no copy) and falls back to parsing the .hex file when the
+bundle is missing, has no entry for it, or the .hex file changed since the
+entry was written (size / mtime recorded per entry).
+
+File layout (all offsets 64-byte aligned):
+    [0:8]    MAGIC
+    [8:16]   uint64 little-endian header length
+    [16:..]  JSON header: {"version": 1, "entries": {name: {dtype, shape, offset, bits, lanes, src}}}
+    [..]     data section: raw little-endian tensors at data_base + offset
+
+Usage:
+    python init_bundle.py [--init-dir DIR]      # build the bundle from existing .hex files
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from hex_codec import format_hex, read_hex, to_signed, write_hex
+
+BUNDLE_NAME = "lenet5_init.bin"
+MAGIC = b"LN5INIT\0"
+VERSION = 1
+ALIGN = 64
+
+# File -> (bits per lane, lanes per word), as written by the exporters
+INIT_FILES = {
+    "input_image.hex"   : (8, 1),
+    "conv1_weights.hex" : (8, 6),
+    "conv1_bias.hex"    : (32, 1),
+    "conv2_weights.hex" : (8, 6),
+    "conv2_bias.hex"    : (32, 1),
+    "conv2_bias_burst.hex": (32, 6),
+    "fc1_weights.hex"   : (8, 1),
+    "fc1_bias.hex"      : (32, 1),
+    "fc2_weights.hex"   : (8, 1),
+    "fc2_bias.hex"      : (32, 1),
+    "fc3_weights.hex"   : (8, 1),
+    "fc3_bias.hex"      : (32, 1),
+}
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RTL_INIT_DIR = os.path.join(SCRIPT_DIR, "../../hardware/rtl/init_files")
+
+# path -> (mtime_ns, entries) of opened bundles
+_cache = {}
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+def _src_stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _lane_dtype(bits):
+    return {8: np.int8, 16: np.int16, 32: np.int32}.get(bits, np.int64)
+
+# ================= Read =================
+
+def open_bundle(path):
+    """
+    Map a bundle read-only. Returns {name: entry} where entry["array"] is a
+    zero-copy view into the np.memmap of the file.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(mm[:8]) != MAGIC:
+        raise ValueError(f"{path}: not a LeNet-5 init bundle")
+    header_len = struct.unpack("<Q", bytes(mm[8:16]))[0]
+    header = json.loads(bytes(mm[16:16 + header_len]).decode("utf-8"))
+    if header.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported bundle version {header.get('version')}")
+
+    data_base = _align(16 + header_len)
+    entries = {}
+    for name, e in header["entries"].items():
+        e["array"] = np.ndarray(tuple(e["shape"]), dtype=np.dtype(e["dtype"]),
+                                buffer=mm, offset=data_base + e["offset"])
+        entries[name] = e
+
+    _cache[path] = (mtime, entries)
+    return entries
+
+def load_init(path, bits=8, lanes=1):
+    """
+    Drop-in for hex_codec.read_hex(path, bits, lanes) on init files.
+    Returns a read-only memmap view (int8/int32 ...) when the bundle in the
+    same directory holds an up-to-date entry, otherwise the parsed .hex (int64).
+    Words are zero-extended / truncated to `lanes` exactly like read_hex().
+    """
+    bundle = os.path.join(os.path.dirname(os.path.abspath(path)), BUNDLE_NAME)
+    name = os.path.basename(path)
+    try:
+        entry = open_bundle(bundle).get(name)
+        if entry is not None and entry["bits"] == bits and entry["src"] == _src_stat(path):
+            arr, stored_lanes = entry["array"], entry["lanes"]
+            if stored_lanes == lanes:
+                return arr
+            arr = arr.reshape(-1, stored_lanes)
+            if lanes < stored_lanes:
+                out = arr[:, :lanes]
+            else:
+                out = np.zeros((arr.shape[0], lanes), dtype=arr.dtype)
+                out[:, :stored_lanes] = arr
+            return out[:, 0] if lanes == 1 else out
+    except (FileNotFoundError, ValueError):
+        pass
+    return read_hex(path, bits, lanes)
+
+# ================= Write =================
+
+def update_bundle(init_dir, tensors):
+    """
+    Merge {name: (values, bits, lanes)} into <init_dir>/lenet5_init.bin and
+    record the current size/mtime of <init_dir>/<name> for each of them.
+    The new bundle is written to a temp file and atomically renamed.
+    """
+    path = os.path.join(init_dir, BUNDLE_NAME)
+    merged = {}
+    if os.path.exists(path):
+        try:
+            merged = {k: (np.array(e["array"]), e["bits"], e["lanes"], e["src"])
+                      for k, e in open_bundle(path).items()}
+        except ValueError:
+            merged = {}
+
+    for name, (values, bits, lanes) in tensors.items():
+        vals = to_signed(np.asarray(values).reshape(-1, lanes), bits).astype(_lane_dtype(bits))
+        src_path = os.path.join(init_dir, name)
+        src = _src_stat(src_path) if os.path.exists(src_path) else None
+        merged[name] = (vals[:, 0] if lanes == 1 else vals, bits, lanes, src)
+
+    # Offsets are relative to the data section, which starts after the header
+    names = sorted(merged)
+    header = {"version": VERSION, "entries": {}}
+    offset = 0
+    for n in names:
+        arr, bits, lanes, src = merged[n]
+        header["entries"][n] = {"dtype": arr.dtype.newbyteorder("<").str, "shape": list(arr.shape),
+                                "offset": offset, "bits": bits, "lanes": lanes, "src": src}
+        offset = _align(offset + arr.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_base = _align(16 + len(header_bytes))
+
+    tmp = path + f".tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for n in names:
+            arr = merged[n][0]
+            f.seek(data_base + header["entries"][n]["offset"])
+            f.write(np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<")).tobytes())
+        f.truncate(data_base + offset)
+    os.replace(tmp, path)
+    _cache.pop(path, None)
+    return path
+
+def write_init_hex(path, values, bits=8, lanes=1, upper=False, trailing_newline=True):
+    """hex_codec.write_hex() + mirror the tensor into the bundle. Returns the number of lines."""
+    n_lines = write_hex(path, values, bits, lanes, upper, trailing_newline)
+    update_bundle(os.path.dirname(os.path.abspath(path)), {os.path.basename(path): (values, bits, lanes)})
+    return n_lines
+
+def _write_atomic(path, buf):
+    tmp = path + f".tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(buf)
+    os.replace(tmp, path)
+
+def write_init_files(init_dir, files, max_workers=None):
+    """
+    Write several init files at once and update the bundle a single time.
+    files: {name: (values, bits, lanes, upper, trailing_newline)}
+    Each .hex is encoded and written concurrently to a temp file, then atomically
+    renamed, so a $readmemh never sees a half-written file.
+    Returns {name: number of lines}.
+    """
+    os.makedirs(init_dir, exist_ok=True)
+
+    def job(name):
+        values, bits, lanes, upper, trailing_newline = files[name]
+        _write_atomic(os.path.join(init_dir, name), format_hex(values, bits, lanes, upper, trailing_newline))
+        return np.asarray(values).size // lanes
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        counts = dict(zip(files, pool.map(job, files)))
+
+    # Bundle last: its per-entry src stat must see the renamed .hex files
+    update_bundle(init_dir, {n: (f[0], f[1], f[2]) for n, f in files.items()})
+    return counts
+
+# ================= Entry =================
+
+def build_from_hex(init_dir=RTL_INIT_DIR):
+    """(Re)build the bundle from the .hex files present in init_dir."""
+    tensors = {}
+    for name, (bits, lanes) in INIT_FILES.items():
+        path = os.path.join(init_dir, name)
+        if os.path.exists(path):
+            tensors[name] = (read_hex(path, bits, lanes), bits, lanes)
+    return update_bundle(init_dir, tensors), len(tensors)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memmap bundle from the .hex init files")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.init_dir):
+        print(f"[Error] Directory not found: {args.init_dir}")
+        sys.exit(1)
+    path, count = build_from_hex(args.init_dir)
+    print(f"Bundled {count} init files -> {os.path.abspath(path)}")
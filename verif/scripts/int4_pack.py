@@ -0,0 +1,82 @@
+"""
+INT4 packed FC weights: two signed 4-bit weights per byte + a power-of-two scale.
+
+A weight keeps the INT8 export's scale (x64) through a per-row (or per-layer)
+exponent e in 0..MAX_EXP:
+
+    w_int8 ~= q4 << e,  q4 = clamp(round(w * 64 / 2^e), -8, 7)
+
+so bias, QUANT_SHIFT and the rest of the datapath are unchanged; fc_pe only
+multiplies 8 x 4 bits and shifts the accumulator left by e before the bias
+(golden_model.fc_layer_int4). e is the smallest exponent that fits the row's
+largest weight, which keeps the most resolution.
+
+Files (linear, same row-major [Out, In] order as fc*_weights.hex):
+
+    fc1_weights_int4.hex : 8-bit lines, byte i = (w[2i+1] << 4) | (w[2i] & 0xF)
+    fc1_wexp.hex         : 8-bit lines, one e per output row ("row") or 1 line ("layer")
+
+Shared by export_fc.py and the golden FC scripts.
+"""
+import numpy as np
+
+# ================= 配置区域 =================
+INT4_MIN, INT4_MAX = -8, 7
+MAX_EXP = 4                 # 7 << 4 = 112, -8 << 4 = -128: stays inside int8
+MODES = ("row", "layer")
+# ============================================
+
+def weight_file(name):
+    return f"{name}_weights_int4.hex"
+
+def exp_file(name):
+    return f"{name}_wexp.hex"
+
+# ================= Quantize =================
+
+def choose_exp(w_scaled, axis=None):
+    """Smallest e with round(max|w| / 2^e) inside INT4 (per row: axis=1)"""
+    peak = np.abs(np.asarray(w_scaled, dtype=np.float64)).max(axis=axis)
+    e = np.zeros(np.shape(peak), dtype=np.int64)
+    for k in range(MAX_EXP, -1, -1):
+        fits = np.round(peak / 2 ** k) <= INT4_MAX
+        e = np.where(fits, k, e)
+    # Rows too large even at MAX_EXP saturate at MAX_EXP
+    return np.where(np.round(peak / 2 ** MAX_EXP) > INT4_MAX, MAX_EXP, e)
+
+def quantize_int4(w_scaled, mode="row"):
+    """
+    w_scaled: float [Out, In] already multiplied by the INT8 scale (x64).
+    Returns (q4 [Out, In] int64 in [-8, 7], exps [Out] ("row") or [1] ("layer")).
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown INT4 scale mode '{mode}' (choose from {', '.join(MODES)})")
+    w = np.asarray(w_scaled, dtype=np.float64)
+    exps = choose_exp(w, axis=1) if mode == "row" else np.atleast_1d(choose_exp(w))
+    q4 = np.clip(np.round(w / 2.0 ** row_exps(exps, len(w))[:, None]), INT4_MIN, INT4_MAX)
+    return q4.astype(np.int64), exps
+
+def row_exps(exps, rows):
+    """[Out] or [1] exponents -> [Out]"""
+    exps = np.asarray(exps, dtype=np.int64).ravel()
+    return np.broadcast_to(exps, (rows,)) if exps.size == 1 else exps[:rows]
+
+def expand(q4, exps):
+    """q4 [Out, In], exps -> equivalent INT8 weights q4 << e (int32)"""
+    q4 = np.asarray(q4, dtype=np.int32)
+    return q4 << row_exps(exps, len(q4)).astype(np.int32)[:, None]
+
+# ================= Pack / Unpack =================
+
+def pack(q4):
+    """Signed 4-bit values (flattened, padded with 0 to even) -> bytes as int64 [ceil(N/2)]"""
+    v = np.asarray(q4, dtype=np.int64).ravel() & 0xF
+    v = np.pad(v, (0, v.size % 2))
+    return v[0::2] | (v[1::2] << 4)
+
+def unpack(packed, count=None):
+    """Bytes (signed or unsigned 8-bit) -> signed 4-bit values int64 [count]"""
+    b = np.asarray(packed, dtype=np.int64).ravel() & 0xFF
+    v = np.stack([b & 0xF, b >> 4], axis=1).ravel()
+    v = np.where(v >= 8, v - 16, v)
+    return v[:count] if count is not None else v
@@ -0,0 +1,82 @@
+"""
+Exact integer GEMM on top of float BLAS.
+
+numpy has no BLAS kernel for integer matmul, so int8 x int8 products through
+`int64 @ int64` run on a slow generic loop. A float GEMM is exact as long as
+every value it touches is an integer below the mantissa limit (2^24 for
+float32, 2^53 for float64), whatever the summation order or FMA use:
+
+    |partial sum| <= K_chunk * max|a| * max|b| <= 2^mantissa
+
+so the reduction axis is split into chunks of at most K_chunk terms, each chunk
+runs through BLAS and the chunk results are summed in int64. int8 x int8
+(|product| <= 2^14) gives K_chunk = 1024 in float32, i.e. FC1 (400 -> 120) and
+both conv layers are a single float32 GEMM.
+
+A few output rows are re-computed with the integer path after every call; on
+any mismatch (exotic BLAS with reduced-precision modes ...) the whole result is
+re-computed with the integer path.
+"""
+import warnings
+
+import numpy as np
+
+# dtype -> exactly representable integer range (mantissa bits + 1)
+_FLOAT_LIMIT = [(np.float32, 1 << 24), (np.float64, 1 << 53)]
+
+# Output rows re-checked against the integer path (0 disables the check)
+VERIFY_ROWS = 4
+
+def int_matmul(a, b):
+    """Reference integer path: [M, K] x [K, N] -> int64"""
+    return np.asarray(a, dtype=np.int64) @ np.asarray(b, dtype=np.int64)
+
+def plan(a, b):
+    """
+    Pick (float dtype, K chunk) that keeps [M, K] x [K, N] exact, or
+    (None, 0) when no float type can (integer path).
+    """
+    k = a.shape[-1]
+    # Python ints: np.abs(int8(-128)) would wrap
+    amax = max(-int(a.min(initial=0)), int(a.max(initial=0)))
+    bmax = max(-int(b.min(initial=0)), int(b.max(initial=0)))
+    prod = max(amax * bmax, 1)
+    for dtype, limit in _FLOAT_LIMIT:
+        if prod <= limit:
+            return dtype, min(k, limit // prod)
+    return None, 0
+
+def exact_matmul(a, b, verify_rows=None):
+    """
+    Exact integer [M, K] x [K, N] -> [M, N] int64 through float BLAS.
+    a, b: integer arrays (any int dtype).
+    """
+    a = np.asarray(a)
+    b = np.asarray(b)
+    if not (np.issubdtype(a.dtype, np.integer) and np.issubdtype(b.dtype, np.integer)):
+        raise TypeError(f"exact_matmul expects integer arrays, got {a.dtype} and {b.dtype}")
+    m, k = a.shape
+    if m == 0 or k == 0 or b.shape[1] == 0:
+        return int_matmul(a, b)
+
+    dtype, chunk = plan(a, b)
+    if dtype is None:
+        return int_matmul(a, b)
+
+    af = a.astype(dtype)
+    bf = b.astype(dtype)
+    if chunk >= k:
+        out = (af @ bf).astype(np.int64)
+    else:
+        out = np.zeros((m, b.shape[1]), dtype=np.int64)
+        for start in range(0, k, chunk):
+            out += (af[:, start:start + chunk] @ bf[start:start + chunk]).astype(np.int64)
+
+    n_check = min(m, VERIFY_ROWS if verify_rows is None else verify_rows)
+    if n_check:
+        rows = np.linspace(0, m - 1, n_check).astype(np.int64)
+        if not np.array_equal(out[rows], int_matmul(a[rows], b)):
+            warnings.warn(f"Float GEMM ({np.dtype(dtype).name}, chunk {chunk}) is not exact here, "
+                          "falling back to the integer path")
+            return int_matmul(a, b)
+    return out
@@ -0,0 +1,260 @@
+"""
+Cycle-approximate performance model of the LeNet-5 accelerator (no VCS needed).
+
+Cycle counts follow the RTL state machines:
+
+    lenet_controller   IDLE -> L1_REQ_LOAD -> L1_RUN -> L1_WAIT
+                       -> (L2_REQ_LOAD -> L2_RUN -> L2_WAIT) x out_group_cnt -> DONE
+    systolic_wrapper   RUN_PASS per input channel (+ NEXT_PASS_SETUP), DONE_STATE
+    input_buffer_bank  PREFETCH K rows, then REFILL_ROW hidden behind each ARR row
+    active_row_register PRIME -> RUNNING (wavefront, skewed 6 x MATRIX_B_COL array) -> DONE
+    fc_controller      LOAD_SRAM (flatten L2 out) -> FC1 -> FC2 -> FC3
+    fc_accelerator_top REQ_WEIGHTS -> CALC_STREAM (2-stage pipe) -> WAIT_SA x2
+                       -> WRITE_BACK -> CHECK_LOOP, per FC_BATCH-neuron micro-batch
+
+Handshakes with the testbench (weight DMA, FC weight ack) use the cycle counts of
+tb_lenet5_top.sv. Any key of DEFAULT_CFG can be overridden to explore the
+design space before touching RTL.
+
+Usage:
+    python perf_model.py
+    python perf_model.py --set FC_BATCH=50 --sweep MATRIX_B_COL=16,25,64 --sweep K_CHANNELS=4,6,8
+    python perf_model.py --conv2-burst
+"""
+import argparse
+import itertools
+import math
+import sys
+
+# ================= 配置区域 (与 RTL 参数保持一致) =================
+DEFAULT_CFG = {
+    # definitions.sv
+    "K_CHANNELS"    : 6,    # MATRIX_A_ROW: output channels per pass
+    "MATRIX_B_COL"  : 64,   # systolic columns (output pixels in flight)
+    # fc_accelerator_top: fc_systolic_array #(100)
+    "FC_BATCH"      : 100,
+    # tb_lenet5_top.sv: CLK_PERIOD = 10 ns
+    "CLK_MHZ"       : 100.0,
+    # TB handshake: req_load_weight_o -> @(negedge) host_weight_loaded -> next_state
+    "LOAD_HANDSHAKE": 3,
+    # TB FC feed: weight_req_o -> @(negedge) fc_weight_ack
+    "FC_ACK_LATENCY": 1,
+    # Conv2 weight/bias load: 0 = reload per out_group_cnt (L2_REQ_LOAD x3),
+    # 1 = all groups in one burst (weight_buffer row g*150, bias_buffer row g),
+    # 2 = that burst issued at L1 start (conv2 rows after conv1's), hidden behind L1
+    "CONV2_BURST"   : 0,
+}
+
+# LeNet-5 layer shapes as programmed by lenet_controller / fc_controller
+CONV_LAYERS = [
+    # name, padded H/W (cfg_img_h/w), kernel, in_ch, out_ch
+    ("L1", 28 + 2 * 2, 5, 1, 6),
+    ("L2", 12 + 2, 5, 6, 16),
+]
+FC_LAYERS = [
+    # name, in_len, out_len
+    ("FC1", 400, 120),
+    ("FC2", 120, 84),
+    ("FC3", 84, 10),
+]
+# Host preload before host_start_i: 32x32 padded image, 25 conv1 weight words, 1 bias word
+HOST_PRELOAD = (32 * 32 + 1) + (25 + 1) + (1 + 1)
+# ===================================================================
+
+# ================= Conv (systolic_wrapper) =================
+
+def conv_row_cycles(img_w, kernel, cfg):
+    """
+    One output row: ARR PRIME + RUNNING + DONE + re-trigger.
+    RUNNING ends when ptr_wave[K-1] (reset to 1 - K*(K-1)) passes img_w + MATRIX_A_ROW.
+    A column PE is busy K*K cycles per output pixel: when the row is wider than
+    the array, columns are reused every MATRIX_B_COL cycles, so the wavefront
+    can only advance at MATRIX_B_COL / (K*K) pixels per cycle if that is < 1.
+    """
+    out_w = img_w - kernel + 1
+    rate = 1.0 if out_w <= cfg["MATRIX_B_COL"] else min(1.0, cfg["MATRIX_B_COL"] / (kernel * kernel))
+    running = math.ceil(img_w / rate) + cfg["K_CHANNELS"] + kernel * (kernel - 1) + 1
+    return 1 + running + 1 + 1
+
+def conv_pass_cycles(img_w, img_h, kernel, cfg):
+    """One input channel pass: IB PREFETCH of K rows (+ SRAM latency), then every output row"""
+    prefetch = kernel * img_w + 2
+    rows = img_h - kernel + 1
+    return prefetch + rows * conv_row_cycles(img_w, kernel, cfg)
+
+def conv_load_cycles(in_ch, kernel, groups, burst, cfg):
+    """
+    Weight/bias load cycles of every output group: [cycles per group].
+    TB dma_transfer_weights / _bias: one word per cycle + 1 cycle to drop loader_wen.
+    burst: all groups' weights (groups*in_ch*K*K words) and bias words in one
+    L2_REQ_LOAD handshake, later groups go L2_WAIT -> L2_RUN directly.
+    """
+    if not burst:
+        return [cfg["LOAD_HANDSHAKE"] + (in_ch * kernel * kernel + 1) + (1 + 1)] * groups
+    return [cfg["LOAD_HANDSHAKE"] + (groups * in_ch * kernel * kernel + 1) + (groups + 1)] + [0] * (groups - 1)
+
+def conv_layer_cycles(img_hw, kernel, in_ch, out_ch, cfg, first_preloaded=False, burst=False, hidden=0):
+    """
+    Returns a dict: groups, load, compute, total cycles and MACs.
+    Each output group (K_CHANNELS channels) reloads in_ch*K*K weight words and
+    one bias word through the DMA, then runs in_ch passes in the wrapper.
+    burst: single-burst load of all groups (conv_load_cycles), of which up to
+    `hidden` cycles overlap the previous layer.
+    """
+    groups = math.ceil(out_ch / cfg["K_CHANNELS"])
+    loads = conv_load_cycles(in_ch, kernel, groups, burst, cfg)
+    if first_preloaded:
+        # Host preloads the data before host_start_i, only the handshake remains
+        loads[0] = cfg["LOAD_HANDSHAKE"]
+    loads[0] = max(0, loads[0] - hidden)
+    load = sum(loads)
+    compute = 0
+    for g in range(groups):
+        # Lx_RUN + wrapper IDLE->RUN_PASS, passes (+ NEXT_PASS_SETUP), DONE_STATE
+        compute += 2 + in_ch * conv_pass_cycles(img_hw, img_hw, kernel, cfg) + (in_ch - 1) + 1
+    out_hw = img_hw - kernel + 1
+    return {
+        "groups" : groups,
+        "load"   : load,
+        "compute": compute,
+        "total"  : load + compute,
+        "macs"   : out_hw * out_hw * out_ch * in_ch * kernel * kernel,
+        "pes"    : cfg["K_CHANNELS"] * cfg["MATRIX_B_COL"],
+    }
+
+# ================= FC (fc_accelerator_top) =================
+
+def fc_flatten_cycles(in_len):
+    """fc_controller LOAD_SRAM: IDLE->LOAD_L2, one SRAM read per element, 2 write-drain cycles, done flag"""
+    return 1 + 1 + (in_len + 1) + 2 + 1
+
+def fc_layer_cycles(in_len, out_len, cfg):
+    """
+    Micro-batches of FC_BATCH neurons. Per batch: REQ_WEIGHTS (+ TB ack),
+    CALC_STREAM streams in_len inputs through the 2-stage pipeline
+    (in_len + 2 counts + sa_done cycle + exit), WAIT_SA_1/2, WRITE_BACK one
+    neuron per cycle, CHECK_LOOP.
+    """
+    batches = math.ceil(out_len / cfg["FC_BATCH"])
+    compute = 0
+    for b in range(batches):
+        size = min(cfg["FC_BATCH"], out_len - b * cfg["FC_BATCH"])
+        compute += (1 + cfg["FC_ACK_LATENCY"]) + (in_len + 4) + 2 + size + 1
+    # FCx_RUN, core IDLE -> REQ_WEIGHTS, DONE, done_o register
+    overhead = 1 + 1 + 1 + 1
+    return {
+        "batches": batches,
+        "load"   : 0,
+        "compute": compute + overhead,
+        "total"  : compute + overhead,
+        "macs"   : in_len * out_len,
+        "pes"    : cfg["FC_BATCH"],
+    }
+
+# ================= Whole Accelerator =================
+
+def estimate(cfg=None, include_preload=False):
+    """
+    Per-layer cycle breakdown and end-to-end latency for one image.
+    Returns a dict: layers {name: stats}, total cycles, latency_us, images_per_s.
+    """
+    cfg = dict(DEFAULT_CFG, **(cfg or {}))
+    layers = {}
+    if include_preload:
+        layers["Preload"] = {"load": HOST_PRELOAD, "compute": 0, "total": HOST_PRELOAD, "macs": 0, "pes": 0}
+
+    for i, (name, img_hw, kernel, in_ch, out_ch) in enumerate(CONV_LAYERS):
+        # Conv1 weights/bias are preloaded by the host before host_start_i
+        burst = i > 0 and cfg["CONV2_BURST"] > 0
+        hidden = layers[CONV_LAYERS[0][0]]["compute"] if (i > 0 and cfg["CONV2_BURST"] == 2) else 0
+        layers[name] = conv_layer_cycles(img_hw, kernel, in_ch, out_ch, cfg, first_preloaded=(i == 0),
+                                         burst=burst, hidden=hidden)
+    # lenet_controller IDLE->L1_REQ_LOAD, DONE -> fc_controller start
+    layers["Ctrl"] = {"load": 0, "compute": 2, "total": 2, "macs": 0, "pes": 0}
+
+    flatten = fc_flatten_cycles(FC_LAYERS[0][1])
+    layers["Flatten"] = {"load": flatten, "compute": 0, "total": flatten, "macs": 0, "pes": 0}
+    for name, in_len, out_len in FC_LAYERS:
+        layers[name] = fc_layer_cycles(in_len, out_len, cfg)
+
+    total = sum(l["total"] for l in layers.values())
+    latency_us = total / cfg["CLK_MHZ"]
+    return {
+        "cfg"         : cfg,
+        "layers"      : layers,
+        "total"       : total,
+        "latency_us"  : latency_us,
+        "images_per_s": 1e6 / latency_us,
+    }
+
+def print_report(est):
+    cfg = est["cfg"]
+    print(f"Config: K_CHANNELS={cfg['K_CHANNELS']}, MATRIX_B_COL={cfg['MATRIX_B_COL']}, "
+          f"FC_BATCH={cfg['FC_BATCH']}, CLK={cfg['CLK_MHZ']:.0f} MHz")
+    print(f"{'Layer':<8} {'Load':>8} {'Compute':>9} {'Total':>9} {'Share':>7} {'MACs':>8} {'PE util':>8}")
+    for name, l in est["layers"].items():
+        util = l["macs"] / (l["compute"] * l["pes"]) if l["pes"] and l["compute"] else 0.0
+        print(f"{name:<8} {l['load']:>8} {l['compute']:>9} {l['total']:>9} "
+              f"{l['total'] / est['total']:>7.1%} {l['macs']:>8} {util:>8.1%}")
+    print(f"Total: {est['total']} cycles, {est['latency_us']:.2f} us/image, {est['images_per_s']:.0f} images/s")
+
+def print_burst_report(cfg=None):
+    """Conv2 load cycles: per-group reloads vs single burst vs burst hidden behind L1"""
+    cfg = dict(DEFAULT_CFG, **(cfg or {}))
+    name, img_hw, kernel, in_ch, out_ch = CONV_LAYERS[1]
+    groups = math.ceil(out_ch / cfg["K_CHANNELS"])
+    payload = groups * (in_ch * kernel * kernel + 1)
+    print(f"{name} weight/bias load ({groups} groups, {payload} DMA words):")
+    print(f"{'CONV2_BURST':>11} {'Handshakes':>11} {'Load':>6} {'Overhead':>9} {'Saved':>6} {'Total':>7}")
+    ref = None
+    for mode in (0, 1, 2):
+        est = estimate(dict(cfg, CONV2_BURST=mode))
+        load = est["layers"][name]["load"]
+        handshakes = groups if mode == 0 else 1
+        ref = load if ref is None else ref
+        print(f"{mode:>11} {handshakes:>11} {load:>6} {max(0, load - payload):>9} {ref - load:>6} {est['total']:>7}")
+
+# ================= Entry =================
+
+def parse_assign(text, multi=False, cfg=DEFAULT_CFG):
+    """
+    "KEY=VAL" (or "KEY=V1,V2" with multi) -> (key, value(s)) cast to the type of cfg[key].
+    Shared by the --set / --sweep options of the perf / FC stream / pipeline models.
+    """
+    key, _, val = text.partition("=")
+    if key not in cfg:
+        print(f"[Error] Unknown parameter '{key}' (choose from {', '.join(cfg)})")
+        sys.exit(1)
+    cast = type(cfg[key])
+    vals = [cast(v) for v in val.split(",")]
+    return key, (vals if multi else vals[0])
+
+def main():
+    parser = argparse.ArgumentParser(description="Cycle-approximate LeNet-5 accelerator model")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VAL",
+                        help="override one parameter, e.g. FC_BATCH=50")
+    parser.add_argument("--sweep", action="append", default=[], metavar="KEY=V1,V2",
+                        help="sweep a parameter (repeat for a cartesian product)")
+    parser.add_argument("--preload", action="store_true", help="include the host image/conv1 preload")
+    parser.add_argument("--conv2-burst", action="store_true", help="compare the conv2 weight load modes")
+    args = parser.parse_args()
+
+    base = dict(parse_assign(s) for s in args.set)
+    if args.conv2_burst:
+        print_burst_report(base)
+        return
+    if not args.sweep:
+        print_report(estimate(base, args.preload))
+        return
+
+    sweeps = dict(parse_assign(s, multi=True) for s in args.sweep)
+    keys = list(sweeps)
+    ref = estimate(base, args.preload)["total"]
+    print(" ".join(f"{k:>13}" for k in keys) + f" {'Cycles':>9} {'us/img':>8} {'img/s':>8} {'vs base':>8}")
+    for combo in itertools.product(*sweeps.values()):
+        est = estimate(dict(base, **dict(zip(keys, combo))), args.preload)
+        print(" ".join(f"{v:>13}" for v in combo)
+              + f" {est['total']:>9} {est['latency_us']:>8.2f} {est['images_per_s']:>8.0f} {ref / est['total']:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
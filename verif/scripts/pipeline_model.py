@@ -0,0 +1,263 @@
+"""
+Multi-image pipelined mode: image n+1's convolutions run on the conv core while
+image n's FC layers run on the FC core.
+
+Today lenet_controller runs L1 -> L2 and only then hands off to fc_controller,
+and the host preloads the next image after FC3 (serial mode). In pipelined mode:
+
+    conv core : [L1 L2](n)   [L1 L2](n+1)   [L1 L2](n+2) ...
+    FC core   :          [Flatten FC1 FC2 FC3](n)   [Flatten FC1 FC2 FC3](n+1) ...
+    loader    :     img(n+1) -> IMG_IN once L1(n) is done, only on cycles
+                    without a core write to bank 0 (the loader has priority)
+
+Every image's streams (gbuf_model.py, timing from perf_model.py) are replayed
+through one shared GlobalBuffer, cycle by cycle, with:
+    - conv1 weights re-DMA'd for every image (conv2 overwrote the weight buffer)
+    - FC flatten reads and conv reads arbitrated per bank; a same-bank conflict
+      stalls the whole machine one cycle (RTL today broadcasts the FC read
+      address to all banks for the whole fc_running window, which would have
+      to shrink to LOAD_SRAM)
+    - conv outputs taken from the golden model; the FC core's flatten reads are
+      checked against each image's own golden fc_in, so a buffer partition that
+      lets image n+1 overwrite data image n still needs shows up as FAIL
+
+Reported: steady-state images/s (pipelined vs serial) and, per global buffer
+region (ADDR_IMG_IN / ADDR_L1_OUT / ADDR_L2_OUT), the slack between the last
+read of image n and the first write of image n+1 (< 0 => needs a ping-pong copy).
+
+Usage:
+    python pipeline_model.py --images 6
+    python pipeline_model.py --images 6 --set MATRIX_B_COL=16
+"""
+import argparse
+
+import numpy as np
+
+import perf_model
+from gbuf_model import (ADDR_IMG_IN, ADDR_L1_OUT, ADDR_L2_OUT, L2_OUT_CH_SIZE, N_BANKS, SRAM_DEPTH,
+                        GlobalBuffer, conv_pass_stream, fc_load_stream, group_output)
+from golden_model import RTL_INIT_DIR, load_image_hex, load_params, quantize_images, run_batch
+
+# ================= 配置区域 =================
+# Global buffer regions: name, base, end, bytes used per bank by one image
+REGIONS = [
+    ("IMG_IN", ADDR_IMG_IN, ADDR_L1_OUT, 32 * 32),
+    ("L1_OUT", ADDR_L1_OUT, ADDR_L2_OUT, 14 * 14),
+    ("L2_OUT", ADDR_L2_OUT, SRAM_DEPTH, 3 * L2_OUT_CH_SIZE),
+]
+# Host image preload (TB load_image_to_sram), one byte per cycle into bank 0
+IMG_BYTES = 32 * 32
+# ============================================
+
+IDLE = ([], [])
+
+# ================= Stage Streams =================
+
+def conv_stage(l1, l2, cfg, n_banks=N_BANKS):
+    """
+    One image on the conv core (lenet_controller IDLE -> L1 -> L2 x groups -> DONE).
+    l1 / l2: golden pooled outputs [H, W, C] (None: zeros).
+    Yields (reads, writes) per cycle; the IMG_IN region is no longer read after
+    l1_cycles(cfg) cycles.
+    """
+    yield IDLE
+    for (name, img_hw, kernel, in_ch, out_ch), final, read_base, write_base, stride in zip(
+            perf_model.CONV_LAYERS, (l1, l2), (ADDR_IMG_IN, ADDR_L1_OUT), (ADDR_L1_OUT, ADDR_L2_OUT),
+            (0, L2_OUT_CH_SIZE)):
+        groups = -(-out_ch // n_banks)
+        loads = perf_model.conv_load_cycles(in_ch, kernel, groups, name != "L1" and cfg["CONV2_BURST"] > 0, cfg)
+        if name != "L1" and cfg["CONV2_BURST"] == 2:
+            loads[0] = max(0, loads[0] - (l1_cycles(cfg) - 1 - perf_model.conv_load_cycles(1, kernel, 1, False, cfg)[0]))
+        for g in range(groups):
+            out = group_output(final, img_hw, kernel, out_ch, g, n_banks)
+            # Lx_REQ_LOAD handshake + weight/bias DMA, Lx_RUN, wrapper IDLE -> RUN_PASS
+            for _ in range(loads[g] + 2):
+                yield IDLE
+            for c in range(in_ch):
+                last = (c == in_ch - 1)
+                yield from conv_pass_stream(img_hw, kernel, c, read_base, cfg,
+                                            out if last else None, write_base + g * stride, n_banks)
+                # NEXT_PASS_SETUP / DONE_STATE
+                yield IDLE
+    yield IDLE
+
+def l1_cycles(cfg):
+    """Cycles from conv stage start to the last IMG_IN read (end of L1)"""
+    name, img_hw, kernel, in_ch, out_ch = perf_model.CONV_LAYERS[0]
+    return 1 + perf_model.conv_layer_cycles(img_hw, kernel, in_ch, out_ch, cfg)["total"]
+
+def fc_stage(cfg):
+    """One image on the FC core: LOAD_SRAM flatten (global buffer reads), then FC1..FC3"""
+    yield IDLE
+    yield IDLE
+    yield from fc_load_stream(perf_model.FC_LAYERS[0][1])
+    yield IDLE
+    yield IDLE
+    for name, in_len, out_len in perf_model.FC_LAYERS:
+        for _ in range(perf_model.fc_layer_cycles(in_len, out_len, cfg)["total"]):
+            yield IDLE
+
+# ================= Simulation =================
+
+def _region(addr):
+    for name, base, end, _ in REGIONS:
+        if base <= addr < end:
+            return name
+    raise IndexError(f"Address 0x{addr:x} outside every region")
+
+def simulate(images, params=None, cfg=None, pipelined=True, n_banks=N_BANKS):
+    """
+    images: [N, 28, 28] int8. Returns a dict: cycles, stall, image_ready,
+    conv_done, fc_done (per image), fc_in [N, 400] as read by the FC core,
+    expected fc_in (golden, None without params), lifetimes
+    {region: [(first write, last read)] per image}.
+    """
+    cfg = dict(perf_model.DEFAULT_CFG, **(cfg or {}))
+    n = len(images)
+    result = run_batch(images, params) if params is not None else None
+    l1 = result["l1"]["final"] if result else [None] * n
+    l2 = result["l2"]["final"] if result else [None] * n
+    padded = np.zeros((n, 32, 32), dtype=np.int8)
+    padded[:, 2:30, 2:30] = images
+    padded = padded.reshape(n, -1)
+
+    gb = GlobalBuffer(n_banks)
+    life = {name: [[None, None] for _ in range(n)] for name, *_ in REGIONS}
+    fc_in = np.zeros((n, perf_model.FC_LAYERS[0][1]), dtype=np.int8)
+    image_ready, conv_done, fc_done = [None] * n, [None] * n, [None] * n
+
+    t, stall = 0, 0
+    ld, ld_pos, img_free = 0, 0, True
+    cv, conv_it, conv_pos = 0, None, 0
+    fc, fc_it, fc_pos, fc_queue = 0, None, 0, []
+    l1_end = l1_cycles(cfg)
+
+    while fc < n or fc_it is not None:
+        # ---- Start conditions ----
+        machine_idle = conv_it is None and fc_it is None and not fc_queue
+        if conv_it is None and cv < n and image_ready[cv] is not None and (pipelined or machine_idle):
+            conv_it, conv_pos = conv_stage(l1[cv], l2[cv], cfg, n_banks), 0
+        if fc_it is None and fc_queue:
+            fc_it, fc_pos = fc_stage(cfg), 0
+
+        # ---- This cycle's requests ----
+        conv_slot = next(conv_it, None) if conv_it is not None else None
+        fc_slot = next(fc_it, None) if fc_it is not None else None
+        if conv_it is not None and conv_slot is None:
+            conv_done[cv], conv_it = t, None
+            fc_queue.append(cv)
+            cv += 1
+            conv_slot = IDLE
+        if fc_it is not None and fc_slot is None:
+            fc_done[fc_queue.pop(0)], fc_it = t, None
+            fc += 1
+            fc_slot = IDLE
+        conv_reads, conv_writes = conv_slot or IDLE
+        fc_reads = (fc_slot or IDLE)[0]
+
+        writes = list(conv_writes)
+        loader_ok = ld < n and img_free and (pipelined or (conv_it is None and fc_it is None and not fc_queue))
+        if loader_ok and all(bank != 0 for bank, _, _ in conv_writes):
+            writes.append((0, ADDR_IMG_IN + ld_pos, int(padded[ld, ld_pos])))
+            _first(life["IMG_IN"][ld], t)
+            ld_pos += 1
+            if ld_pos == IMG_BYTES:
+                image_ready[ld], img_free = t + 1, False
+                ld, ld_pos = ld + 1, 0
+
+        # ---- Global buffer ----
+        data, cycles = gb.access(fc_reads + list(conv_reads), writes)
+        for i, (bank, addr) in enumerate(fc_reads):
+            fc_in[fc_queue[0], fc_pos] = data[i]
+            fc_pos += 1
+            life["L2_OUT"][fc_queue[0]][1] = t
+        for bank, addr in conv_reads:
+            life[_region(addr)][cv][1] = t
+        for bank, addr, _ in conv_writes:
+            _first(life[_region(addr)][cv], t)
+        stall += cycles - 1
+        t += cycles
+
+        if conv_it is not None:
+            conv_pos += 1
+            if conv_pos == l1_end:
+                img_free = True
+
+    return {
+        "cycles"     : t,
+        "stall"      : stall,
+        "image_ready": image_ready,
+        "conv_done"  : conv_done,
+        "fc_done"    : fc_done,
+        "fc_in"      : fc_in,
+        "expected"   : result["fc_in"] if result else None,
+        "lifetimes"  : life,
+    }
+
+def _first(entry, t):
+    if entry[0] is None:
+        entry[0] = t
+
+def interval(sim):
+    """Steady-state cycles per image (spacing of FC completions, first image excluded)"""
+    done = sim["fc_done"]
+    if len(done) < 3:
+        return done[-1] - (done[0] if len(done) > 1 else 0)
+    return (done[-1] - done[1]) / (len(done) - 2)
+
+def region_slack(sim):
+    """{region: min over n of first write(n+1) - last read(n)} (None with < 2 images)"""
+    slack = {}
+    for name, spans in sim["lifetimes"].items():
+        gaps = [spans[i + 1][0] - spans[i][1] for i in range(len(spans) - 1)
+                if spans[i + 1][0] is not None and spans[i][1] is not None]
+        slack[name] = min(gaps) if gaps else None
+    return slack
+
+def print_report(pipe, serial, cfg):
+    mhz = cfg["CLK_MHZ"]
+    est = perf_model.estimate(cfg)
+    conv = sum(est["layers"][name]["total"] for name, *_ in perf_model.CONV_LAYERS)
+    fc = sum(est["layers"][name]["total"] for name in ("Flatten", *[l[0] for l in perf_model.FC_LAYERS]))
+    print(f"Stages (perf_model): conv core {conv} cycles, FC core {fc} cycles, "
+          f"host image preload {IMG_BYTES} cycles")
+    print(f"{'Mode':<10} {'Cycles':>8} {'Cyc/img':>9} {'img/s':>9} {'Stall':>6}")
+    for name, sim in (("Serial", serial), ("Pipelined", pipe)):
+        ii = interval(sim)
+        print(f"{name:<10} {sim['cycles']:>8} {ii:>9.0f} {mhz * 1e6 / ii:>9.0f} {sim['stall']:>6}")
+    ii = interval(pipe)
+    conv_len = sum(1 for _ in conv_stage(None, None, cfg))
+    fc_len = sum(1 for _ in fc_stage(cfg))
+    print(f"Steady-state speed-up: {interval(serial) / ii:.2f}x, pipelined conv core busy {conv_len / ii:.1%}, "
+          f"FC core busy {fc_len / ii:.1%} of the interval")
+
+    print(f"{'Region':<8} {'Base':>7} {'B/bank':>7} {'Slack':>7}  Partition")
+    for (name, base, end, used), slack in zip(REGIONS, region_slack(pipe).values()):
+        verdict = ("single buffer OK" if slack is None or slack > 0
+                   else f"needs ping-pong: second {used} B/bank copy")
+        print(f"{name:<8} 0x{base:04x} {used:>7} {'-' if slack is None else slack:>7}  {verdict}")
+
+# ================= Entry =================
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-image pipelined conv/FC overlap model")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR, help="directory of the .hex init files")
+    parser.add_argument("--images", type=int, default=6, help="stream length (init image + random images)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VAL",
+                        help="override a perf_model.py parameter, e.g. MATRIX_B_COL=16")
+    args = parser.parse_args()
+
+    cfg = dict(perf_model.DEFAULT_CFG, **dict(perf_model.parse_assign(s) for s in args.set))
+    params = load_params(args.init_dir)
+    rng = np.random.default_rng(0)
+    images = np.concatenate([load_image_hex(f"{args.init_dir}/input_image.hex"),
+                             quantize_images(rng.integers(0, 256, (args.images - 1, 28, 28), dtype=np.uint8))])
+
+    pipe = simulate(images, params, cfg, pipelined=True)
+    serial = simulate(images, params, cfg, pipelined=False)
+    print_report(pipe, serial, cfg)
+    ok = all(np.array_equal(s["fc_in"], s["expected"]) for s in (pipe, serial))
+    print(f"FC core inputs vs golden per-image fc_in ({args.images} images): {'PASS' if ok else 'FAIL'}")
+
+if __name__ == "__main__":
+    main()
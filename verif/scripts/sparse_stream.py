@@ -0,0 +1,120 @@
+"""
+Compressed FC weight stream for pruned layers (FC1), one block per fc_accelerator_top micro-batch.
+
+fc_accelerator_top consumes, per batch of FC_BATCH neurons, one weight vector
+(column j of W^T, one byte per neuron) per input x_j. The compressed stream
+keeps that order and drops what pruning zeroed:
+
+    header     1 byte, format id (FORMATS index)
+    per batch b (neurons b*FC_BATCH ...):
+        col_mask   ceil(in_len / 8) bytes, bit j = column j has a non-zero weight
+        per set column j (ascending):
+            "mask": row_mask ceil(size / 8) bytes, then the non-zero weights in row order
+            "csr" : nnz (1 byte), then nnz x (row index, weight) byte pairs
+
+An all-zero column costs one bit (the core can skip its CALC_STREAM cycle for
+the whole batch, structured pruning); "mask" suits unstructured pruning down
+to ~12 non-zeros per column, "csr" sparser columns. Masks are LSB first.
+
+Files (8-bit lines, like fc1_weights.hex):
+
+    fc1_weights_sparse.hex : the stream above, batches back to back
+    fc1_sparse_index.hex   : 32-bit byte offset of every batch (+ end), for the weight DMA
+
+Shared by export_fc.py (--sparse) and golden_model.load_params(fc1_sparse=True);
+the pruning itself is LeNet5.prune_fc1() (train.py --prune).
+"""
+import math
+
+import numpy as np
+
+import perf_model
+
+# ================= 配置区域 =================
+FC_BATCH = perf_model.DEFAULT_CFG["FC_BATCH"]   # fc_systolic_array #(100)
+FORMATS = ("mask", "csr")
+# ============================================
+
+def stream_file(name):
+    return f"{name}_weights_sparse.hex"
+
+def index_file(name):
+    return f"{name}_sparse_index.hex"
+
+def _mask_bytes(bits):
+    """bool [N] -> LSB-first bytes [ceil(N/8)]"""
+    return np.packbits(np.asarray(bits, dtype=bool), bitorder="little").astype(np.int64)
+
+def _mask_bits(data, n):
+    return np.unpackbits(np.asarray(data, dtype=np.uint8), bitorder="little")[:n].astype(bool)
+
+# ================= Encode =================
+
+def encode(w, fmt="mask", batch=FC_BATCH):
+    """
+    w: int [Out, In] quantized weights. Returns (stream bytes int64 [N], batch offsets int64 [n_batches + 1]).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown sparse format '{fmt}' (choose from {', '.join(FORMATS)})")
+    w = np.asarray(w, dtype=np.int64)
+    out_len, in_len = w.shape
+    chunks, offsets, pos = [np.array([FORMATS.index(fmt)])], [1], 1
+    for start in range(0, out_len, batch):
+        block = w[start:start + batch].T            # [In, size]: one weight vector per input
+        nz = block != 0
+        cols = np.flatnonzero(nz.any(axis=1))
+        parts = [_mask_bytes(nz.any(axis=1))]
+        for j in cols:
+            rows = np.flatnonzero(nz[j])
+            if fmt == "mask":
+                parts += [_mask_bytes(nz[j]), block[j, rows]]
+            else:
+                parts += [np.array([len(rows)]), np.stack([rows, block[j, rows]], axis=1).ravel()]
+        data = np.concatenate(parts) & 0xFF
+        chunks.append(data)
+        pos += len(data)
+        offsets.append(pos)
+    return np.concatenate(chunks), np.array(offsets, dtype=np.int64)
+
+# ================= Decode =================
+
+def decode(stream, out_len, in_len, batch=FC_BATCH):
+    """Compressed stream bytes -> int32 [Out, In] (exact inverse of encode())"""
+    data = np.asarray(stream, dtype=np.int64) & 0xFF
+    signed = np.where(data >= 128, data - 256, data)
+    w = np.zeros((out_len, in_len), dtype=np.int32)
+    fmt, pos = FORMATS[data[0]], 1
+    for start in range(0, out_len, batch):
+        size = min(batch, out_len - start)
+        n_col = math.ceil(in_len / 8)
+        cols = np.flatnonzero(_mask_bits(data[pos:pos + n_col], in_len))
+        pos += n_col
+        for j in cols:
+            if fmt == "mask":
+                n_row = math.ceil(size / 8)
+                rows = np.flatnonzero(_mask_bits(data[pos:pos + n_row], size))
+                pos += n_row
+                vals = signed[pos:pos + len(rows)]
+                pos += len(rows)
+            else:
+                nnz = int(data[pos])
+                pairs = data[pos + 1:pos + 1 + 2 * nnz].reshape(nnz, 2)
+                rows, vals = pairs[:, 0], np.where(pairs[:, 1] >= 128, pairs[:, 1] - 256, pairs[:, 1])
+                pos += 1 + 2 * nnz
+            w[start + rows, j] = vals
+    return w
+
+# ================= Statistics =================
+
+def stream_stats(w, batch=FC_BATCH):
+    """Dense vs compressed bytes per format, sparsity and streamed columns (CALC_STREAM cycles)"""
+    w = np.asarray(w)
+    out = {"dense": w.size, "nnz": int(np.count_nonzero(w)), "sparsity": 1 - np.count_nonzero(w) / w.size,
+           "cycles_dense": 0, "cycles_sparse": 0}
+    for fmt in FORMATS:
+        stream, _ = encode(w, fmt, batch)
+        out[fmt] = len(stream)
+    for start in range(0, len(w), batch):
+        out["cycles_dense"] += w.shape[1]
+        out["cycles_sparse"] += int((w[start:start + batch] != 0).any(axis=0).sum())
+    return out
@@ -0,0 +1,170 @@
+"""
+Activation sparsity profiler + zero-skipping savings estimate.
+
+Runs the golden datapath (golden_model.run_batch) over a dataset and counts
+exact zeros in every activation a PE multiplies, after ReLU / >> QUANT_SHIFT /
+saturate:
+
+    Conv1 input  : padded Q1.7 image (pe, 6 output channels share it)
+    Conv2 input  : Conv1 output [14, 14, 6]
+    FC1 input    : Conv2 output [5, 5, 16], Channel-Major flatten (fc_pe broadcast)
+    FC2 input    : FC1 output [120]
+    FC3 input    : FC2 output [84]
+
+Zero-skipping estimate:
+    MACs skipped = every MAC whose activation is 0 (per-layer MAC counts)
+    FC cycles    = fc_accelerator_top streams one input per cycle to all PEs of a
+                   micro-batch, so a zero input can drop its whole CALC_STREAM
+                   cycle: perf_model.fc_layer_cycles(non-zeros, ...) per image
+    Conv cycles  = none: the 6 x MATRIX_B_COL array runs in a lockstep
+                   wavefront, a zero only saves the MAC (clock gating)
+
+Usage:
+    python sparsity_profile.py --split test
+    python sparsity_profile.py --synthetic 2000
+"""
+import argparse
+import os
+
+import numpy as np
+
+import perf_model
+from golden_model import CONV2_GROUPS, KERNEL_SIZE, PADDING, RTL_INIT_DIR, load_params, quantize_images, run_batch
+from golden_sweep import DATA_ROOT, load_mnist
+
+CHUNK_SIZE = 256
+
+# name, golden stage producing the input, MAC fan-out per input element (out channels / neurons)
+LAYERS = [
+    ("Conv1", "image", 6),
+    ("Conv2", "l1", CONV2_GROUPS[-1][1]),
+    ("FC1", "fc_in", perf_model.FC_LAYERS[0][2]),
+    ("FC2", "fc1", perf_model.FC_LAYERS[1][2]),
+    ("FC3", "fc2", perf_model.FC_LAYERS[2][2]),
+]
+
+# ================= Statistics =================
+
+def layer_inputs(images, result):
+    """{stage: activation tensor}, conv inputs channel-last [N, H, W, C], FC inputs [N, In]"""
+    return {
+        "image": np.pad(images, ((0, 0), (PADDING, PADDING), (PADDING, PADDING)))[..., None],
+        "l1"   : result["l1"]["final"],
+        "fc_in": result["fc_in"],
+        "fc1"  : result["fc1"]["final"],
+        "fc2"  : result["fc2"]["final"],
+    }
+
+def window_zeros(x, kernel=KERNEL_SIZE):
+    """Zero activations seen by every output pixel's K x K x C window, summed: [N]"""
+    win = np.lib.stride_tricks.sliding_window_view(x == 0, (kernel, kernel), axis=(1, 2))
+    return win.sum(axis=(1, 2, 3, 4, 5), dtype=np.int64)
+
+def channel_zeros(x):
+    """Zero count per channel (conv) / per element (FC): [C]"""
+    return (x == 0).reshape(-1, x.shape[-1]).sum(axis=0, dtype=np.int64)
+
+def profile(images_u8, params, chunk=CHUNK_SIZE):
+    """
+    Returns {layer: dict} with
+        n, elems        : images, input elements per image
+        zero_channel    : zero count per channel / input element, summed over images
+        zero_image      : [N] zero inputs per image
+        macs, zero_macs : [N] MACs and MACs with a 0 activation per image
+    """
+    n = len(images_u8)
+    stats = {}
+    for start in range(0, n, chunk):
+        images = quantize_images(images_u8[start:start + chunk])
+        inputs = layer_inputs(images, run_batch(images, params))
+        for name, stage, fanout in LAYERS:
+            x = inputs[stage]
+            s = stats.setdefault(name, {"n": n, "elems": x[0].size, "zero_channel": 0,
+                                        "zero_image": [], "macs": [], "zero_macs": []})
+            zeros = (x == 0).reshape(len(x), -1).sum(axis=1, dtype=np.int64)
+            if x.ndim == 4:
+                out_hw = x.shape[1] - KERNEL_SIZE + 1
+                macs = out_hw * out_hw * KERNEL_SIZE * KERNEL_SIZE * x.shape[-1] * fanout
+                zero_macs = window_zeros(x) * fanout
+            else:
+                macs = x.shape[-1] * fanout
+                zero_macs = zeros * fanout
+            s["zero_channel"] = s["zero_channel"] + channel_zeros(x)
+            s["zero_image"].append(zeros)
+            s["macs"].append(np.full(len(x), macs, dtype=np.int64))
+            s["zero_macs"].append(zero_macs)
+    for s in stats.values():
+        for key in ("zero_image", "macs", "zero_macs"):
+            s[key] = np.concatenate(s[key])
+    return stats
+
+def fc_cycles(stats, cfg=None):
+    """{FC layer: (dense cycles, mean zero-skipping cycles)} from perf_model"""
+    cfg = dict(perf_model.DEFAULT_CFG, **(cfg or {}))
+    out = {}
+    for name, in_len, out_len in perf_model.FC_LAYERS:
+        dense = perf_model.fc_layer_cycles(in_len, out_len, cfg)["total"]
+        nnz, counts = np.unique(in_len - stats[name]["zero_image"], return_counts=True)
+        sparse = sum(c * perf_model.fc_layer_cycles(int(k), out_len, cfg)["total"] for k, c in zip(nnz, counts))
+        out[name] = (dense, sparse / counts.sum())
+    return out
+
+# ================= Report =================
+
+def print_report(stats, cfg=None):
+    print(f"{'Layer':<6} {'Inputs':>7} {'Zero%':>7} {'p10':>6} {'p50':>6} {'p90':>6} "
+          f"{'MACs/img':>9} {'Skip MAC%':>9}")
+    for name, s in stats.items():
+        frac = s["zero_image"] / s["elems"]
+        p10, p50, p90 = np.percentile(frac, [10, 50, 90])
+        print(f"{name:<6} {s['elems']:>7} {frac.mean():>7.1%} {p10:>6.0%} {p50:>6.0%} {p90:>6.0%} "
+              f"{int(s['macs'][0]):>9} {s['zero_macs'].sum() / s['macs'].sum():>9.1%}")
+
+    print("\nPer-channel zero fraction (conv inputs):")
+    for name, s in stats.items():
+        if name.startswith("Conv"):
+            per_ch = s["zero_channel"] / (s["n"] * s["elems"] / len(s["zero_channel"]))
+            print(f"  {name} input: " + " ".join(f"{v:.0%}" for v in per_ch))
+    fc1 = stats["FC1"]
+    per_ch = fc1["zero_channel"].reshape(-1, 25).sum(axis=1) / (fc1["n"] * 25)
+    print("  FC1 input by Conv2 channel: " + " ".join(f"{v:.0%}" for v in per_ch))
+
+    cyc = fc_cycles(stats, cfg)
+    total = perf_model.estimate(cfg)["total"]
+    saved = sum(d - s for d, s in cyc.values())
+    print("\nZero-skipping fc_pe (drop CALC_STREAM cycles of zero inputs):")
+    for name, (dense, sparse) in cyc.items():
+        print(f"  {name}: {dense} -> {sparse:.0f} cycles ({1 - sparse / dense:.1%} saved)")
+    print(f"  Per image: {saved:.0f} of {total} cycles ({saved / total:.1%}); "
+          f"conv zero-skipping only saves MAC energy ({stats['Conv1']['zero_macs'].sum() / stats['Conv1']['macs'].sum():.0%} "
+          f"/ {stats['Conv2']['zero_macs'].sum() / stats['Conv2']['macs'].sum():.0%} of Conv1 / Conv2 MACs)")
+
+# ================= Entry =================
+
+def main():
+    parser = argparse.ArgumentParser(description="Activation sparsity profiler (golden datapath)")
+    parser.add_argument("--init-dir", default=RTL_INIT_DIR, help="directory of the .hex init files")
+    parser.add_argument("--data-root", default=DATA_ROOT, help="torchvision MNIST root")
+    parser.add_argument("--split", choices=["test", "train"], default="test")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N images")
+    parser.add_argument("--synthetic", type=int, default=0, help="N random images instead of MNIST")
+    parser.add_argument("--save", default=None, help="write the per-image / per-channel counts to this .npz")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        images = rng.integers(0, 256, (args.synthetic, 28, 28), dtype=np.uint8)
+    else:
+        images, _ = load_mnist(args.data_root, args.split)
+    images = images[:args.limit] if args.limit else images
+
+    stats = profile(images, load_params(args.init_dir))
+    print(f"Images: {len(images)}")
+    print_report(stats)
+    if args.save:
+        np.savez(args.save, **{f"{name}_{key}": s[key] for name, s in stats.items()
+                               for key in ("zero_channel", "zero_image", "zero_macs")})
+        print(f"Saved: {os.path.abspath(args.save)}")
+
+if __name__ == "__main__":
+    main()